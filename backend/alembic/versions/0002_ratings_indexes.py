@@ -0,0 +1,41 @@
+"""ratings composite indexes
+
+Revision ID: 0002_ratings_indexes
+Revises: 0001_initial
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_ratings_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_ratings_item_created", ["item_id", "created_at"]),
+    ("ix_ratings_user_item_created", ["user_id", "item_id", sa.text("created_at DESC")]),
+    ("ix_ratings_created_at", ["created_at"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no puede ir dentro de una transaccion.
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "ratings", columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        return
+    for name, columns in INDEXES:
+        op.create_index(name, "ratings", columns, unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, _columns in reversed(INDEXES):
+                op.drop_index(name, table_name="ratings", postgresql_concurrently=True, if_exists=True)
+        return
+    for name, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name="ratings")
@@ -0,0 +1,69 @@
+"""ratings stored total and score
+
+Revision ID: 0003_ratings_total
+Revises: 0002_ratings_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_ratings_total"
+down_revision = "0002_ratings_indexes"
+branch_labels = None
+depends_on = None
+
+TOTAL_SQL = "a + b + c + d + n"
+SCORE_SQL = "(a + b + c + d) / 4.0 + n"
+
+INDEXES = [
+    ("ix_ratings_item_total", ["item_id", "total"]),
+    ("ix_ratings_item_score", ["item_id", "score"]),
+]
+
+# La recreacion en batch refleja los indices sin el orden DESC; se rehace a mano.
+DESC_INDEX = ("ix_ratings_user_item_created", ["user_id", "item_id", sa.text("created_at DESC")])
+
+
+def _restore_desc_index() -> None:
+    name, columns = DESC_INDEX
+    op.drop_index(name, table_name="ratings")
+    op.create_index(name, "ratings", columns, unique=False)
+
+
+def _columns():
+    return [
+        sa.Column("total", sa.Integer(), sa.Computed(TOTAL_SQL, persisted=True), nullable=False),
+        sa.Column("score", sa.Float(), sa.Computed(SCORE_SQL, persisted=True), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    # Las columnas generadas STORED se calculan para las filas existentes al añadirlas (backfill).
+    if op.get_bind().dialect.name == "postgresql":
+        for column in _columns():
+            op.add_column("ratings", column)
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "ratings", columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        return
+    # SQLite no permite ADD COLUMN ... STORED: se recrea la tabla copiando los datos.
+    with op.batch_alter_table("ratings", recreate="always") as batch:
+        for column in _columns():
+            batch.add_column(column)
+    _restore_desc_index()
+    for name, columns in INDEXES:
+        op.create_index(name, "ratings", columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name="ratings")
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_column("ratings", "score")
+        op.drop_column("ratings", "total")
+        return
+    with op.batch_alter_table("ratings", recreate="always") as batch:
+        batch.drop_column("score")
+        batch.drop_column("total")
+    _restore_desc_index()
@@ -0,0 +1,172 @@
+"""compact integer keys (now converted with tools.compact_keys)
+
+Revision ID: 0004_compact_keys
+Revises: 0003_ratings_total
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_compact_keys"
+down_revision = "0003_ratings_total"
+branch_labels = None
+depends_on = None
+
+# upgrade ya no cambia nada: que una variable de entorno decidiera en silencio si se convertia
+# obligaba a bajar hasta aqui (perdiendo el archivo de 0006) para adoptar claves compactas mas tarde.
+# La conversion, en cualquier revision, es explicita con python -m tools.compact_keys.
+# downgrade vuelve a las claves UUID si encuentra el esquema compacto.
+
+TOTAL_SQL = "a + b + c + d + n"
+SCORE_SQL = "(a + b + c + d) / 4.0 + n"
+
+RATING_INDEXES = [
+    ("ix_ratings_item_id", ["item_id"]),
+    ("ix_ratings_user_id", ["user_id"]),
+    ("ix_ratings_created_at", ["created_at"]),
+    ("ix_ratings_item_created", ["item_id", "created_at"]),
+    ("ix_ratings_user_item_created", ["user_id", "item_id", sa.text("created_at DESC")]),
+    ("ix_ratings_item_total", ["item_id", "total"]),
+    ("ix_ratings_item_score", ["item_id", "score"]),
+]
+
+# Expresion SQL que genera un UUID v4 en texto (solo para downgrade).
+UUID_SQL = {
+    "postgresql": "gen_random_uuid()::text",
+    "sqlite": (
+        "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+    ),
+}
+
+
+def _is_compact() -> bool:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("items")}
+    return "pk" in columns
+
+
+def _user_columns():
+    return [
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("password_hash", sa.String(length=255), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=False),
+        sa.Column("is_blocked", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def _item_columns():
+    return [
+        sa.Column("code", sa.String(length=32), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def _score_columns():
+    return [
+        sa.Column("a", sa.Integer(), nullable=False),
+        sa.Column("b", sa.Integer(), nullable=False),
+        sa.Column("c", sa.Integer(), nullable=False),
+        sa.Column("d", sa.Integer(), nullable=False),
+        sa.Column("n", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), sa.Computed(TOTAL_SQL, persisted=True), nullable=False),
+        sa.Column("score", sa.Float(), sa.Computed(SCORE_SQL, persisted=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def _key_columns(compact: bool):
+    if compact:
+        return [
+            sa.Column("pk", sa.Integer(), primary_key=True),
+            sa.Column("id", sa.String(length=36), unique=True, nullable=False),
+        ]
+    return [sa.Column("id", sa.String(length=36), primary_key=True)]
+
+
+def _create_tables(compact: bool, sqlite: bool) -> None:
+    key = "pk" if compact else "id"
+    key_type = sa.Integer() if compact else sa.String(length=36)
+    # SQLite solo admite FK en el CREATE TABLE; en Postgres se crean tras el cambio de tablas.
+    item_fk = [sa.ForeignKey(f"items.{key}")] if sqlite else []
+    user_fk = [sa.ForeignKey(f"users.{key}")] if sqlite else []
+    # Los nombres de restricciones son globales en Postgres: se renombran tras borrar las tablas viejas.
+    unique_name = "uq_rating_item_user_time" if sqlite else "uq_rating_item_user_time_new"
+
+    op.create_table("users_new", *_key_columns(compact), *_user_columns())
+    op.create_table("items_new", *_key_columns(compact), *_item_columns())
+    op.create_table(
+        "ratings_new",
+        sa.Column("id", sa.Integer() if compact else sa.String(length=36), primary_key=True),
+        sa.Column("item_id", key_type, *item_fk, nullable=False),
+        sa.Column("user_id", key_type, *user_fk, nullable=False),
+        *_score_columns(),
+        sa.UniqueConstraint("item_id", "user_id", "created_at", name=unique_name),
+    )
+
+
+def _copy_rows(compact: bool) -> None:
+    users = "username, password_hash, is_admin, is_blocked, created_at"
+    items = "code, name, created_at"
+    scores = "r.a, r.b, r.c, r.d, r.n, r.created_at"
+    op.execute(f"INSERT INTO users_new (id, {users}) SELECT id, {users} FROM users ORDER BY created_at, id")
+    op.execute(f"INSERT INTO items_new (id, {items}) SELECT id, {items} FROM items ORDER BY created_at, id")
+    if compact:
+        op.execute(
+            "INSERT INTO ratings_new (item_id, user_id, a, b, c, d, n, created_at) "
+            f"SELECT i.pk, u.pk, {scores} FROM ratings r "
+            "JOIN items_new i ON i.id = r.item_id JOIN users_new u ON u.id = r.user_id "
+            "ORDER BY r.created_at"
+        )
+        return
+    uuid_sql = UUID_SQL[op.get_bind().dialect.name]
+    op.execute(
+        "INSERT INTO ratings_new (id, item_id, user_id, a, b, c, d, n, created_at) "
+        f"SELECT {uuid_sql}, i.id, u.id, {scores} FROM ratings r "
+        "JOIN items i ON i.pk = r.item_id JOIN users u ON u.pk = r.user_id"
+    )
+
+
+def _swap_tables(compact: bool, sqlite: bool) -> None:
+    # invites.used_by_user_id sigue apuntando al UUID publico de users.
+    if not sqlite:
+        op.execute("ALTER TABLE invites DROP CONSTRAINT IF EXISTS invites_used_by_user_id_fkey")
+    for table in ("ratings", "items", "users"):
+        op.drop_table(table)
+    for table in ("users", "items", "ratings"):
+        op.rename_table(f"{table}_new", table)
+    if not sqlite:
+        key = "pk" if compact else "id"
+        for table in ("users", "items", "ratings"):
+            op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_new_pkey TO {table}_pkey")
+        if compact:
+            for table in ("users", "items"):
+                op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_new_id_key TO {table}_id_key")
+        op.execute("ALTER TABLE ratings RENAME CONSTRAINT uq_rating_item_user_time_new TO uq_rating_item_user_time")
+        op.create_foreign_key("ratings_item_id_fkey", "ratings", "items", ["item_id"], [key])
+        op.create_foreign_key("ratings_user_id_fkey", "ratings", "users", ["user_id"], [key])
+        op.create_foreign_key("invites_used_by_user_id_fkey", "invites", "users", ["used_by_user_id"], ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_items_code", "items", ["code"], unique=True)
+    for name, columns in RATING_INDEXES:
+        op.create_index(name, "ratings", columns, unique=False)
+
+
+def _convert(compact: bool) -> None:
+    # Las tablas se reconstruyen y se copian: con millones de ratings, hacerlo en una ventana de mantenimiento.
+    sqlite = op.get_bind().dialect.name == "sqlite"
+    _create_tables(compact, sqlite)
+    _copy_rows(compact)
+    _swap_tables(compact, sqlite)
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    if _is_compact():
+        _convert(compact=False)
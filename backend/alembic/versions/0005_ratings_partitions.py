@@ -0,0 +1,24 @@
+"""monthly range partitions for ratings (Postgres)
+
+Revision ID: 0005_ratings_partitions
+Revises: 0004_compact_keys
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+
+from app.partitions import partition_ratings, unpartition_ratings
+
+revision = "0005_ratings_partitions"
+down_revision = "0004_compact_keys"
+branch_labels = None
+depends_on = None
+
+
+# La conversion vive en app.partitions: tools.compact_keys la reutiliza al reconstruir ratings.
+def upgrade() -> None:
+    partition_ratings(op.get_bind())
+
+
+def downgrade() -> None:
+    unpartition_ratings(op.get_bind())
@@ -0,0 +1,56 @@
+"""rating rollups and archive
+
+Revision ID: 0006_ratings_archive
+Revises: 0005_ratings_partitions
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_ratings_archive"
+down_revision = "0005_ratings_partitions"
+branch_labels = None
+depends_on = None
+
+METRICS = ("a", "b", "c", "d", "n", "total")
+
+
+def _key():
+    # Sigue el esquema de claves vigente (0004_compact_keys).
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("items")}
+    if "pk" in columns:
+        return "pk", sa.Integer()
+    return "id", sa.String(length=36)
+
+
+def upgrade() -> None:
+    key, key_type = _key()
+    op.create_table(
+        "rating_rollups",
+        sa.Column("item_id", key_type, sa.ForeignKey(f"items.{key}"), primary_key=True),
+        sa.Column("user_id", key_type, sa.ForeignKey(f"users.{key}"), primary_key=True),
+        sa.Column("cnt", sa.Integer(), nullable=False),
+        *[sa.Column(f"sum_{m}", sa.Integer(), nullable=False) for m in METRICS],
+        sa.Column("sum_score", sa.Float(), nullable=False),
+        *[sa.Column(f"max_{m}", sa.Integer(), nullable=False) for m in METRICS],
+        sa.Column("archived_until", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_rating_rollups_user_id", "rating_rollups", ["user_id"], unique=False)
+    op.create_table(
+        "ratings_archive",
+        sa.Column("id", key_type, primary_key=True),
+        sa.Column("item_id", key_type, sa.ForeignKey(f"items.{key}"), nullable=False),
+        sa.Column("user_id", key_type, sa.ForeignKey(f"users.{key}"), nullable=False),
+        *[sa.Column(f, sa.Integer(), nullable=False) for f in ("a", "b", "c", "d", "n")],
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ratings_archive_item_id", "ratings_archive", ["item_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ratings_archive_item_id", table_name="ratings_archive")
+    op.drop_table("ratings_archive")
+    op.drop_index("ix_rating_rollups_user_id", table_name="rating_rollups")
+    op.drop_table("rating_rollups")
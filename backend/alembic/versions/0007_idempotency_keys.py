@@ -0,0 +1,38 @@
+"""idempotency keys for rating creation
+
+Revision ID: 0007_idempotency_keys
+Revises: 0006_ratings_archive
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_idempotency_keys"
+down_revision = "0006_ratings_archive"
+branch_labels = None
+depends_on = None
+
+
+def _key():
+    # Sigue el esquema de claves vigente (0004_compact_keys).
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}
+    if "pk" in columns:
+        return "pk", sa.Integer()
+    return "id", sa.String(length=36)
+
+
+def upgrade() -> None:
+    key, key_type = _key()
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("user_id", key_type, sa.ForeignKey(f"users.{key}"), primary_key=True),
+        sa.Column("key", sa.String(length=64), primary_key=True),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("idempotency_keys")
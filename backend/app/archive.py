@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.orm import Session
+
+from . import models
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# Los rangos 7 y 30 de stats solo leen filas vivas: nunca se archiva nada mas reciente.
+MIN_ARCHIVE_DAYS = 30
+# Ultimos ratings por (item, usuario) que siempre quedan vivos: detalle, "others" y la lista de
+# ultimos ratings de un item solo miran los 10 mas recientes.
+KEEP_RECENT = 10
+
+RATING_FIELDS = ("a", "b", "c", "d", "n")
+METRICS = RATING_FIELDS + ("total",)
+
+
+def archive_candidates(db: Session, cutoff: datetime, keep_recent: int = KEEP_RECENT) -> list:
+    rating = models.Rating
+    position = func.row_number().over(
+        partition_by=(rating.item_pk, rating.user_pk),
+        order_by=rating.created_at.desc(),
+    )
+    ranked = db.query(rating.id.label("id"), rating.created_at.label("created_at"), position.label("position")).subquery()
+    rows = db.query(ranked.c.id).filter(ranked.c.position > keep_recent, ranked.c.created_at < cutoff).all()
+    return [row.id for row in rows]
+
+
+def _merge_rollups(db: Session, ids: list) -> None:
+    rating = models.Rating
+    rollup = models.RatingRollup
+    batch = (
+        db.query(
+            rating.item_pk.label("item_pk"),
+            rating.user_pk.label("user_pk"),
+            func.count().label("cnt"),
+            func.sum(rating.score).label("sum_score"),
+            func.max(rating.created_at).label("archived_until"),
+            *[func.sum(getattr(rating, m)).label(f"sum_{m}") for m in METRICS],
+            *[func.max(getattr(rating, m)).label(f"max_{m}") for m in METRICS],
+        )
+        .filter(rating.id.in_(ids))
+        .group_by(rating.item_pk, rating.user_pk)
+        .all()
+    )
+    keys = [(row.item_pk, row.user_pk) for row in batch]
+    existing = {
+        (r.item_pk, r.user_pk): r
+        for r in db.query(rollup).filter(tuple_(rollup.item_pk, rollup.user_pk).in_(keys)).all()
+    }
+    for row in batch:
+        current = existing.get((row.item_pk, row.user_pk))
+        if current is None:
+            current = rollup(item_pk=row.item_pk, user_pk=row.user_pk, cnt=0, sum_score=0.0, archived_until=row.archived_until)
+            for m in METRICS:
+                setattr(current, f"sum_{m}", 0)
+                setattr(current, f"max_{m}", getattr(row, f"max_{m}"))
+            db.add(current)
+        current.cnt += row.cnt
+        current.sum_score += row.sum_score
+        current.archived_until = max(current.archived_until, row.archived_until)
+        for m in METRICS:
+            setattr(current, f"sum_{m}", getattr(current, f"sum_{m}") + getattr(row, f"sum_{m}"))
+            setattr(current, f"max_{m}", max(getattr(current, f"max_{m}"), getattr(row, f"max_{m}")))
+
+
+def archive_batch(db: Session, ids: list, now: datetime) -> None:
+    rating = models.Rating
+    archive = models.RatingArchive.__table__
+    columns = [rating.id, rating.item_pk, rating.user_pk, *[getattr(rating, f) for f in RATING_FIELDS], rating.created_at]
+    source = db.query(*columns, literal(now, archive.c.archived_at.type)).filter(rating.id.in_(ids))
+    db.execute(archive.insert().from_select(
+        ["id", "item_id", "user_id", *RATING_FIELDS, "created_at", "archived_at"],
+        source.statement,
+    ))
+    _merge_rollups(db, ids)
+    db.query(rating).filter(rating.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def archive_ratings(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    keep_recent: int = KEEP_RECENT,
+    batch_size: int = 5_000,
+    now: Optional[datetime] = None,
+) -> dict:
+    if older_than_days < MIN_ARCHIVE_DAYS:
+        raise ValueError(f"older_than_days debe ser >= {MIN_ARCHIVE_DAYS}")
+    if keep_recent < KEEP_RECENT:
+        raise ValueError(f"keep_recent debe ser >= {KEEP_RECENT}")
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    ids = archive_candidates(db, cutoff, keep_recent)
+    # Cada lote mueve filas, actualiza rollups y borra en la misma transaccion.
+    for start in range(0, len(ids), batch_size):
+        archive_batch(db, ids[start:start + batch_size], now)
+    return {"cutoff": cutoff.isoformat(), "archived": len(ids)}
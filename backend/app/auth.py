@@ -11,6 +11,9 @@ from passlib.context import CryptContext
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
+# Vida del refresh token: POST /auth/refresh da un access token nuevo sin verificar la contraseña.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REFRESH_TOKEN_TYPE = "refresh"
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -36,12 +39,27 @@ def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def decode_access_token(token: str = Depends(oauth2_scheme)) -> TokenData:
+def create_refresh_token(user_id: str, expires_delta: Optional[timedelta] = None) -> str:
+    expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode = {"sub": user_id, "exp": expire, "typ": REFRESH_TOKEN_TYPE}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _decode_token(token: str, refresh: bool) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        return TokenData(user_id=user_id)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user_id: str = payload.get("sub")
+    # Un refresh token no vale como access token (dura mucho mas) ni al reves.
+    if not user_id or (payload.get("typ") == REFRESH_TOKEN_TYPE) != refresh:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return TokenData(user_id=user_id)
+
+
+def decode_access_token(token: str = Depends(oauth2_scheme)) -> TokenData:
+    return _decode_token(token, refresh=False)
+
+
+def decode_refresh_token(token: str) -> TokenData:
+    return _decode_token(token, refresh=True)
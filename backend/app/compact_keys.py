@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from sqlalchemy import inspect, text
+
+from . import models
+from .archive import METRICS
+from .database import Base
+from .partitions import is_partitioned, partition_ratings
+
+# Tablas cuyas claves cambian con COMPACT_KEYS (padres primero).
+KEY_TABLES = ("users", "items", "ratings", "rating_rollups", "ratings_archive", "idempotency_keys")
+# Columnas que se copian tal cual; id, item_id y user_id se traducen con tablas temporales.
+COPY_COLUMNS = {
+    "users": ("username", "password_hash", "is_admin", "is_blocked", "created_at"),
+    "items": ("code", "name", "created_at"),
+    "ratings": ("a", "b", "c", "d", "n", "created_at"),
+    "rating_rollups": (
+        "cnt",
+        *(f"sum_{m}" for m in METRICS),
+        "sum_score",
+        *(f"max_{m}" for m in METRICS),
+        "archived_until",
+    ),
+    "ratings_archive": ("a", "b", "c", "d", "n", "created_at", "archived_at"),
+    # response guarda la respuesta original (con el id de rating de entonces) y se conserva tal cual.
+    "idempotency_keys": ("key", "request_hash", "response", "created_at"),
+}
+# (traduce id de rating, tiene item_id) por tabla hija; todas tienen user_id.
+CHILD_TABLES = {
+    "ratings": (True, True),
+    "rating_rollups": (False, True),
+    "ratings_archive": (True, True),
+    "idempotency_keys": (False, False),
+}
+# Restricciones de Postgres con nombre global que la tabla apartada debe liberar.
+PG_CONSTRAINTS = ("{table}_pkey", "{table}_id_key", "uq_rating_item_user_time")
+
+# Expresion SQL que genera un UUID v4 en texto (al volver a claves UUID).
+UUID_SQL = {
+    "postgresql": "gen_random_uuid()::text",
+    "sqlite": (
+        "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+    ),
+}
+
+
+def is_compact(conn) -> Optional[bool]:
+    # None: base sin tablas (create_all creara el esquema que diga COMPACT_KEYS).
+    inspector = inspect(conn)
+    if not inspector.has_table("items"):
+        return None
+    return "pk" in {c["name"] for c in inspector.get_columns("items")}
+
+
+def check_key_schema(engine) -> None:
+    # Al arrancar: con la variable distinta del esquema real todas las consultas con claves fallarian.
+    with engine.connect() as conn:
+        compact = is_compact(conn)
+    if compact is not None and compact != models.COMPACT_KEYS:
+        schema = "compactas" if compact else "UUID"
+        raise RuntimeError(
+            f"COMPACT_KEYS={int(models.COMPACT_KEYS)} pero la base usa claves {schema}: "
+            "ajusta la variable o convierte la base con python -m tools.compact_keys"
+        )
+
+
+def _set_aside(conn, table: str, sqlite: bool) -> None:
+    # Los nombres de indices (y en Postgres de PK/UNIQUE) son globales: se liberan antes de renombrar.
+    for index in Base.metadata.tables[table].indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    if not sqlite:
+        for name in PG_CONSTRAINTS:
+            # CASCADE: las FK de las tablas hijas apartadas ya no hacen falta.
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name.format(table=table)} CASCADE"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_old"))
+
+
+def _copy_parents(conn, compact: bool) -> None:
+    old_key, new_key = ("id", "pk") if compact else ("pk", "id")
+    for table, keys in (("users", "user_keys"), ("items", "item_keys")):
+        columns = ", ".join(COPY_COLUMNS[table])
+        conn.execute(text(
+            f"INSERT INTO {table} (id, {columns}) SELECT id, {columns} FROM {table}_old ORDER BY created_at, id"
+        ))
+        conn.execute(text(
+            f"CREATE TEMP TABLE {keys} AS SELECT o.{old_key} AS old_key, n.{new_key} AS new_key "
+            f"FROM {table}_old o JOIN {table} n ON n.id = o.id"
+        ))
+        conn.execute(text(f"CREATE INDEX ix_{keys}_old ON {keys} (old_key)"))
+    # Los archivados conservan el id que tenian en ratings: se numeran juntos para no repetir ninguno.
+    new_id = "row_number() OVER (ORDER BY created_at, id)" if compact else UUID_SQL[conn.dialect.name]
+    conn.execute(text(
+        f"CREATE TEMP TABLE rating_ids AS SELECT id AS old_id, {new_id} AS new_id FROM "
+        "(SELECT id, created_at FROM ratings_archive_old UNION ALL SELECT id, created_at FROM ratings_old) r"
+    ))
+    conn.execute(text("CREATE INDEX ix_rating_ids_old ON rating_ids (old_id)"))
+
+
+def _copy_child(conn, table: str) -> None:
+    rating_ids, has_item = CHILD_TABLES[table]
+    columns, values, joins = [], [], []
+    if rating_ids:
+        columns.append("id")
+        values.append("k.new_id")
+        joins.append("JOIN rating_ids k ON k.old_id = o.id")
+    if has_item:
+        columns.append("item_id")
+        values.append("ik.new_key")
+        joins.append("JOIN item_keys ik ON ik.old_key = o.item_id")
+    columns.append("user_id")
+    values.append("uk.new_key")
+    joins.append("JOIN user_keys uk ON uk.old_key = o.user_id")
+    columns.extend(COPY_COLUMNS[table])
+    values.extend(f"o.{c}" for c in COPY_COLUMNS[table])
+    conn.execute(text(
+        f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {table}_old o {' '.join(joins)}"
+    ))
+
+
+def convert_keys(engine) -> Dict[str, int]:
+    # Reconstruye users/items y sus tablas hijas con el esquema de models (COMPACT_KEYS del proceso)
+    # copiando los datos, en una sola transaccion. Bloquea las tablas mientras dura: hacerlo en una
+    # ventana de mantenimiento y con la API parada. Devuelve las filas por tabla.
+    compact = models.COMPACT_KEYS
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.begin() as conn:
+        current = is_compact(conn)
+        if current is None or current == compact:
+            return {}
+        inspector = inspect(conn)
+        missing = [t for t in KEY_TABLES if not inspector.has_table(t)]
+        if missing:
+            raise RuntimeError(f"Faltan tablas ({', '.join(missing)}): ejecuta antes alembic upgrade head")
+        counts = {t: conn.execute(text(f"SELECT count(*) FROM {t}")).scalar() for t in KEY_TABLES}
+        partitioned = is_partitioned(conn)
+        if sqlite:
+            # pysqlite solo abre transaccion antes de INSERT/UPDATE/DELETE: sin BEGIN los RENAME y
+            # DROP se aplicarian aunque la copia fallase.
+            conn.exec_driver_sql("BEGIN")
+            # Sin esto SQLite reescribe las FK de invites para que apunten a users_old.
+            conn.execute(text("PRAGMA legacy_alter_table=ON"))
+        else:
+            # invites.used_by_user_id apunta al UUID publico de users, que no cambia: se rehace al final.
+            conn.execute(text("ALTER TABLE invites DROP CONSTRAINT IF EXISTS invites_used_by_user_id_fkey"))
+        for table in KEY_TABLES:
+            _set_aside(conn, table, sqlite)
+        Base.metadata.create_all(conn, tables=[Base.metadata.tables[t] for t in KEY_TABLES])
+        _copy_parents(conn, compact)
+        for table in CHILD_TABLES:
+            _copy_child(conn, table)
+        copied = {t: conn.execute(text(f"SELECT count(*) FROM {t}")).scalar() for t in KEY_TABLES}
+        if copied != counts:
+            # Filas sin su usuario o item: se deshace todo antes de borrar las tablas viejas.
+            raise RuntimeError(f"Filas distintas tras copiar: antes {counts}, despues {copied}")
+        for table in reversed(KEY_TABLES):
+            conn.execute(text(f"DROP TABLE {table}_old" if sqlite else f"DROP TABLE {table}_old CASCADE"))
+        for temp in ("user_keys", "item_keys", "rating_ids"):
+            conn.execute(text(f"DROP TABLE {temp}"))
+        if sqlite:
+            conn.execute(text("PRAGMA legacy_alter_table=OFF"))
+        else:
+            conn.execute(text(
+                "ALTER TABLE invites ADD CONSTRAINT invites_used_by_user_id_fkey "
+                "FOREIGN KEY (used_by_user_id) REFERENCES users (id)"
+            ))
+            if compact:
+                # Los ids se insertaron a mano: la secuencia sigue tras el mayor (vivo o archivado).
+                conn.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('ratings', 'id'), "
+                    "GREATEST((SELECT max(id) FROM ratings), (SELECT max(id) FROM ratings_archive), 0) + 1, false)"
+                ))
+            if partitioned:
+                partition_ratings(conn)
+        for table in KEY_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+    return counts
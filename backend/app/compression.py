@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import gzip
+import os
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin el solo se usa gzip
+    brotli = None
+
+# Respuestas mas pequenas se envian sin comprimir: la cabecera gzip no compensa.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_LEVEL = int(os.getenv("BROTLI_LEVEL", "5"))
+# A partir de este tamano se comprime en el threadpool para no bloquear el event loop.
+COMPRESSION_THREAD_SIZE = int(os.getenv("COMPRESSION_THREAD_SIZE", "65536"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "image/svg+xml",
+    "text/",
+)
+# Extensiones que tools/build_web.py deja precomprimidas junto al original.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_level: int = BROTLI_LEVEL) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_level)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    # Solo comprime respuestas de un unico mensaje (JSON de la API). Las respuestas en streaming
+    # (ficheros, eventos) pasan tal cual: los estaticos ya van precomprimidos.
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_level: int = BROTLI_LEVEL,
+        thread_size: int = COMPRESSION_THREAD_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+        self.thread_size = thread_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            passthrough = True
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            ):
+                await send(start)
+                await send(message)
+                return
+            _add_vary(headers)
+            if len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+            if len(body) >= self.thread_size:
+                body = await run_in_threadpool(compress, body, encoding, self.gzip_level, self.brotli_level)
+            else:
+                body = compress(body, encoding, self.gzip_level, self.brotli_level)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    # Sirve index.html.br / app.js.gz si existen, son al menos tan recientes como el original y el
+    # cliente los acepta. El ETag es el del original, como gzip_static de nginx.
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if status_code != 200 or not isinstance(response, FileResponse):
+            return response
+        _add_vary(response.headers)
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            try:
+                compressed_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            if compressed_stat.st_mtime < stat_result.st_mtime:
+                continue
+            return FileResponse(
+                f"{full_path}{suffix}",
+                stat_result=compressed_stat,
+                media_type=response.media_type,
+                headers={
+                    "content-encoding": encoding,
+                    "vary": response.headers["vary"],
+                    "etag": response.headers["etag"],
+                    "last-modified": response.headers["last-modified"],
+                },
+            )
+        return response
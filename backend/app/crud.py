@@ -1,13 +1,20 @@
 ﻿from __future__ import annotations
 
+import hashlib
+import json
+import os
 from datetime import datetime, timedelta
 from typing import Optional, List
 import secrets
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
-from . import models
+from . import models, schemas
 from .auth import get_password_hash
 
+# Horas durante las que un reintento con la misma Idempotency-Key devuelve la respuesta original.
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
 
 def create_user(db: Session, username: str, password: str, is_admin: bool = False) -> models.User:
     user = models.User(username=username, password_hash=get_password_hash(password), is_admin=is_admin)
@@ -96,17 +103,73 @@ def update_item(db: Session, item: models.Item, code: Optional[str], name: Optio
     return item
 
 
-def list_items(db: Session) -> List[models.Item]:
-    return db.query(models.Item).order_by(models.Item.created_at.desc()).all()
+def list_items(db: Session) -> List[dict]:
+    rows = (
+        db.query(models.Item.id, models.Item.code, models.Item.name, models.Item.created_at)
+        .order_by(models.Item.created_at.desc())
+        .all()
+    )
+    return [{"id": str(r.id), "code": r.code, "name": r.name, "created_at": r.created_at} for r in rows]
 
 
 def get_item(db: Session, item_id) -> Optional[models.Item]:
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
 
-def create_rating(db: Session, item_id, user_id, a: int, b: int, c: int, d: int, n: int) -> models.Rating:
-    rating = models.Rating(item_id=item_id, user_id=user_id, a=a, b=b, c=c, d=d, n=n)
+def create_rating(
+    db: Session,
+    item_pk,
+    user_pk,
+    a: int,
+    b: int,
+    c: int,
+    d: int,
+    n: int,
+    idempotency_key: Optional[str] = None,
+    request_hash: Optional[str] = None,
+) -> models.Rating:
+    rating = models.Rating(item_pk=item_pk, user_pk=user_pk, a=a, b=b, c=c, d=d, n=n)
     db.add(rating)
+    if idempotency_key is not None:
+        # Rating y clave van en la misma transaccion: o se guardan los dos o ninguno.
+        db.flush()
+        cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_pk == user_pk,
+            models.IdempotencyKey.created_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.add(
+            models.IdempotencyKey(
+                user_pk=user_pk,
+                key=idempotency_key,
+                request_hash=request_hash,
+                response=rating_response_json(rating),
+            )
+        )
     db.commit()
     db.refresh(rating)
     return rating
+
+
+def rating_request_hash(item_id: str, payload: schemas.RatingCreate) -> str:
+    body = json.dumps({"item_id": item_id, **payload.dict()}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def rating_response_json(rating: models.Rating) -> str:
+    # Mismo cuerpo que genera FastAPI con response_model=RatingOut.
+    content = jsonable_encoder(schemas.RatingOut.from_orm(rating))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def get_idempotency_key(db: Session, user_pk, key: str) -> Optional[models.IdempotencyKey]:
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    return (
+        db.query(models.IdempotencyKey)
+        .filter(
+            models.IdempotencyKey.user_pk == user_pk,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.created_at >= cutoff,
+        )
+        .first()
+    )
@@ -1,7 +1,8 @@
 ﻿from __future__ import annotations
 
+import os
 import time
-from typing import Generator
+from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 
@@ -10,6 +11,9 @@ from .auth import decode_access_token
 from .models import User
 
 _RATE_LIMIT = {}
+# Intentos por IP y minuto en /auth/login, /auth/register y /auth/pin; 0 desactiva el limite
+# (tools.loadtest lo hace con su uvicorn, que recibe todo desde 127.0.0.1).
+AUTH_RATE_LIMIT_PER_MINUTE = int(os.getenv("AUTH_RATE_LIMIT_PER_MINUTE", "20"))
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -20,7 +24,11 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def rate_limit(request: Request, key_prefix: str = "auth", max_per_minute: int = 20) -> None:
+def rate_limit(request: Request, key_prefix: str = "auth", max_per_minute: Optional[int] = None) -> None:
+    if max_per_minute is None:
+        max_per_minute = AUTH_RATE_LIMIT_PER_MINUTE
+    if max_per_minute <= 0:
+        return
     ip = request.client.host if request.client else "unknown"
     key = f"{key_prefix}:{ip}"
     now = int(time.time())
@@ -42,6 +50,18 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(decode_
     return user
 
 
+def check_stream_user(token: str) -> None:
+    # Para GET /events: valida el token sin dejar una sesion de BD abierta mientras dura el stream.
+    user_id = decode_access_token(token).user_id
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+    finally:
+        db.close()
+    if not user or user.is_blocked:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+
 def require_admin(user: User = Depends(get_current_user)) -> User:
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+# Eventos pendientes por conexion. Si un cliente lento llega al limite se vacia su cola y recibe
+# un unico "resync" (volver a pedir listas) en vez de acumular memoria o frenar las escrituras.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Comentario ": ping" tras este silencio: mantiene viva la conexion en proxies y detecta cortes.
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "200"))
+# Espera que el navegador aplica antes de reconectar (campo retry de SSE).
+EVENTS_RETRY_MS = 5000
+
+RESYNC = "resync"
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+def format_event(event: Event) -> str:
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event: Event) -> None:
+        # Se ejecuta en el event loop de la conexion (call_soon_threadsafe).
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((event[0], RESYNC, {}))
+            return
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    # Notificaciones de cambios para GET /events. Solo de este proceso: con varios workers cada
+    # conexion ve las escrituras que atiende su worker.
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE, max_connections: int = EVENTS_MAX_CONNECTIONS):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscriber] = set()
+        self._next_id = 0
+        # Ultimos eventos, para reenviar lo perdido a quien reconecta con Last-Event-ID.
+        self._recent: deque = deque(maxlen=queue_size)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        # Seguro desde las rutas sync (threadpool): cada conexion lo recibe en su propio loop.
+        with self._lock:
+            self._next_id += 1
+            event = (self._next_id, event_type, data)
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # Loop ya cerrado; la conexion se da de baja al salir de stream().
+                pass
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Optional[Subscriber]:
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_connections:
+                return None
+            self._subscribers.add(subscriber)
+            if last_event_id is not None:
+                self._replay(subscriber, last_event_id)
+        return subscriber
+
+    def _replay(self, subscriber: Subscriber, last_event_id: int) -> None:
+        # Llamar con _lock tomado. Si el hueco ya no esta en _recent (o el servidor se reinicio y
+        # los ids volvieron a empezar) no se puede reconstruir: resync.
+        oldest = self._recent[0][0] if self._recent else self._next_id + 1
+        if last_event_id > self._next_id or last_event_id < oldest - 1:
+            subscriber.offer((self._next_id, RESYNC, {}))
+            return
+        for event in self._recent:
+            if event[0] > last_event_id:
+                subscriber.offer(event)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def connections(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def full(self) -> bool:
+        return self.connections() >= self.max_connections
+
+    async def stream(
+        self,
+        is_disconnected,
+        last_event_id: Optional[int] = None,
+        heartbeat: float = EVENTS_HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[str]:
+        # La suscripcion se crea al empezar a enviar: si el cliente se va antes, no queda colgada.
+        subscriber = self.subscribe(last_event_id)
+        if subscriber is None:
+            return
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = EventBroker()
@@ -2,17 +2,26 @@ from __future__ import annotations
 
 import os
 from datetime import datetime, timedelta
+from typing import Optional, Union
 
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .database import Base, engine
 from . import models, schemas, crud, stats
-from .auth import verify_password, create_access_token
-from .deps import get_db, get_current_user, require_admin, rate_limit
+from .auth import verify_password, create_access_token, create_refresh_token, decode_refresh_token
+from .deps import get_db, get_current_user, require_admin, rate_limit, check_stream_user
+from .events import broker
 from .admin import router as admin_router
 from .bootstrap import ensure_bootstrap_users
+from .compact_keys import check_key_schema
+from .partitions import ensure_rating_partitions
+from .responses import fast_json
+from .compression import CompressionMiddleware, PrecompressedStaticFiles
 
 app = FastAPI(title="Rating App API")
 
@@ -30,9 +39,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip (o brotli si esta instalado) para respuestas grandes; ver COMPRESSION_MIN_SIZE en compression.py
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(admin_router)
 
+# Opcional: servir la PWA desde la API. tools/build_web.py deja los .gz/.br junto a cada fichero.
+WEB_DIR = os.getenv("WEB_DIR")
+if WEB_DIR:
+    app.mount("/web", PrecompressedStaticFiles(directory=WEB_DIR, html=True), name="web")
+
 
 # ✅ Ruta raíz para que el dominio no devuelva {"detail":"Not Found"}
 @app.get("/")
@@ -46,9 +62,21 @@ def health():
     return {"ok": True}
 
 
+def _parse_fields(fields: Optional[str], allowed) -> Optional[list[str]]:
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    if not requested or any(f not in allowed for f in requested):
+        raise HTTPException(status_code=400, detail="Invalid fields")
+    return requested
+
+
 @app.on_event("startup")
 def on_startup():
+    # Antes de create_all: con COMPACT_KEYS distinto del esquema crearia tablas nuevas con otras claves.
+    check_key_schema(engine)
     Base.metadata.create_all(bind=engine)
+    ensure_rating_partitions(engine)
     db = next(get_db())
     try:
         ensure_bootstrap_users(db)
@@ -56,6 +84,13 @@ def on_startup():
         db.close()
 
 
+def _issue_tokens(user: models.User) -> schemas.Token:
+    return schemas.Token(
+        access_token=create_access_token(str(user.id)),
+        refresh_token=create_refresh_token(str(user.id)),
+    )
+
+
 @app.post("/auth/register", response_model=schemas.UserOut)
 def register(payload: schemas.UserCreate, request: Request, db: Session = Depends(get_db)):
     rate_limit(request, key_prefix="auth")
@@ -75,8 +110,7 @@ def login(payload: schemas.UserLogin, request: Request, db: Session = Depends(ge
         raise HTTPException(status_code=401, detail="Invalid credentials")
     if user.is_blocked:
         raise HTTPException(status_code=401, detail="User blocked")
-    token = create_access_token(str(user.id))
-    return schemas.Token(access_token=token)
+    return _issue_tokens(user)
 
 
 @app.post("/auth/pin", response_model=schemas.Token)
@@ -94,8 +128,20 @@ def login_pin(payload: schemas.PinLogin, request: Request, db: Session = Depends
         raise HTTPException(status_code=401, detail="Invalid profile")
     if user.is_blocked:
         raise HTTPException(status_code=401, detail="User blocked")
-    token = create_access_token(str(user.id))
-    return schemas.Token(access_token=token)
+    return _issue_tokens(user)
+
+
+@app.post("/auth/refresh", response_model=schemas.Token)
+def refresh(payload: schemas.TokenRefresh, request: Request, db: Session = Depends(get_db)):
+    # Sin pbkdf2: basta con la firma del refresh token y que el usuario siga activo.
+    rate_limit(request, key_prefix="refresh", max_per_minute=60)
+    token = decode_refresh_token(payload.refresh_token)
+    user = crud.get_user(db, token.user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if user.is_blocked:
+        raise HTTPException(status_code=401, detail="User blocked")
+    return _issue_tokens(user)
 
 
 @app.get("/me", response_model=schemas.MeOut)
@@ -105,12 +151,14 @@ def me(user: models.User = Depends(get_current_user)):
 
 @app.get("/items", response_model=list[schemas.ItemOut])
 def list_items(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
-    return crud.list_items(db)
+    return fast_json(crud.list_items(db))
 
 
 @app.post("/items", response_model=schemas.ItemOut)
 def create_item(payload: schemas.ItemCreate, db: Session = Depends(get_db), _=Depends(get_current_user)):
-    return crud.create_item(db, payload.code, payload.name)
+    item = crud.create_item(db, payload.code, payload.name)
+    broker.publish("item.created", {"id": item.id, "code": item.code})
+    return item
 
 
 @app.patch("/items/{item_id}", response_model=schemas.ItemOut)
@@ -118,7 +166,9 @@ def update_item(item_id: str, payload: schemas.ItemUpdate, db: Session = Depends
     item = crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return crud.update_item(db, item, payload.code, payload.name)
+    item = crud.update_item(db, item, payload.code, payload.name)
+    broker.publish("item.updated", {"id": item.id, "code": item.code})
+    return item
 
 
 @app.delete("/items/{item_id}", status_code=204)
@@ -130,41 +180,132 @@ def delete_item(item_id: str, db: Session = Depends(get_db), user: models.User =
         raise HTTPException(status_code=404, detail="Item not found")
     db.delete(item)
     db.commit()
+    broker.publish("item.deleted", {"id": item_id})
     return None
 
 
+def _replay_rating(stored: models.IdempotencyKey, request_hash: str) -> Response:
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="IDEMPOTENCY_KEY_REUSED")
+    return Response(stored.response, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+
 @app.post("/items/{item_id}/ratings", response_model=schemas.RatingOut)
-def rate_item(item_id: str, payload: schemas.RatingCreate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def rate_item(
+    item_id: str,
+    payload: schemas.RatingCreate,
+    idempotency_key: Optional[str] = Header(default=None, min_length=1, max_length=models.IDEMPOTENCY_KEY_MAX),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    # Con Idempotency-Key un reintento (p. ej. la cola offline de la app) recibe la respuesta
+    # original aunque ya no pasaria el cooldown o el item se hubiera borrado.
+    request_hash = None
+    if idempotency_key:
+        request_hash = crud.rating_request_hash(item_id, payload)
+        stored = crud.get_idempotency_key(db, user.pk, idempotency_key)
+        if stored:
+            return _replay_rating(stored, request_hash)
+
     item = crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    last_rating = (
-        db.query(models.Rating)
-        .filter(models.Rating.item_id == item_id, models.Rating.user_id == user.id)
-        .order_by(models.Rating.created_at.desc())
+    # El limite inferior en created_at deja al planner podar particiones antiguas.
+    recent_rating = (
+        db.query(models.Rating.id)
+        .filter(
+            models.Rating.item_pk == item.pk,
+            models.Rating.user_pk == user.pk,
+            models.Rating.created_at > datetime.utcnow() - timedelta(minutes=5),
+        )
         .first()
     )
-    if last_rating:
-        if datetime.utcnow() - last_rating.created_at < timedelta(minutes=5):
-            raise HTTPException(status_code=429, detail="COOLDOWN_RATING_5MIN")
+    if recent_rating:
+        raise HTTPException(status_code=429, detail="COOLDOWN_RATING_5MIN")
 
-    rating = crud.create_rating(db, item_id, user.id, payload.a, payload.b, payload.c, payload.d, payload.n)
+    try:
+        rating = crud.create_rating(
+            db,
+            item.pk,
+            user.pk,
+            payload.a,
+            payload.b,
+            payload.c,
+            payload.d,
+            payload.n,
+            idempotency_key=idempotency_key,
+            request_hash=request_hash,
+        )
+    except IntegrityError:
+        # Dos envios simultaneos con la misma clave: el que pierde devuelve el del otro.
+        db.rollback()
+        stored = crud.get_idempotency_key(db, user.pk, idempotency_key) if idempotency_key else None
+        if not stored:
+            raise
+        return _replay_rating(stored, request_hash)
+    # Los reenvios con Idempotency-Key salen antes: cada rating se anuncia una sola vez.
+    # item_id del path: tras el commit leer item.id costaria otro SELECT.
+    broker.publish("rating.added", {"item_id": item_id})
     return rating
 
 
+@app.get("/events")
+async def events(
+    request: Request,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = Header(default=None),
+):
+    # Server-Sent Events con avisos de cambios (sin datos de ratings): item.created/updated/deleted,
+    # rating.added por item y resync. EventSource no puede enviar cabeceras, asi que el token
+    # tambien se acepta en ?token=.
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    await run_in_threadpool(check_stream_user, token)
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+    if broker.full():
+        raise HTTPException(status_code=503, detail="Too many event streams")
+    return StreamingResponse(
+        broker.stream(request.is_disconnected, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/stats/ranking", response_model=list[schemas.RankingEntry])
 def ranking(range: str = "all", db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
     if range not in {"7", "30", "all"}:
         raise HTTPException(status_code=400, detail="Invalid range")
-    return stats.get_ranking(db, range)
+    return fast_json(stats.get_ranking(db, range))
 
 
-@app.get("/items/summary", response_model=list[schemas.ItemSummaryOut])
-def items_summary(range: str = "all", db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+@app.get(
+    "/items/summary",
+    response_model=Union[schemas.ItemSummaryColumnar, list[schemas.ItemSummaryOut]],
+    response_model_exclude_unset=True,
+)
+def items_summary(
+    range: str = "all",
+    format: str = "rows",
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
     if range not in {"7", "30", "all"}:
         raise HTTPException(status_code=400, detail="Invalid range")
-    return stats.get_items_summary(db, range, user)
+    if format not in {"rows", "columnar"}:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    requested = _parse_fields(fields, stats.SUMMARY_FIELDS)
+    rows = stats.get_items_summary(db, range, user, requested)
+    if format == "columnar":
+        return fast_json(stats.summary_columnar(rows, requested))
+    return fast_json(rows)
 
 
 @app.get("/items/{item_id}/stats", response_model=schemas.ItemStatsOut)
@@ -174,7 +315,7 @@ def item_stats(item_id: str, range: str = "all", db: Session = Depends(get_db),
     item = crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return stats.get_item_stats(db, item_id, range)
+    return fast_json(stats.get_item_stats(db, item_id, range))
 
 
 @app.get("/items/{item_id}/ratings/summary", response_model=schemas.RatingsSummaryOut)
@@ -182,7 +323,7 @@ def ratings_summary(item_id: str, db: Session = Depends(get_db), user: models.Us
     item = crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return stats.get_ratings_summary(db, item_id, user)
+    return fast_json(stats.get_ratings_summary(db, item_id, user))
 
 
 @app.get("/items/{item_id}/others", response_model=schemas.RatingsSummaryOut)
@@ -190,16 +331,31 @@ def ratings_others(item_id: str, db: Session = Depends(get_db), user: models.Use
     item = crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return stats.get_ratings_summary(db, item_id, user)
+    return fast_json(stats.get_ratings_summary(db, item_id, user))
 
 
 @app.get("/items/{item_id}/detail", response_model=schemas.ItemDetailOut)
 def item_detail(item_id: str, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
-    return stats.get_item_detail(db, item_id, user)
+    return fast_json(stats.get_item_detail(db, item_id, user))
 
 
-@app.get("/rankings", response_model=schemas.RankingsOut)
-def rankings(mode: str = "global", db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+@app.get(
+    "/rankings",
+    response_model=Union[schemas.RankingsColumnar, schemas.RankingsOut],
+    response_model_exclude_unset=True,
+)
+def rankings(
+    mode: str = "global",
+    format: str = "rows",
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
     if mode not in {"mine", "global"}:
         raise HTTPException(status_code=400, detail="Invalid mode")
-    return stats.get_rankings(db, user, mode)
+    if format not in {"rows", "columnar"}:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    data = stats.get_rankings(db, user, mode, _parse_fields(fields, stats.OUT_METRICS))
+    if format == "columnar":
+        return fast_json(stats.rankings_columnar(data))
+    return fast_json(data)
@@ -1,17 +1,41 @@
 ﻿from __future__ import annotations
 
+import os
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, DateTime, Float, Integer, String, Text, Boolean, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, synonym
 
 from .database import Base
 
 
+# Claves internas enteras para users/items/ratings; el UUID publico (id) se mantiene para la API.
+COMPACT_KEYS = os.getenv("COMPACT_KEYS", "0") == "1"
+
+RATING_TOTAL_SQL = "a + b + c + d + n"
+RATING_SCORE_SQL = "(a + b + c + d) / 4.0 + n"
+IDEMPOTENCY_KEY_MAX = 64
+
+
+def _new_uuid() -> str:
+    return str(uuid.uuid4())
+
+
+def _key_ref(name: str, table: str, **kwargs) -> Column:
+    if COMPACT_KEYS:
+        return Column(name, Integer, ForeignKey(f"{table}.pk"), nullable=False, **kwargs)
+    return Column(name, String(36), ForeignKey(f"{table}.id"), nullable=False, **kwargs)
+
+
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    if COMPACT_KEYS:
+        pk = Column(Integer, primary_key=True)
+        id = Column(String(36), unique=True, nullable=False, default=_new_uuid)
+    else:
+        id = Column(String(36), primary_key=True, default=_new_uuid)
+        pk = synonym("id")
     username = Column(String(50), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
@@ -34,28 +58,113 @@ class Invite(Base):
 class Item(Base):
     __tablename__ = "items"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    if COMPACT_KEYS:
+        pk = Column(Integer, primary_key=True)
+        id = Column(String(36), unique=True, nullable=False, default=_new_uuid)
+    else:
+        id = Column(String(36), primary_key=True, default=_new_uuid)
+        pk = synonym("id")
     code = Column(String(32), unique=True, nullable=False, index=True)
     name = Column(String(200), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     ratings = relationship("Rating", back_populates="item", cascade="all, delete-orphan")
+    rating_rollups = relationship("RatingRollup", cascade="all, delete-orphan")
+    archived_ratings = relationship("RatingArchive", cascade="all, delete-orphan")
 
 
 class Rating(Base):
     __tablename__ = "ratings"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    item_id = Column(String(36), ForeignKey("items.id"), nullable=False, index=True)
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    # item_pk/user_pk apuntan a la clave interna; item_id/user_id exponen el UUID publico.
+    if COMPACT_KEYS:
+        id = Column(Integer, primary_key=True)
+    else:
+        id = Column(String(36), primary_key=True, default=_new_uuid)
+    item_pk = _key_ref("item_id", "items", index=True)
+    user_pk = _key_ref("user_id", "users", index=True)
     a = Column(Integer, nullable=False)
     b = Column(Integer, nullable=False)
     c = Column(Integer, nullable=False)
     d = Column(Integer, nullable=False)
     n = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Calculadas por la base de datos al escribir; stats agrega y ordena sobre ellas.
+    total = Column(Integer, Computed(RATING_TOTAL_SQL, persisted=True), nullable=False)
+    score = Column(Float, Computed(RATING_SCORE_SQL, persisted=True), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     item = relationship("Item", back_populates="ratings")
     user = relationship("User", back_populates="ratings")
 
-    __table_args__ = (UniqueConstraint("item_id", "user_id", "created_at", name="uq_rating_item_user_time"),)
+    if COMPACT_KEYS:
+        @property
+        def item_id(self) -> str:
+            return self.item.id
+
+        @property
+        def user_id(self) -> str:
+            return self.user.id
+    else:
+        item_id = synonym("item_pk")
+        user_id = synonym("user_pk")
+
+    __table_args__ = (
+        UniqueConstraint("item_id", "user_id", "created_at", name="uq_rating_item_user_time"),
+        Index("ix_ratings_item_created", "item_id", "created_at"),
+        Index("ix_ratings_item_total", "item_id", "total"),
+        Index("ix_ratings_item_score", "item_id", "score"),
+    )
+
+
+Index("ix_ratings_user_item_created", Rating.user_pk, Rating.item_pk, Rating.created_at.desc())
+
+
+# Agregados por (item, usuario) de los ratings archivados; stats los suma a las filas vivas en range=all.
+class RatingRollup(Base):
+    __tablename__ = "rating_rollups"
+
+    item_pk = _key_ref("item_id", "items", primary_key=True)
+    user_pk = _key_ref("user_id", "users", primary_key=True, index=True)
+    cnt = Column(Integer, nullable=False)
+    sum_a = Column(Integer, nullable=False)
+    sum_b = Column(Integer, nullable=False)
+    sum_c = Column(Integer, nullable=False)
+    sum_d = Column(Integer, nullable=False)
+    sum_n = Column(Integer, nullable=False)
+    sum_total = Column(Integer, nullable=False)
+    sum_score = Column(Float, nullable=False)
+    max_a = Column(Integer, nullable=False)
+    max_b = Column(Integer, nullable=False)
+    max_c = Column(Integer, nullable=False)
+    max_d = Column(Integer, nullable=False)
+    max_n = Column(Integer, nullable=False)
+    max_total = Column(Integer, nullable=False)
+    archived_until = Column(DateTime, nullable=False)
+
+
+# Filas originales ya compactadas en rating_rollups (mismo id que tenian en ratings).
+class RatingArchive(Base):
+    __tablename__ = "ratings_archive"
+
+    id = Column(Integer if COMPACT_KEYS else String(36), primary_key=True)
+    item_pk = _key_ref("item_id", "items", index=True)
+    user_pk = _key_ref("user_id", "users")
+    a = Column(Integer, nullable=False)
+    b = Column(Integer, nullable=False)
+    c = Column(Integer, nullable=False)
+    d = Column(Integer, nullable=False)
+    n = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Respuesta original de POST /items/{id}/ratings por (usuario, Idempotency-Key): un reintento la
+# recibe de nuevo en vez de crear otro rating.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_pk = _key_ref("user_id", "users", primary_key=True)
+    key = Column(String(IDEMPOTENCY_KEY_MAX), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
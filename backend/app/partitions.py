@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import inspect, text
+
+# Meses futuros con particion ya creada (solo Postgres con ratings particionada).
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+DEFAULT_PARTITION = "ratings_pdefault"
+RATING_COLUMNS = "id, item_id, user_id, a, b, c, d, n, created_at"
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"ratings_p{month:%Y_%m}"
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    row = conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'ratings' AND pg_table_is_visible(c.oid)"
+    )).first()
+    return row is not None
+
+
+def create_month_partition(conn, month: date) -> bool:
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is not None
+    stray = 0
+    if has_default:
+        stray = conn.execute(
+            text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper"),
+            {"lower": lower, "upper": upper},
+        ).scalar()
+    if stray:
+        # Postgres no deja crear la particion si la default ya tiene filas de ese mes: se mueven.
+        conn.execute(text(
+            f"CREATE TEMP TABLE ratings_stray ON COMMIT DROP AS SELECT {RATING_COLUMNS} FROM {DEFAULT_PARTITION} "
+            "WHERE created_at >= :lower AND created_at < :upper"
+        ), {"lower": lower, "upper": upper})
+        conn.execute(
+            text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper"),
+            {"lower": lower, "upper": upper},
+        )
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF ratings FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+    if stray:
+        conn.execute(text(f"INSERT INTO ratings ({RATING_COLUMNS}) SELECT {RATING_COLUMNS} FROM ratings_stray"))
+        conn.execute(text("DROP TABLE ratings_stray"))
+    return True
+
+
+def ensure_rating_partitions(engine, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[datetime] = None) -> list[str]:
+    created = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return created
+        # Varios workers arrancan a la vez: solo uno crea particiones.
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('ratings_partitions'))"))
+        first = month_start(today or datetime.utcnow())
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if create_month_partition(conn, month):
+                created.append(partition_name(month))
+    if created:
+        print(f"PARTITIONS: creadas {', '.join(created)}")
+    return created
+
+
+RATING_INDEXES = [
+    ("ix_ratings_item_id", "item_id"),
+    ("ix_ratings_user_id", "user_id"),
+    ("ix_ratings_created_at", "created_at"),
+    ("ix_ratings_item_created", "item_id, created_at"),
+    ("ix_ratings_user_item_created", "user_id, item_id, created_at DESC"),
+    ("ix_ratings_item_total", "item_id, total"),
+    ("ix_ratings_item_score", "item_id, score"),
+]
+
+
+def _key_column(conn) -> str:
+    columns = {c["name"] for c in inspect(conn).get_columns("items")}
+    return "pk" if "pk" in columns else "id"
+
+
+def _set_aside(conn, old: str) -> None:
+    # Indices y restricciones tienen nombres globales: se liberan antes de crear la tabla nueva.
+    conn.execute(text(f"ALTER TABLE ratings RENAME TO {old}"))
+    for name, _columns in RATING_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    conn.execute(text(f"ALTER TABLE {old} DROP CONSTRAINT IF EXISTS uq_rating_item_user_time"))
+    conn.execute(text(f"ALTER TABLE {old} DROP CONSTRAINT IF EXISTS ratings_pkey"))
+
+
+def _finish(conn, old: str, primary_key: str) -> None:
+    key = _key_column(conn)
+    conn.execute(text(f"ALTER TABLE ratings ADD CONSTRAINT ratings_pkey PRIMARY KEY ({primary_key})"))
+    conn.execute(text("ALTER TABLE ratings ADD CONSTRAINT uq_rating_item_user_time UNIQUE (item_id, user_id, created_at)"))
+    conn.execute(text(f"INSERT INTO ratings ({RATING_COLUMNS}) SELECT {RATING_COLUMNS} FROM {old}"))
+    # Con COMPACT_KEYS el id sale de una secuencia propiedad de la tabla vieja: se traspasa antes del DROP.
+    sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{old}', 'id')")).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY ratings.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+    for column in ("item_id", "user_id"):
+        target = "items" if column == "item_id" else "users"
+        conn.execute(text(
+            f"ALTER TABLE ratings ADD CONSTRAINT ratings_{column}_fkey FOREIGN KEY ({column}) REFERENCES {target} ({key})"
+        ))
+    for name, columns in RATING_INDEXES:
+        conn.execute(text(f"CREATE INDEX {name} ON ratings ({columns})"))
+    conn.execute(text("ANALYZE ratings"))
+
+
+def partition_ratings(conn) -> bool:
+    # Convierte ratings en tabla particionada por mes de created_at copiando los datos (solo Postgres).
+    if conn.dialect.name != "postgresql" or is_partitioned(conn):
+        return False
+    # La clave de particion debe formar parte de la PK y de las restricciones UNIQUE.
+    _set_aside(conn, "ratings_unpartitioned")
+    conn.execute(text(
+        "CREATE TABLE ratings (LIKE ratings_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    oldest = conn.execute(text("SELECT min(created_at) FROM ratings_unpartitioned")).scalar()
+    now = datetime.utcnow()
+    month = month_start(oldest or now)
+    last = add_months(month_start(now), PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        create_month_partition(conn, month)
+        month = add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF ratings DEFAULT"))
+    _finish(conn, "ratings_unpartitioned", "id, created_at")
+    return True
+
+
+def unpartition_ratings(conn) -> bool:
+    if conn.dialect.name != "postgresql" or not is_partitioned(conn):
+        return False
+    _set_aside(conn, "ratings_partitioned")
+    conn.execute(text("CREATE TABLE ratings (LIKE ratings_partitioned INCLUDING DEFAULTS INCLUDING GENERATED)"))
+    _finish(conn, "ratings_partitioned", "id")
+    return True
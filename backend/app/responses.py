@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin el se usa json de la libreria estandar
+    orjson = None
+
+# Con FAST_JSON=1 las rutas de listas y stats serializan sus dicts directamente, sin volver a
+# validarlos con response_model (el esquema OpenAPI no cambia).
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any):
+    # Devolver un Response hace que FastAPI no pase el contenido por response_model.
+    if FAST_JSON:
+        return FastJSONResponse(content)
+    return content
@@ -1,13 +1,18 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 
 class UserCreate(BaseModel):
@@ -139,6 +144,11 @@ class ItemSummaryOut(BaseModel):
     global_avg_total: Optional[float]
 
 
+class ItemSummaryColumnar(BaseModel):
+    items: Dict[str, List[Optional[str]]]
+    columns: Dict[str, List[Optional[float]]]
+
+
 class RatingsSummaryOut(BaseModel):
     item_id: str
     others_count: int
@@ -175,10 +185,21 @@ class RankingEntryOut(BaseModel):
     value: float
 
 
+# Con fields= solo vienen las metricas pedidas.
 class RankingsOut(BaseModel):
-    total: List[RankingEntryOut]
-    a: List[RankingEntryOut]
-    b: List[RankingEntryOut]
-    c: List[RankingEntryOut]
-    d: List[RankingEntryOut]
-    n: List[RankingEntryOut]
+    total: Optional[List[RankingEntryOut]]
+    a: Optional[List[RankingEntryOut]]
+    b: Optional[List[RankingEntryOut]]
+    c: Optional[List[RankingEntryOut]]
+    d: Optional[List[RankingEntryOut]]
+    n: Optional[List[RankingEntryOut]]
+
+
+class RankingColumns(BaseModel):
+    item: List[int]
+    value: List[float]
+
+
+class RankingsColumnar(BaseModel):
+    items: Dict[str, List[str]]
+    columns: Dict[str, RankingColumns]
@@ -1,11 +1,11 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime, timedelta
-from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, case
+from typing import List, Optional, Sequence
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Float, func, and_, case, cast, or_, select, union_all
 
-from . import models, schemas
+from . import models
 
 
 def _range_start(range_name: str):
@@ -16,195 +16,306 @@ def _range_start(range_name: str):
     return None
 
 
-def get_ranking(db: Session, range_name: str) -> List[schemas.RankingEntry]:
+def _item_pk(item_id: str):
+    if not models.COMPACT_KEYS:
+        return item_id
+    return select(models.Item.pk).where(models.Item.id == item_id).scalar_subquery()
+
+
+METRICS = ("a", "b", "c", "d", "n", "total")
+# Orden de campos de schemas.ItemSummaryOut y schemas.RankingsOut.
+OUT_METRICS = ("total", "a", "b", "c", "d", "n")
+RANKING_LIMIT = 50
+
+
+def _archived_by_item(db: Session, *filters) -> dict:
+    # Ratings compactados por archive.py; solo cuentan en range=all (se archiva con mas de 30 dias).
+    rollup = models.RatingRollup
+    rows = (
+        db.query(
+            rollup.item_pk.label("item_pk"),
+            func.sum(rollup.cnt).label("cnt"),
+            func.sum(rollup.sum_score).label("sum_score"),
+            *[func.sum(getattr(rollup, f"sum_{m}")).label(f"sum_{m}") for m in METRICS],
+            *[func.max(getattr(rollup, f"max_{m}")).label(f"max_{m}") for m in METRICS],
+        )
+        .filter(*filters)
+        .group_by(rollup.item_pk)
+        .all()
+    )
+    return {r.item_pk: r for r in rows}
+
+
+def _max(*values):
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def _avg(total, count):
+    return total / count if count else None
+
+
+def _rating_out(r: models.Rating) -> dict:
+    return {
+        "id": str(r.id),
+        "item_id": str(r.item_id),
+        "user_id": str(r.user_id),
+        "a": r.a,
+        "b": r.b,
+        "c": r.c,
+        "d": r.d,
+        "n": r.n,
+        "created_at": r.created_at,
+    }
+
+
+def _rating_inline(r: models.Rating) -> dict:
+    return {"a": r.a, "b": r.b, "c": r.c, "d": r.d, "n": r.n, "total": r.total, "created_at": r.created_at}
+
+
+def get_ranking(db: Session, range_name: str) -> List[dict]:
     start = _range_start(range_name)
     query = db.query(
+        models.Item.pk.label("item_pk"),
         models.Item.id.label("item_id"),
         models.Item.code.label("code"),
         models.Item.name.label("name"),
-        func.avg((models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d) / 4.0 + models.Rating.n).label("avg_total"),
-        func.count(models.Rating.id).label("count"),
-    ).join(models.Rating, models.Rating.item_id == models.Item.id)
+        func.sum(models.Rating.score).label("sum_score"),
+        func.count().label("count"),
+    ).join(models.Rating, models.Rating.item_pk == models.Item.pk)
 
     if start:
         query = query.filter(models.Rating.created_at >= start)
 
-    rows = query.group_by(models.Item.id).order_by(func.avg((models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d) / 4.0 + models.Rating.n).desc()).all()
+    rows = query.group_by(models.Item.pk).all()
+    archived = {} if start else _archived_by_item(db)
 
-    return [
-        schemas.RankingEntry(
-            item_id=str(r.item_id),
-            code=r.code,
-            name=r.name,
-            avg_total=float(r.avg_total or 0),
-            count=int(r.count or 0),
-        )
-        for r in rows
-    ]
+    results = []
+    for r in rows:
+        sum_score, count = r.sum_score or 0, r.count
+        extra = archived.get(r.item_pk)
+        if extra:
+            sum_score, count = sum_score + extra.sum_score, count + extra.cnt
+        results.append({
+            "item_id": str(r.item_id),
+            "code": r.code,
+            "name": r.name,
+            "avg_total": float(_avg(sum_score, count) or 0),
+            "count": int(count),
+        })
+    # Empates por codigo: el orden no depende de como agrupe la base de datos.
+    results.sort(key=lambda e: (-e["avg_total"], e["code"]))
+    return results
 
 
-def get_item_stats(db: Session, item_id: str, range_name: str) -> schemas.ItemStatsOut:
+def get_item_stats(db: Session, item_id: str, range_name: str) -> dict:
     start = _range_start(range_name)
-    base_query = db.query(models.Rating).filter(models.Rating.item_id == item_id)
+    item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    base_query = db.query(models.Rating).filter(models.Rating.item_pk == item.pk)
+    if models.COMPACT_KEYS:
+        # RatingOut expone el UUID del usuario: se carga en la misma consulta.
+        base_query = base_query.options(joinedload(models.Rating.user))
     if start:
         base_query = base_query.filter(models.Rating.created_at >= start)
 
     agg = db.query(
-        func.avg(models.Rating.a),
-        func.avg(models.Rating.b),
-        func.avg(models.Rating.c),
-        func.avg(models.Rating.d),
-        func.avg(models.Rating.n),
-        func.avg((models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d) / 4.0 + models.Rating.n),
-    ).filter(models.Rating.item_id == item_id)
+        func.count().label("cnt"),
+        func.sum(models.Rating.a).label("sum_a"),
+        func.sum(models.Rating.b).label("sum_b"),
+        func.sum(models.Rating.c).label("sum_c"),
+        func.sum(models.Rating.d).label("sum_d"),
+        func.sum(models.Rating.n).label("sum_n"),
+        func.sum(models.Rating.score).label("sum_score"),
+    ).filter(models.Rating.item_pk == item.pk)
 
     if start:
         agg = agg.filter(models.Rating.created_at >= start)
 
-    avg_a, avg_b, avg_c, avg_d, avg_n, avg_total = agg.first()
+    live = agg.first()
+    archived = {} if start else _archived_by_item(db, models.RatingRollup.item_pk == item.pk)
+    extra = archived.get(item.pk)
 
-    item = db.query(models.Item).filter(models.Item.id == item_id).first()
-    ratings = base_query.order_by(models.Rating.created_at.desc()).limit(10).all()
+    def _item_avg(name):
+        total, count = getattr(live, name) or 0, live.cnt
+        if extra:
+            total, count = total + getattr(extra, name), count + extra.cnt
+        return float(_avg(total, count) or 0)
 
-    return schemas.ItemStatsOut(
-        item_id=str(item.id),
-        code=item.code,
-        name=item.name,
-        avg_a=float(avg_a or 0),
-        avg_b=float(avg_b or 0),
-        avg_c=float(avg_c or 0),
-        avg_d=float(avg_d or 0),
-        avg_n=float(avg_n or 0),
-        avg_total=float(avg_total or 0),
-        ratings=ratings,
-    )
+    ratings = base_query.order_by(models.Rating.created_at.desc()).limit(10).all()
 
+    return {
+        "item_id": str(item.id),
+        "code": item.code,
+        "name": item.name,
+        "avg_a": _item_avg("sum_a"),
+        "avg_b": _item_avg("sum_b"),
+        "avg_c": _item_avg("sum_c"),
+        "avg_d": _item_avg("sum_d"),
+        "avg_n": _item_avg("sum_n"),
+        "avg_total": _item_avg("sum_score"),
+        "ratings": [_rating_out(r) for r in ratings],
+    }
+
+
+SUMMARY_FIELDS = (
+    ("id", "code", "name")
+    + tuple(f"my_best_{m}" for m in OUT_METRICS)
+    + tuple(f"my_avg_{m}" for m in OUT_METRICS)
+    + ("global_best_total", "global_avg_total")
+)
+# Siempre presentes: id identifica la fila y code es obligatorio en ItemSummaryOut.
+SUMMARY_KEY_FIELDS = ("id", "code")
+
+
+def summary_fields(fields: Optional[Sequence[str]] = None) -> List[str]:
+    if fields is None:
+        return list(SUMMARY_FIELDS)
+    return [f for f in SUMMARY_FIELDS if f in fields or f in SUMMARY_KEY_FIELDS]
+
+
+def get_items_summary(
+    db: Session, range_name: str, user: models.User, fields: Optional[Sequence[str]] = None
+) -> List[dict]:
+    # Con fields solo se agregan las columnas pedidas (p. ej. la app movil solo usa my_best_total).
+    wanted = summary_fields(fields)
+    best = [m for m in OUT_METRICS if f"my_best_{m}" in wanted]
+    avg = [m for m in OUT_METRICS if f"my_avg_{m}" in wanted]
+    global_best = user.is_admin and "global_best_total" in wanted
+    global_avg = user.is_admin and "global_avg_total" in wanted
 
-def get_items_summary(db: Session, range_name: str, user: models.User) -> List[schemas.ItemSummaryOut]:
     start = _range_start(range_name)
     if start:
-        join_cond = and_(models.Rating.item_id == models.Item.id, models.Rating.created_at >= start)
+        join_cond = and_(models.Rating.item_pk == models.Item.pk, models.Rating.created_at >= start)
     else:
-        join_cond = models.Rating.item_id == models.Item.id
+        join_cond = models.Rating.item_pk == models.Item.pk
 
-    total_expr = (models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d + models.Rating.n)
+    total_expr = models.Rating.total
 
-    user_join = and_(join_cond, models.Rating.user_id == user.id)
+    user_join = and_(join_cond, models.Rating.user_pk == user.pk)
 
-    def _my_max(expr):
-        return func.max(case((user_join, expr), else_=None))
+    def _mine(expr):
+        return case((user_join, expr), else_=None)
 
-    rows = (
-        db.query(
-            models.Item.id.label("item_id"),
-            models.Item.code.label("code"),
-            models.Item.name.label("name"),
-            _my_max(total_expr).label("my_best_total"),
-            _my_max(models.Rating.a).label("my_best_a"),
-            _my_max(models.Rating.b).label("my_best_b"),
-            _my_max(models.Rating.c).label("my_best_c"),
-            _my_max(models.Rating.d).label("my_best_d"),
-            _my_max(models.Rating.n).label("my_best_n"),
-            func.avg(case((user_join, total_expr), else_=None)).label("my_avg_total"),
-            func.avg(case((user_join, models.Rating.a), else_=None)).label("my_avg_a"),
-            func.avg(case((user_join, models.Rating.b), else_=None)).label("my_avg_b"),
-            func.avg(case((user_join, models.Rating.c), else_=None)).label("my_avg_c"),
-            func.avg(case((user_join, models.Rating.d), else_=None)).label("my_avg_d"),
-            func.avg(case((user_join, models.Rating.n), else_=None)).label("my_avg_n"),
-            func.max(total_expr).label("global_best_total"),
-            func.avg(total_expr).label("global_avg_total"),
-        )
-        .outerjoin(models.Rating, join_cond)
-        .group_by(models.Item.id)
-        .order_by(models.Item.code.asc())
-        .all()
+    aggregates = []
+    if avg:
+        aggregates.append(func.count(_mine(1)).label("my_cnt"))
+    aggregates += [func.max(_mine(getattr(models.Rating, m))).label(f"my_max_{m}") for m in best]
+    aggregates += [func.sum(_mine(getattr(models.Rating, m))).label(f"my_sum_{m}") for m in avg]
+    if global_avg:
+        aggregates.append(func.count(models.Rating.item_pk).label("global_cnt"))
+        aggregates.append(func.sum(total_expr).label("global_sum_total"))
+    if global_best:
+        aggregates.append(func.max(total_expr).label("global_max_total"))
+
+    query = db.query(
+        models.Item.pk.label("item_pk"),
+        models.Item.id.label("item_id"),
+        models.Item.code.label("code"),
+        models.Item.name.label("name"),
+        *aggregates,
     )
+    if aggregates:
+        query = query.outerjoin(models.Rating, join_cond).group_by(models.Item.pk)
+    rows = query.order_by(models.Item.code.asc()).all()
+    mine_archived = {} if start or not (best or avg) else _archived_by_item(db, models.RatingRollup.user_pk == user.pk)
+    all_archived = {} if start or not (global_best or global_avg) else _archived_by_item(db)
 
     def _f(value):
         return float(value) if value is not None else None
 
     results = []
     for r in rows:
-        data = {
-            "id": str(r.item_id),
-            "code": r.code,
-            "name": r.name,
-            "my_best_total": _f(r.my_best_total),
-            "my_best_a": _f(r.my_best_a),
-            "my_best_b": _f(r.my_best_b),
-            "my_best_c": _f(r.my_best_c),
-            "my_best_d": _f(r.my_best_d),
-            "my_best_n": _f(r.my_best_n),
-            "my_avg_total": _f(r.my_avg_total),
-            "my_avg_a": _f(r.my_avg_a),
-            "my_avg_b": _f(r.my_avg_b),
-            "my_avg_c": _f(r.my_avg_c),
-            "my_avg_d": _f(r.my_avg_d),
-            "my_avg_n": _f(r.my_avg_n),
-            "global_best_total": _f(r.global_best_total) if user.is_admin else None,
-            "global_avg_total": _f(r.global_avg_total) if user.is_admin else None,
-        }
-        results.append(schemas.ItemSummaryOut(**data))
+        mine = mine_archived.get(r.item_pk)
+        data = {"id": str(r.item_id), "code": r.code}
+        if "name" in wanted:
+            data["name"] = r.name
+        for m in best:
+            data[f"my_best_{m}"] = _f(_max(getattr(r, f"my_max_{m}"), getattr(mine, f"max_{m}", None)))
+        if avg:
+            my_cnt = r.my_cnt + (mine.cnt if mine else 0)
+        for m in avg:
+            my_sum = (getattr(r, f"my_sum_{m}") or 0) + (getattr(mine, f"sum_{m}") if mine else 0)
+            data[f"my_avg_{m}"] = _f(_avg(my_sum, my_cnt))
+        overall = all_archived.get(r.item_pk)
+        if "global_best_total" in wanted:
+            data["global_best_total"] = None
+            if global_best:
+                data["global_best_total"] = _f(_max(r.global_max_total, getattr(overall, "max_total", None)))
+        if "global_avg_total" in wanted:
+            data["global_avg_total"] = None
+            if global_avg:
+                global_cnt = r.global_cnt + (overall.cnt if overall else 0)
+                global_sum = (r.global_sum_total or 0) + (overall.sum_total if overall else 0)
+                data["global_avg_total"] = _f(_avg(global_sum, global_cnt))
+        results.append(data)
     return results
 
 
+def summary_columnar(rows: List[dict], fields: Optional[Sequence[str]] = None) -> dict:
+    # Un array por campo; id/code/name en "items" y el resto en "columns", alineados por posicion.
+    wanted = summary_fields(fields)
+    items = {f: [row[f] for row in rows] for f in wanted if f in ("id", "code", "name")}
+    columns = {f: [row[f] for row in rows] for f in wanted if f not in items}
+    return {"items": items, "columns": columns}
+
+
 def _profile_alias(username: str) -> str:
     mapping = {"p1": "1", "p2": "2", "p3": "3", "p4": "4"}
     return mapping.get(username, "u")
 
 
-def get_ratings_summary(db: Session, item_id: str, user: models.User) -> schemas.RatingsSummaryOut:
+def get_ratings_summary(db: Session, item_id: str, user: models.User) -> dict:
+    item_pk = _item_pk(item_id)
     has_own = (
         db.query(models.Rating.id)
-        .filter(models.Rating.item_id == item_id, models.Rating.user_id == user.id)
+        .filter(models.Rating.item_pk == item_pk, models.Rating.user_pk == user.pk)
         .first()
     )
     if not has_own:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail="RATE_FIRST_TO_VIEW_OTHERS")
 
-    others_query = (
-        db.query(models.Rating)
-        .filter(models.Rating.item_id == item_id, models.Rating.user_id != user.id)
-        .order_by(models.Rating.created_at.desc())
+    others_filter = (models.Rating.item_pk == item_pk, models.Rating.user_pk != user.pk)
+    live = db.query(
+        func.count().label("cnt"),
+        *[func.sum(getattr(models.Rating, m)).label(f"sum_{m}") for m in METRICS],
+        *[func.max(getattr(models.Rating, m)).label(f"max_{m}") for m in METRICS],
+    ).filter(*others_filter).first()
+    archived = _archived_by_item(
+        db, models.RatingRollup.item_pk == item_pk, models.RatingRollup.user_pk != user.pk
     )
-
-    others = others_query.all()
-    others_count = len(others)
+    extra = next(iter(archived.values()), None)
+    others_count = live.cnt + (extra.cnt if extra else 0)
 
     if others_count == 0:
-        return schemas.RatingsSummaryOut(
-            item_id=str(item_id),
-            others_count=0,
-            others_avg={},
-            others_best={},
-            others_last=[],
-        )
+        return {
+            "item_id": str(item_id),
+            "others_count": 0,
+            "others_avg": {},
+            "others_best": {},
+            "others_last": [],
+        }
 
-    total_expr = models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d + models.Rating.n
-    agg = db.query(
-        func.avg(models.Rating.a),
-        func.avg(models.Rating.b),
-        func.avg(models.Rating.c),
-        func.avg(models.Rating.d),
-        func.avg(models.Rating.n),
-        func.avg(total_expr),
-        func.max(models.Rating.a),
-        func.max(models.Rating.b),
-        func.max(models.Rating.c),
-        func.max(models.Rating.d),
-        func.max(models.Rating.n),
-        func.max(total_expr),
-    ).filter(models.Rating.item_id == item_id, models.Rating.user_id != user.id)
-
-    (avg_a, avg_b, avg_c, avg_d, avg_n, avg_total,
-     best_a, best_b, best_c, best_d, best_n, best_total) = agg.first()
+    others_avg = {}
+    others_best = {}
+    for m in METRICS:
+        total = (getattr(live, f"sum_{m}") or 0) + (getattr(extra, f"sum_{m}") if extra else 0)
+        others_avg[m] = float(_avg(total, others_count) or 0)
+        others_best[m] = float(_max(getattr(live, f"max_{m}"), getattr(extra, f"max_{m}", None)) or 0)
+
+    others = (
+        db.query(models.Rating)
+        .filter(*others_filter)
+        .order_by(models.Rating.created_at.desc())
+        .limit(10)
+        .all()
+    )
 
     others_last = []
-    user_rows = db.query(models.User.id, models.User.username).all()
-    user_map = {str(uid): uname for uid, uname in user_rows}
-    for r in others[:10]:
-        profile_alias = _profile_alias(user_map.get(str(r.user_id), ""))
+    user_rows = db.query(models.User.pk, models.User.username).all()
+    user_map = {upk: uname for upk, uname in user_rows}
+    for r in others:
+        profile_alias = _profile_alias(user_map.get(r.user_pk, ""))
         others_last.append({
             "profile": profile_alias,
             "a": r.a,
@@ -212,34 +323,20 @@ def get_ratings_summary(db: Session, item_id: str, user: models.User) -> schemas
             "c": r.c,
             "d": r.d,
             "n": r.n,
-            "total": r.a + r.b + r.c + r.d + r.n,
+            "total": r.total,
             "created_at": r.created_at.isoformat(),
         })
 
-    return schemas.RatingsSummaryOut(
-        item_id=str(item_id),
-        others_count=others_count,
-        others_avg={
-            "a": float(avg_a or 0),
-            "b": float(avg_b or 0),
-            "c": float(avg_c or 0),
-            "d": float(avg_d or 0),
-            "n": float(avg_n or 0),
-            "total": float(avg_total or 0),
-        },
-        others_best={
-            "a": float(best_a or 0),
-            "b": float(best_b or 0),
-            "c": float(best_c or 0),
-            "d": float(best_d or 0),
-            "n": float(best_n or 0),
-            "total": float(best_total or 0),
-        },
-        others_last=others_last,
-    )
+    return {
+        "item_id": str(item_id),
+        "others_count": others_count,
+        "others_avg": others_avg,
+        "others_best": others_best,
+        "others_last": others_last,
+    }
 
 
-def get_item_detail(db: Session, item_id: str, user: models.User) -> schemas.ItemDetailOut:
+def get_item_detail(db: Session, item_id: str, user: models.User) -> dict:
     item = db.query(models.Item).filter(models.Item.id == item_id).first()
     if not item:
         from fastapi import HTTPException
@@ -247,7 +344,7 @@ def get_item_detail(db: Session, item_id: str, user: models.User) -> schemas.Ite
 
     my_rating = (
         db.query(models.Rating)
-        .filter(models.Rating.item_id == item_id, models.Rating.user_id == user.id)
+        .filter(models.Rating.item_pk == item.pk, models.Rating.user_pk == user.pk)
         .order_by(models.Rating.created_at.desc())
         .first()
     )
@@ -264,71 +361,83 @@ def get_item_detail(db: Session, item_id: str, user: models.User) -> schemas.Ite
             if u:
                 r = (
                     db.query(models.Rating)
-                    .filter(models.Rating.item_id == item_id, models.Rating.user_id == u.id)
+                    .filter(models.Rating.item_pk == item.pk, models.Rating.user_pk == u.pk)
                     .order_by(models.Rating.created_at.desc())
                     .first()
                 )
                 if r:
-                    rating_obj = schemas.RatingInline(
-                        a=r.a,
-                        b=r.b,
-                        c=r.c,
-                        d=r.d,
-                        n=r.n,
-                        total=r.a + r.b + r.c + r.d + r.n,
-                        created_at=r.created_at,
-                    )
-        ratings_by_profile.append(schemas.ProfileRating(profile=profile_num, rating=rating_obj))
-
-    my_rating_out = None
-    if my_rating:
-        my_rating_out = schemas.RatingInline(
-            a=my_rating.a,
-            b=my_rating.b,
-            c=my_rating.c,
-            d=my_rating.d,
-            n=my_rating.n,
-            total=my_rating.a + my_rating.b + my_rating.c + my_rating.d + my_rating.n,
-            created_at=my_rating.created_at,
-        )
-
-    return schemas.ItemDetailOut(
-        item={"id": str(item.id), "code": item.code, "name": item.name},
-        my_rating=my_rating_out,
-        ratings_by_profile=ratings_by_profile,
-        can_view_others=can_view_others,
+                    rating_obj = _rating_inline(r)
+        ratings_by_profile.append({"profile": profile_num, "rating": rating_obj})
+
+    return {
+        "item": {"id": str(item.id), "code": item.code, "name": item.name},
+        "my_rating": _rating_inline(my_rating) if my_rating else None,
+        "ratings_by_profile": ratings_by_profile,
+        "can_view_others": can_view_others,
+    }
+
+
+def get_rankings(db: Session, user: models.User, mode: str, fields: Optional[Sequence[str]] = None) -> dict:
+    # Una sola consulta: ratings vivos y rollups se juntan por item con UNION ALL y cada metrica se
+    # ordena en la base con row_number(); solo vuelven las filas que entran en algun top 50.
+    metrics = [m for m in OUT_METRICS if fields is None or m in fields]
+    if not metrics:
+        return {}
+    rating, rollup = models.Rating, models.RatingRollup
+    # Desde items, como antes: el planner recorre items y busca sus ratings por indice.
+    live = select(models.Item.pk.label("item_pk"), func.count().label("cnt")).join_from(
+        models.Item, rating, rating.item_pk == models.Item.pk
     )
+    archived = select(rollup.item_pk.label("item_pk"), rollup.cnt.label("cnt"))
+    if mode == "mine":
+        live = live.add_columns(*[func.max(getattr(rating, m)).label(m) for m in metrics])
+        archived = archived.add_columns(*[getattr(rollup, f"max_{m}").label(m) for m in metrics])
+        live = live.where(rating.user_pk == user.pk)
+        archived = archived.where(rollup.user_pk == user.pk)
+    else:
+        live = live.add_columns(*[func.sum(getattr(rating, m)).label(m) for m in metrics])
+        archived = archived.add_columns(*[getattr(rollup, f"sum_{m}").label(m) for m in metrics])
+    parts = union_all(live.group_by(models.Item.pk), archived).subquery()
 
-
-def get_rankings(db: Session, user: models.User, mode: str) -> schemas.RankingsOut:
-    total_expr = (models.Rating.a + models.Rating.b + models.Rating.c + models.Rating.d + models.Rating.n)
-    base = db.query(models.Item.id.label("item_id"), models.Item.code.label("code"))
-
-    def _rank_for(expr):
-        query = base.join(models.Rating, models.Rating.item_id == models.Item.id)
-        if mode == "mine":
-            query = query.filter(models.Rating.user_id == user.id)
-            value_expr = func.max(expr)
-        else:
-            value_expr = func.avg(expr)
-        rows = (
-            query
-            .group_by(models.Item.id)
-            .order_by(value_expr.desc())
-            .with_entities(models.Item.id, models.Item.code, value_expr.label("value"))
-            .limit(50)
-            .all()
+    if mode == "mine":
+        values = [func.max(parts.c[m]).label(m) for m in metrics]
+    else:
+        values = [(cast(func.sum(parts.c[m]), Float) / func.sum(parts.c.cnt)).label(m) for m in metrics]
+    merged = select(parts.c.item_pk, *values).group_by(parts.c.item_pk).subquery()
+    ranked = (
+        db.query(
+            models.Item.id.label("item_id"),
+            models.Item.code.label("code"),
+            *[merged.c[m] for m in metrics],
+            *[
+                func.row_number().over(order_by=(merged.c[m].desc(), models.Item.code)).label(f"rank_{m}")
+                for m in metrics
+            ],
         )
-        return [
-            schemas.RankingEntryOut(item_id=str(r.item_id), code=r.code, value=float(r.value or 0))
-            for r in rows
-        ]
-
-    return schemas.RankingsOut(
-        total=_rank_for(total_expr),
-        a=_rank_for(models.Rating.a),
-        b=_rank_for(models.Rating.b),
-        c=_rank_for(models.Rating.c),
-        d=_rank_for(models.Rating.d),
-        n=_rank_for(models.Rating.n),
+        .join(merged, merged.c.item_pk == models.Item.pk)
+        .subquery()
     )
+    rows = db.query(ranked).filter(or_(*[ranked.c[f"rank_{m}"] <= RANKING_LIMIT for m in metrics])).all()
+
+    def _top(m):
+        top = sorted((r for r in rows if getattr(r, f"rank_{m}") <= RANKING_LIMIT), key=lambda r: getattr(r, f"rank_{m}"))
+        return [{"item_id": str(r.item_id), "code": r.code, "value": float(getattr(r, m) or 0)} for r in top]
+
+    return {m: _top(m) for m in metrics}
+
+
+def rankings_columnar(rankings: dict) -> dict:
+    # Un item aparece en varias listas: cada lista guarda su posicion en "items", no el UUID.
+    items = {"item_id": [], "code": []}
+    positions = {}
+    columns = {}
+    for metric, entries in rankings.items():
+        indexes = []
+        for e in entries:
+            if e["item_id"] not in positions:
+                positions[e["item_id"]] = len(items["item_id"])
+                items["item_id"].append(e["item_id"])
+                items["code"].append(e["code"])
+            indexes.append(positions[e["item_id"]])
+        columns[metric] = {"item": indexes, "value": [e["value"] for e in entries]}
+    return {"items": items, "columns": columns}
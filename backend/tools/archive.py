@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app import archive
+from app.database import SessionLocal, make_engine
+from tools.bench import _pick_fixtures, stats_cases
+
+
+def _round(value):
+    # Las sumas parciales cambian el orden de la aritmetica flotante: se comparan 9 decimales.
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, list):
+        return [_round(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _round(v) for k, v in value.items()}
+    return value
+
+
+def snapshot(fixtures: dict) -> dict:
+    results = {}
+    for name, fn in stats_cases(fixtures).items():
+        db = SessionLocal()
+        try:
+            result = fn(db)
+        finally:
+            db.close()
+        results[name] = _round(jsonable_encoder(result))
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compacta ratings antiguos en rating_rollups y los mueve a ratings_archive.")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./app.db"))
+    parser.add_argument("--older-than-days", type=int, default=archive.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--keep-recent", type=int, default=archive.KEEP_RECENT)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--dry-run", action="store_true", help="solo cuenta las filas que se archivarian")
+    parser.add_argument("--verify", action="store_true", help="compara los resultados de stats antes y despues")
+    args = parser.parse_args(argv)
+    if args.older_than_days < archive.MIN_ARCHIVE_DAYS:
+        parser.error(f"--older-than-days debe ser >= {archive.MIN_ARCHIVE_DAYS}")
+    if args.keep_recent < archive.KEEP_RECENT:
+        parser.error(f"--keep-recent debe ser >= {archive.KEEP_RECENT}")
+
+    engine = make_engine(args.database_url)
+    SessionLocal.configure(bind=engine)
+
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+            count = len(archive.archive_candidates(db, cutoff, args.keep_recent))
+        finally:
+            db.close()
+        print(f"ARCHIVE: {count} ratings anteriores a {cutoff.isoformat()} (dry run)")
+        return
+
+    fixtures = _pick_fixtures(engine) if args.verify else None
+    before = snapshot(fixtures) if args.verify else None
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        result = archive.archive_ratings(
+            db,
+            older_than_days=args.older_than_days,
+            keep_recent=args.keep_recent,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db.close()
+    print(f"ARCHIVE: {result['archived']} ratings anteriores a {result['cutoff']} en {time.perf_counter() - started:.1f}s")
+
+    if args.verify:
+        after = snapshot(fixtures)
+        changed = [name for name in before if before[name] != after[name]]
+        for name in changed:
+            print(f"  DIFERENTE: {name}")
+        if changed:
+            sys.exit(1)
+        print(f"  {len(before)} resultados de stats identicos")
+
+
+if __name__ == "__main__":
+    main()
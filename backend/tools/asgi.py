@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+# Cliente minimo para invocar la app ASGI en proceso, sin sockets ni dependencias extra.
+class AsgiClient:
+    def __init__(self, app, headers: Optional[dict] = None):
+        self.app = app
+        self.headers = dict(headers or {})
+        self._loop = asyncio.new_event_loop()
+
+    def close(self) -> None:
+        self._loop.close()
+
+    def request(self, method: str, path: str, body: bytes = b"", headers: Optional[dict] = None) -> tuple[int, dict, bytes]:
+        return self._loop.run_until_complete(self._call(method, path, body, {**self.headers, **(headers or {})}))
+
+    async def _call(self, method: str, path: str, body: bytes, headers: dict) -> tuple[int, dict, bytes]:
+        url = urlsplit(path)
+        raw_headers = [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()]
+        if body:
+            raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": url.path,
+            "raw_path": url.path.encode("latin-1"),
+            "query_string": url.query.encode("latin-1"),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        sent = False
+        status = 0
+        response_headers: dict = {}
+        chunks: list[bytes] = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", []):
+                    response_headers[key.decode("latin-1")] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, response_headers, b"".join(chunks)
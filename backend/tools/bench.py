@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+
+import sqlalchemy
+from sqlalchemy import func
+
+from app import models, responses, stats
+from app.auth import create_access_token
+from app.database import SessionLocal, make_engine
+from tools.asgi import AsgiClient
+from tools.seed import reset_schema, seed
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> dict:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p95_ms": round(samples[p95_index], 3),
+    }
+
+
+def _with_session(fn: Callable) -> Callable[[], object]:
+    def _run():
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    return _run
+
+
+def _pick_fixtures(engine) -> dict:
+    with engine.connect() as conn:
+        users = {
+            row.username: row
+            for row in conn.execute(
+                sqlalchemy.select(models.User.__table__).where(models.User.username.in_(["p1", "p3"]))
+            )
+        }
+        p1 = users["p1"]
+        keys = dict(conn.execute(sqlalchemy.select(models.User.id, models.User.pk).where(models.User.username.in_(["p1", "p3"]))).all())
+        p1_key = keys[p1.id]
+        # Item mas votado entre los que p1 ya ha puntuado (get_ratings_summary exige voto propio).
+        item_id = conn.execute(
+            sqlalchemy.select(models.Item.id)
+            .join(models.Rating, models.Rating.item_pk == models.Item.pk)
+            .where(models.Rating.item_pk.in_(
+                sqlalchemy.select(models.Rating.item_pk).where(models.Rating.user_pk == p1_key)
+            ))
+            .group_by(models.Item.pk)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+    return {"user": p1, "admin": users["p3"], "user_key": p1_key, "admin_key": keys[users["p3"].id], "item_id": item_id}
+
+
+def stats_cases(fixtures: dict) -> dict[str, Callable]:
+    item_id = fixtures["item_id"]
+    cases: dict[str, Callable] = {}
+    for range_name in ("7", "30", "all"):
+        cases[f"stats.get_ranking[{range_name}]"] = lambda db, r=range_name: stats.get_ranking(db, r)
+        cases[f"stats.get_items_summary[{range_name}]"] = (
+            lambda db, r=range_name: stats.get_items_summary(db, r, db.get(models.User, fixtures["user_key"]))
+        )
+    cases["stats.get_items_summary[all,admin]"] = (
+        lambda db: stats.get_items_summary(db, "all", db.get(models.User, fixtures["admin_key"]))
+    )
+    if item_id:
+        cases["stats.get_item_stats[all]"] = lambda db: stats.get_item_stats(db, item_id, "all")
+        cases["stats.get_ratings_summary"] = (
+            lambda db: stats.get_ratings_summary(db, item_id, db.get(models.User, fixtures["user_key"]))
+        )
+        cases["stats.get_item_detail"] = (
+            lambda db: stats.get_item_detail(db, item_id, db.get(models.User, fixtures["user_key"]))
+        )
+    for mode in ("global", "mine"):
+        cases[f"stats.get_rankings[{mode}]"] = (
+            lambda db, m=mode: stats.get_rankings(db, db.get(models.User, fixtures["user_key"]), m)
+        )
+    return cases
+
+
+def route_cases(fixtures: dict) -> dict[str, str]:
+    item_id = fixtures["item_id"]
+    routes = {
+        "GET /items": "/items",
+        "GET /items/summary?range=all": "/items/summary?range=all",
+        "GET /items/summary?range=7": "/items/summary?range=7",
+        "GET /stats/ranking?range=all": "/stats/ranking?range=all",
+        "GET /rankings?mode=global": "/rankings?mode=global",
+        "GET /rankings?mode=mine": "/rankings?mode=mine",
+        # Lo que piden la app movil y la PWA.
+        "GET /items/summary?format=columnar": "/items/summary?range=all&format=columnar&fields=my_best_total",
+        "GET /rankings?format=columnar": "/rankings?mode=global&format=columnar",
+    }
+    if item_id:
+        routes["GET /items/{id}/detail"] = f"/items/{item_id}/detail"
+        routes["GET /items/{id}/others"] = f"/items/{item_id}/others"
+        routes["GET /items/{id}/stats?range=all"] = f"/items/{item_id}/stats?range=all"
+    return routes
+
+
+def storage_sizes(engine) -> dict:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            row = conn.execute(sqlalchemy.text(
+                "SELECT pg_table_size('ratings'), pg_indexes_size('ratings'), pg_database_size(current_database())"
+            )).one()
+            return {"ratings_table": row[0], "ratings_indexes": row[1], "database": row[2]}
+        # dbstat da el tamano por tabla/indice; tbl_name agrupa los indices bajo su tabla.
+        rows = conn.execute(sqlalchemy.text(
+            "SELECT m.type, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+            "WHERE m.tbl_name = 'ratings' GROUP BY m.type"
+        )).all()
+        sizes = dict(rows)
+        page_size = conn.execute(sqlalchemy.text("PRAGMA page_size")).scalar()
+        page_count = conn.execute(sqlalchemy.text("PRAGMA page_count")).scalar()
+    return {"ratings_table": sizes.get("table", 0), "ratings_indexes": sizes.get("index", 0), "database": page_size * page_count}
+
+
+def run_scale(engine, ratings: int, args) -> dict:
+    reset_schema(engine)
+    started = time.perf_counter()
+    counts = seed(engine, users=args.users, items=args.items, ratings=ratings, days=args.days, seed_value=args.seed)
+    seed_seconds = time.perf_counter() - started
+    for index_name in args.drop_index:
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS {index_name}"))
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text("ANALYZE"))
+    storage = storage_sizes(engine)
+    print("  " + "  ".join(f"{key}={value / 1048576:.1f} MiB" for key, value in storage.items()))
+
+    SessionLocal.configure(bind=engine)
+    fixtures = _pick_fixtures(engine)
+    results: dict[str, dict] = {}
+
+    for name, fn in stats_cases(fixtures).items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = _timeit(_with_session(fn), args.repeat)
+        print(f"  {name:<42} {results[name]['median_ms']:>10.2f} ms")
+
+    from app.main import app
+
+    client = AsgiClient(app, headers={"Authorization": f"Bearer {create_access_token(str(fixtures['user'].id))}"})
+    fast_json = responses.FAST_JSON
+    try:
+        for name, path in route_cases(fixtures).items():
+            if args.only and args.only not in name:
+                continue
+            responses.FAST_JSON = False
+            status, _headers, body = client.request("GET", path)
+            if status != 200:
+                print(f"  {name:<42} HTTP {status}: {body[:120]!r}")
+                continue
+            results[name] = _timeit(lambda p=path: client.request("GET", p), args.repeat)
+            results[name]["bytes"] = len(body)
+            print(f"  {name:<42} {results[name]['median_ms']:>10.2f} ms")
+            if not args.fast_json:
+                continue
+            # Misma ruta sin pasar por response_model: el cuerpo tiene que salir identico.
+            responses.FAST_JSON = True
+            fast_name = f"{name} [fast-json]"
+            _status, _headers, fast_body = client.request("GET", path)
+            results[fast_name] = _timeit(lambda p=path: client.request("GET", p), args.repeat)
+            results[fast_name]["bytes"] = len(fast_body)
+            results[fast_name]["same_body"] = fast_body == body
+            ratio = results[fast_name]["median_ms"] / results[name]["median_ms"]
+            marker = "" if fast_body == body else "  <-- CUERPO DIFERENTE"
+            print(f"  {fast_name:<42} {results[fast_name]['median_ms']:>10.2f} ms  x{ratio:.2f}{marker}")
+    finally:
+        responses.FAST_JSON = fast_json
+        client.close()
+
+    return {"seed": {**counts, "seconds": round(seed_seconds, 2)}, "storage": storage, "cases": results}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for scale, data in current["scales"].items():
+        base_storage = baseline.get("scales", {}).get(scale, {}).get("storage", {})
+        for key, size in data.get("storage", {}).items():
+            if base_storage.get(key):
+                print(f"{scale:>9} {key:<42} {base_storage[key] / 1048576:>10.1f} -> {size / 1048576:>10.1f} MiB x{size / base_storage[key]:.2f}")
+        base_cases = baseline.get("scales", {}).get(scale, {}).get("cases", {})
+        for name, result in data["cases"].items():
+            base = base_cases.get(name)
+            if not base or not base.get("median_ms"):
+                continue
+            ratio = result["median_ms"] / base["median_ms"]
+            marker = ""
+            if ratio > 1.0 + threshold:
+                marker = "  <-- REGRESION"
+                regressions.append(f"{scale} {name}")
+            print(f"{scale:>9} {name:<42} {base['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} ms  x{ratio:.2f}{marker}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de las funciones de stats y rutas calientes.")
+    parser.add_argument("--database-url", default=None, help="por defecto SQLite temporal; en Postgres BORRA el esquema")
+    parser.add_argument("--scales", default="1000,10000,100000", help="numero de ratings por escala, separados por coma")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default=None, help="solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--fast-json", action="store_true", help="mide tambien cada ruta con FAST_JSON y compara")
+    parser.add_argument("--drop-index", action="append", default=[], help="indice a eliminar tras generar (medicion 'antes')")
+    parser.add_argument("--output", default=None, help="fichero JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecucion anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento relativo tolerado en --compare")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "drop_index": args.drop_index,
+            "compact_keys": models.COMPACT_KEYS,
+            "orjson": responses.orjson is not None,
+        },
+        "scales": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ratings in scales:
+            url = args.database_url or f"sqlite:///{os.path.join(tmp, f'bench_{ratings}.db')}"
+            engine = make_engine(url)
+            report["meta"]["dialect"] = engine.dialect.name
+            print(f"== {ratings} ratings ({engine.dialect.name})")
+            report["scales"][str(ratings)] = run_scale(engine, ratings, args)
+            engine.dispose()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regresiones por encima de x{1.0 + args.threshold:.2f}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import os
+import re
+
+from app.compression import brotli
+
+DEFAULT_WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "web")
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".css", ".json", ".svg", ".txt", ".webmanifest")
+# Los ficheros de ASSETS en service-worker.js; su hash da nombre a la cache estatica del worker.
+SERVICE_WORKER = "service-worker.js"
+VERSIONED_ASSETS = ("index.html", "styles.css", "app.js", "manifest.json")
+_ASSETS_VERSION = re.compile(r'^(const ASSETS_VERSION = ")[0-9a-f]*(";)$', re.MULTILINE)
+
+
+def assets_version(web_dir: str) -> str:
+    digest = hashlib.sha256()
+    for name in VERSIONED_ASSETS:
+        with open(os.path.join(web_dir, name), "rb") as f:
+            digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()[:10]
+
+
+def stamp_service_worker(web_dir: str) -> str:
+    # Va antes de comprimir: el .gz/.br del worker debe llevar ya la version nueva.
+    version = assets_version(web_dir)
+    path = os.path.join(web_dir, SERVICE_WORKER)
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    stamped, count = _ASSETS_VERSION.subn(lambda m: f"{m.group(1)}{version}{m.group(2)}", source)
+    if count != 1:
+        raise ValueError(f"{SERVICE_WORKER} no tiene una linea 'const ASSETS_VERSION = \"...\";'")
+    if stamped != source:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(stamped)
+    return version
+
+
+def _write_if_smaller(path: str, original: bytes, compressed: bytes) -> int:
+    # Un .gz que no ahorra bytes no se sirve: se borra el que hubiera de una build anterior.
+    if len(compressed) >= len(original):
+        if os.path.exists(path):
+            os.remove(path)
+        return 0
+    with open(path, "wb") as f:
+        f.write(compressed)
+    return len(compressed)
+
+
+def build(web_dir: str, gzip_level: int = 9, brotli_level: int = 11) -> list[tuple[str, int, int, int]]:
+    results = []
+    for root, _dirs, files in os.walk(web_dir):
+        for name in sorted(files):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                original = f.read()
+            # mtime=0: la misma entrada produce siempre el mismo .gz.
+            gz_size = _write_if_smaller(f"{path}.gz", original, gzip.compress(original, compresslevel=gzip_level, mtime=0))
+            br_size = 0
+            if brotli is not None:
+                br_size = _write_if_smaller(f"{path}.br", original, brotli.compress(original, quality=brotli_level))
+            results.append((os.path.relpath(path, web_dir), len(original), gz_size, br_size))
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Versiona la cache del service worker y precomprime (gzip y brotli) los ficheros de web/."
+    )
+    parser.add_argument("--web-dir", default=os.getenv("WEB_DIR", DEFAULT_WEB_DIR))
+    parser.add_argument("--gzip-level", type=int, default=9)
+    parser.add_argument("--brotli-level", type=int, default=11)
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.web_dir):
+        parser.error(f"no existe el directorio {args.web_dir}")
+
+    print(f"ASSETS_VERSION = {stamp_service_worker(args.web_dir)}")
+    if brotli is None:
+        print("brotli no esta instalado: solo se generan .gz")
+    for name, size, gz_size, br_size in build(args.web_dir, args.gzip_level, args.brotli_level):
+        print(f"  {name:<28} {size:>8} B  gz={gz_size or '-':>7}  br={br_size or '-':>7}")
+
+
+if __name__ == "__main__":
+    main()
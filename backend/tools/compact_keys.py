@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Convierte users/items/ratings (y rollups, archivo e idempotency keys) entre claves UUID y compactas."
+    )
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./app.db"))
+    parser.add_argument("--to", choices=("compact", "uuid"), required=True, help="esquema de claves de destino")
+    args = parser.parse_args(argv)
+
+    # models lee COMPACT_KEYS al importarse y define el esquema de destino: se fija antes de importar app.
+    os.environ["COMPACT_KEYS"] = "1" if args.to == "compact" else "0"
+    from app.compact_keys import KEY_TABLES, convert_keys, is_compact
+    from app.database import make_engine
+
+    engine = make_engine(args.database_url)
+    with engine.connect() as conn:
+        current = is_compact(conn)
+    if current is None:
+        print("COMPACT_KEYS: base sin tablas; arranca la API con la variable que quieras y create_all la crea")
+        return
+    if current == (args.to == "compact"):
+        print(f"COMPACT_KEYS: la base ya usa claves {args.to}, nada que hacer")
+        return
+
+    started = time.perf_counter()
+    # Si alguna tabla no conserva todas sus filas, convert_keys falla y la transaccion se deshace.
+    counts = convert_keys(engine)
+    print(f"COMPACT_KEYS: convertida a claves {args.to} en {time.perf_counter() - started:.1f}s")
+    for table in KEY_TABLES:
+        print(f"  {table}: {counts[table]} filas")
+    print(f"Arranca la API (y alembic/tools) con COMPACT_KEYS={1 if args.to == 'compact' else 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Optional
+
+from app.auth import SECRET_KEY
+from app.bootstrap import BOOTSTRAP_USERS
+from tools.seed import SEED_PASSWORD
+
+# Mezcla por defecto, modelada sobre las llamadas de ApiClient en la app movil.
+DEFAULT_MIX = "items=40,summary=15,detail=20,rate=10,others=10,login=5"
+
+
+class HttpConnection:
+    def __init__(self, host: str, port: int, keepalive: bool = True):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method: str, path: str, headers: dict, body: bytes = b"") -> tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        if not self.keepalive:
+            lines.append("Connection: close")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self._writer.drain()
+        try:
+            status, response_headers, payload = await self._read_response()
+        except Exception:
+            await self.close()
+            raise
+        if not self.keepalive or response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, payload
+
+    async def _read_response(self) -> tuple[int, dict, bytes]:
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            return status, headers, b"".join(chunks)
+        length = int(headers.get("content-length", "0"))
+        payload = await reader.readexactly(length) if length else b""
+        return status, headers, payload
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.failures: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed_ms: float, status: int) -> None:
+        self.latencies[endpoint].append(elapsed_ms)
+        self.statuses[endpoint][status] += 1
+
+    def fail(self, endpoint: str) -> None:
+        self.failures[endpoint] += 1
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.failures)):
+            samples = sorted(self.latencies.get(endpoint, []))
+            statuses = dict(self.statuses.get(endpoint, {}))
+            failures = self.failures.get(endpoint, 0)
+            total = len(samples) + failures
+            server_errors = sum(count for code, count in statuses.items() if code >= 500)
+            # 429 (rate limit, cooldown) aparte: son respuestas baratas que no miden el trabajo real.
+            throttled = statuses.get(429, 0)
+            rejected = sum(count for code, count in statuses.items() if 400 <= code < 500) - throttled
+            endpoints[endpoint] = {
+                "requests": total,
+                "throughput_rps": round(total / duration, 2) if duration else 0.0,
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "p99_ms": _percentile(samples, 99),
+                "max_ms": round(samples[-1], 2) if samples else None,
+                "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                "rejected_4xx": rejected,
+                "throttled_429": throttled,
+                "errors": server_errors + failures,
+                "error_rate": round((server_errors + failures) / total, 4) if total else 0.0,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        everything = sorted(v for values in self.latencies.values() for v in values)
+        return {
+            "duration_s": round(duration, 2),
+            "requests": total,
+            "throughput_rps": round(total / duration, 2) if duration else 0.0,
+            "p50_ms": _percentile(everything, 50),
+            "p95_ms": _percentile(everything, 95),
+            "p99_ms": _percentile(everything, 99),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def _percentile(samples: list[float], pct: int) -> Optional[float]:
+    if not samples:
+        return None
+    index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples) + 0.5)) - 1))
+    return round(samples[index], 2)
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Escenario desconocido: {name} (disponibles: {', '.join(SCENARIOS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    def __init__(self, conn: HttpConnection, stats: Stats, token: str, credentials: tuple[str, str], item_ids: list[str], rnd: random.Random):
+        self.conn = conn
+        self.stats = stats
+        self.token = token
+        self.credentials = credentials
+        self.item_ids = item_ids
+        self.rnd = rnd
+        # rate recorre todos los items en orden propio: repite item (y choca con el cooldown de
+        # 5 min) solo tras haberlos puntuado todos.
+        self._rate_order = list(item_ids)
+        rnd.shuffle(self._rate_order)
+        self._rate_next = 0
+
+    async def call(self, endpoint: str, method: str, path: str, payload: Optional[dict] = None, auth: bool = True) -> Optional[bytes]:
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        started = time.perf_counter()
+        try:
+            status, data = await self.conn.request(method, path, headers, body)
+        except Exception:
+            self.stats.fail(endpoint)
+            return None
+        self.stats.record(endpoint, (time.perf_counter() - started) * 1000.0, status)
+        return data if status < 400 else None
+
+    def pick_item(self) -> str:
+        return self.rnd.choice(self.item_ids)
+
+    # ItemsScreen.refresh
+    async def items(self):
+        await self.call("GET /items", "GET", "/items")
+        await self.call("GET /items/summary", "GET", "/items/summary?range=all")
+
+    # SummaryScreen.refresh
+    async def summary(self):
+        mode = self.rnd.choice(("global", "mine"))
+        await self.call(f"GET /rankings?mode={mode}", "GET", f"/rankings?mode={mode}")
+
+    # ItemDetailScreen.refresh
+    async def detail(self):
+        await self.call("GET /items/{id}/detail", "GET", f"/items/{self.pick_item()}/detail")
+
+    # ScoreScreen.on_save -> ItemDetailScreen.refresh
+    async def rate(self):
+        item_id = self._rate_order[self._rate_next % len(self._rate_order)]
+        self._rate_next += 1
+        scores = {k: self.rnd.randint(0, 10) for k in ("a", "b", "c", "d")}
+        scores["n"] = self.rnd.randint(0, 2)
+        await self.call("POST /items/{id}/ratings", "POST", f"/items/{item_id}/ratings", scores)
+        await self.call("GET /items/{id}/detail", "GET", f"/items/{item_id}/detail")
+
+    # ScoreScreen.on_view_others
+    async def others(self):
+        await self.call("GET /items/{id}/others", "GET", f"/items/{self.pick_item()}/others")
+
+    # ProfileSelectScreen._login_profile
+    async def login(self):
+        username, password = self.credentials
+        await self.call("POST /auth/login", "POST", "/auth/login", {"username": username, "password": password}, auth=False)
+
+
+SCENARIOS = ("items", "summary", "detail", "rate", "others", "login")
+
+
+async def _login(host: str, port: int, username: str, password: str, required: bool = True) -> Optional[str]:
+    conn = HttpConnection(host, port)
+    try:
+        body = json.dumps({"username": username, "password": password}).encode("utf-8")
+        status, data = await conn.request("POST", "/auth/login", {"Content-Type": "application/json"}, body)
+    finally:
+        await conn.close()
+    if status != 200:
+        if not required:
+            return None
+        raise SystemExit(f"Login de {username} fallo con HTTP {status}: {data[:200]!r}")
+    return json.loads(data)["access_token"]
+
+
+async def _profiles(host: str, port: int, args) -> tuple[list[str], list[tuple[str, str]]]:
+    # Un usuario por usuario virtual si la base tiene los de tools.seed (u00000..., SEED_PASSWORD):
+    # con solo los 4 bootstrap, rate acabaria casi siempre en COOLDOWN_RATING_5MIN.
+    credentials = [(username, password) for username, password, _ in BOOTSTRAP_USERS]
+    credentials += [(f"u{index:05d}", SEED_PASSWORD) for index in range(min(args.seed_users, args.concurrency - len(credentials)))]
+    tokens, usable = [], []
+    for position, (username, password) in enumerate(credentials):
+        token = await _login(host, port, username, password, required=position < len(BOOTSTRAP_USERS))
+        if token is None:
+            # Base sin usuarios de tools.seed (o login limitado en un --url): se reparten los que hay.
+            break
+        tokens.append(token)
+        usable.append((username, password))
+    print(f"Usuarios con sesion: {len(usable)} para {args.concurrency} usuarios virtuales")
+    return tokens, usable
+
+
+async def run_load(host: str, port: int, args) -> dict:
+    mix = parse_mix(args.mix)
+    tokens, credentials = await _profiles(host, port, args)
+
+    conn = HttpConnection(host, port)
+    status, data = await conn.request("GET", "/items", {"Authorization": f"Bearer {tokens[0]}"})
+    await conn.close()
+    item_ids = [row["id"] for row in json.loads(data)] if status == 200 else []
+    if not item_ids:
+        raise SystemExit("No hay items en la base: genera datos con tools.seed o usa --seed-ratings")
+
+    stats = Stats()
+    deadline = time.perf_counter() + args.duration
+    scenario_names = list(mix)
+    scenario_weights = [mix[name] for name in scenario_names]
+
+    async def _virtual_user(index: int):
+        rnd = random.Random(args.seed + index)
+        profile = index % len(tokens)
+        user = VirtualUser(
+            HttpConnection(host, port, keepalive=not args.no_keepalive),
+            stats,
+            tokens[profile],
+            credentials[profile],
+            item_ids,
+            rnd,
+        )
+        try:
+            while time.perf_counter() < deadline:
+                name = rnd.choices(scenario_names, weights=scenario_weights)[0]
+                await getattr(user, name)()
+                if args.think_ms:
+                    await asyncio.sleep(rnd.uniform(0, 2 * args.think_ms) / 1000.0)
+        finally:
+            await user.conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_virtual_user(i) for i in range(args.concurrency)))
+    return stats.report(time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(host: str, port: int, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"uvicorn termino con codigo {proc.returncode}")
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("uvicorn no arranco a tiempo")
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['requests']} peticiones en {report['duration_s']}s -> {report['throughput_rps']} req/s, "
+        f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, errores {report['error_rate']:.2%}"
+    )
+    header = f"{'endpoint':<28} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'4xx':>6} {'429':>6} {'err%':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, data in report["endpoints"].items():
+        print(
+            f"{name:<28} {data['requests']:>7} {data['throughput_rps']:>8} {data['p50_ms'] or '-':>8} "
+            f"{data['p95_ms'] or '-':>8} {data['p99_ms'] or '-':>8} {data['rejected_4xx']:>6} {data['throttled_429']:>6} "
+            f"{data['error_rate']:>7.2%}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga en lazo cerrado contra un uvicorn local.")
+    parser.add_argument("--concurrency", type=int, default=20, help="usuarios virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de carga")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por escenario (por defecto {DEFAULT_MIX})")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa media entre escenarios por usuario")
+    parser.add_argument("--no-keepalive", action="store_true", help="una conexion TCP por peticion, como requests.request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", default=None, help="servidor ya arrancado (http://host:port); si no, se lanza uvicorn")
+    parser.add_argument("--database-url", default=None, help="base para el uvicorn lanzado; por defecto SQLite temporal")
+    parser.add_argument("--seed-ratings", type=int, default=20_000, help="ratings a generar en la base temporal")
+    parser.add_argument("--seed-users", type=int, default=50, help="usuarios de tools.seed en la base (u00000...)")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--output", default=None, help="fichero JSON con el informe")
+    args = parser.parse_args(argv)
+
+    proc = None
+    tmp = None
+    if args.url:
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        database_url = args.database_url
+        if not database_url:
+            from app.database import make_engine
+            from tools.seed import seed
+
+            tmp = tempfile.TemporaryDirectory()
+            database_url = f"sqlite:///{os.path.join(tmp.name, 'loadtest.db')}"
+            engine = make_engine(database_url)
+            seed(engine, users=args.seed_users, ratings=args.seed_ratings, seed_value=args.seed)
+            engine.dispose()
+        # Todo llega desde 127.0.0.1: con el limite de login por IP casi todo login seria un 429.
+        env = {**os.environ, "DATABASE_URL": database_url, "SECRET_KEY": SECRET_KEY, "AUTH_RATE_LIMIT_PER_MINUTE": "0"}
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", host, "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env,
+        )
+        _wait_ready(host, port, proc)
+
+    try:
+        report = asyncio.run(run_load(host, port, args))
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if tmp:
+            tmp.cleanup()
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Informe en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from typing import Callable
+
+import sqlalchemy
+from sqlalchemy import event
+
+from app import crud, models
+from app.auth import create_access_token
+from app.database import SessionLocal, make_engine
+from tools.asgi import AsgiClient
+from tools.bench import _pick_fixtures, stats_cases
+from tools.seed import reset_schema, seed
+
+# Presupuesto maximo de sentencias SQL por peticion (incluye la carga del usuario del token).
+QUERY_BUDGETS = {
+    "GET /items": 2,
+    "GET /items/summary?range=all": 3,
+    "GET /items/summary?range=7": 2,
+    "GET /stats/ranking?range=all": 3,
+    "GET /rankings?mode=global": 2,
+    "GET /rankings?mode=mine": 2,
+    "GET /items/{id}/detail": 11,
+    "GET /items/{id}/others": 7,
+    "GET /items/{id}/stats?range=all": 6,
+    "POST /items/{id}/ratings": 5,
+}
+
+# Con COMPACT_KEYS la respuesta del POST resuelve los UUID publicos de item y usuario tras el commit.
+COMPACT_KEYS_EXTRA = {
+    "POST /items/{id}/ratings": 2,
+}
+
+# Sondas a las que se permite recorrer ratings entero (vacio: ninguna).
+ALLOWED_RATINGS_SCANS: set[str] = set()
+
+SQLITE_SCAN = re.compile(r"^SCAN ratings\b")
+POSTGRES_SCAN = re.compile(r"Seq Scan on ratings\w*")
+
+
+def crud_cases(fixtures: dict) -> dict[str, Callable]:
+    item_id = fixtures["item_id"]
+    user = fixtures["user"]
+    return {
+        "crud.get_user_by_username": lambda db: crud.get_user_by_username(db, user.username),
+        "crud.get_user": lambda db: crud.get_user(db, user.id),
+        "crud.get_item": lambda db: crud.get_item(db, item_id),
+        "crud.list_items": lambda db: crud.list_items(db),
+        "crud.list_users": lambda db: crud.list_users(db),
+    }
+
+
+def route_probes(fixtures: dict) -> dict[str, tuple[str, str, bytes]]:
+    item_id = fixtures["item_id"]
+    rating = json.dumps({"a": 5, "b": 5, "c": 5, "d": 5, "n": 1}).encode("utf-8")
+    return {
+        "GET /items": ("GET", "/items", b""),
+        "GET /items/summary?range=all": ("GET", "/items/summary?range=all", b""),
+        "GET /items/summary?range=7": ("GET", "/items/summary?range=7", b""),
+        "GET /stats/ranking?range=all": ("GET", "/stats/ranking?range=all", b""),
+        "GET /rankings?mode=global": ("GET", "/rankings?mode=global", b""),
+        "GET /rankings?mode=mine": ("GET", "/rankings?mode=mine", b""),
+        "GET /items/{id}/detail": ("GET", f"/items/{item_id}/detail", b""),
+        "GET /items/{id}/others": ("GET", f"/items/{item_id}/others", b""),
+        "GET /items/{id}/stats?range=all": ("GET", f"/items/{item_id}/stats?range=all", b""),
+        "POST /items/{id}/ratings": ("POST", f"/items/{item_id}/ratings", rating),
+    }
+
+
+class StatementRecorder:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: list[tuple[str, object]] = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, _conn, _cursor, statement, parameters, _context, _executemany):
+        self.statements.append((statement, parameters))
+
+    def take(self) -> list[tuple[str, object]]:
+        taken, self.statements = self.statements, []
+        return taken
+
+
+def explain(engine, statement: str, parameters) -> list[str]:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Sin seq scan el planner solo cae en uno si no existe indice utilizable.
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+            return [row[0] for row in rows]
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[-1] for row in rows]
+
+
+def find_ratings_scans(dialect: str, plan: list[str]) -> list[str]:
+    if dialect == "postgresql":
+        return [line.strip() for line in plan if POSTGRES_SCAN.search(line)]
+    return [line for line in plan if SQLITE_SCAN.match(line)]
+
+
+def check_statements(engine, name: str, statements: list[tuple[str, object]], verbose: bool) -> list[str]:
+    failures = []
+    seen = set()
+    for statement, parameters in statements:
+        if statement in seen or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            continue
+        seen.add(statement)
+        plan = explain(engine, statement, parameters)
+        scans = find_ratings_scans(engine.dialect.name, plan)
+        failed = bool(scans) and name not in ALLOWED_RATINGS_SCANS
+        if failed:
+            failures.append(f"{name}: {'; '.join(scans)}\n      {' '.join(statement.split())[:160]}")
+        if verbose or failed:
+            print(f"   {'SCAN' if failed else 'plan'}: {' '.join(statement.split())[:100]}")
+            for line in plan:
+                print(f"        {line}")
+    return failures
+
+
+def check_plans(engine, recorder: StatementRecorder, probes: dict[str, Callable], verbose: bool) -> list[str]:
+    failures = []
+    for name, fn in probes.items():
+        db = SessionLocal()
+        try:
+            fn(db)
+        finally:
+            db.close()
+        found = check_statements(engine, name, recorder.take(), verbose)
+        recorder.take()
+        print(f"[{'FAIL' if found else 'OK':<4}] {name}")
+        failures += found
+    return failures
+
+
+def check_routes(engine, recorder: StatementRecorder, fixtures: dict, verbose: bool) -> list[str]:
+    from app.main import app
+
+    failures = []
+    client = AsgiClient(app, headers={
+        "Authorization": f"Bearer {create_access_token(str(fixtures['user'].id))}",
+        "Content-Type": "application/json",
+    })
+    try:
+        for name, (method, path, body) in route_probes(fixtures).items():
+            recorder.take()
+            status, _headers, _payload = client.request(method, path, body)
+            statements = recorder.take()
+            budget = QUERY_BUDGETS.get(name)
+            if budget is not None and models.COMPACT_KEYS:
+                budget += COMPACT_KEYS_EXTRA.get(name, 0)
+            found = check_statements(engine, name, statements, verbose)
+            recorder.take()
+            if budget is not None and len(statements) > budget:
+                found.append(f"{name}: {len(statements)} queries (presupuesto {budget})")
+            if status >= 500:
+                found.append(f"{name}: HTTP {status}")
+            print(f"[{'FAIL' if found else 'OK':<4}] {name:<36} {len(statements):>3} / {budget} queries  HTTP {status}")
+            failures += found
+    finally:
+        client.close()
+    return failures
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Comprueba planes de consulta y presupuestos de queries por endpoint.")
+    parser.add_argument("--database-url", default=None, help="por defecto SQLite temporal; en Postgres BORRA el esquema")
+    parser.add_argument("--ratings", type=int, default=20_000)
+    parser.add_argument("--verbose", action="store_true", help="muestra el plan de cada sentencia")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        engine = make_engine(url)
+        reset_schema(engine)
+        seed(engine, ratings=args.ratings)
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text("ANALYZE"))
+        SessionLocal.configure(bind=engine)
+        fixtures = _pick_fixtures(engine)
+        recorder = StatementRecorder(engine)
+
+        print(f"== Planes ({engine.dialect.name})")
+        failures = check_plans(engine, recorder, {**crud_cases(fixtures), **stats_cases(fixtures)}, args.verbose)
+        print("== Endpoints: planes y presupuestos de queries")
+        failures += check_routes(engine, recorder, fixtures, args.verbose)
+        engine.dispose()
+
+    if failures:
+        print(f"\n{len(failures)} fallos:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nTodo OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth import get_password_hash
+from app.bootstrap import ensure_bootstrap_users
+from app.database import Base, make_engine
+
+# Contrasena de los usuarios generados (u00000...); tools.loadtest inicia sesion con ellos.
+SEED_PASSWORD = "seedpass"
+
+# Peso relativo por hora del dia (UTC): poca actividad de madrugada, pico por la tarde/noche.
+HOURLY_WEIGHTS = [
+    1, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 6,
+    7, 7, 6, 6, 7, 8, 10, 12, 12, 10, 6, 3,
+]
+
+
+def _pick_hours(rnd: random.Random, count: int) -> list[int]:
+    return rnd.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+
+
+def _zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1.0 / math.pow(rank, exponent) for rank in range(1, count + 1)]
+
+
+def _clamp(value: float, low: int, high: int) -> int:
+    return max(low, min(high, int(round(value))))
+
+
+def reset_schema(engine) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def seed(
+    engine,
+    users: int = 50,
+    items: int = 500,
+    ratings: int = 100_000,
+    days: int = 365,
+    seed_value: int = 42,
+    batch_size: int = 10_000,
+    now: datetime | None = None,
+) -> dict:
+    rnd = random.Random(seed_value)
+    now = now or datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+
+    with Session(bind=engine) as db:
+        ensure_bootstrap_users(db)
+        bootstrap_keys = [u.pk for u in db.query(models.User).order_by(models.User.username).all()]
+
+    password_hash = get_password_hash(SEED_PASSWORD)
+    user_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "username": f"u{index:05d}",
+            "password_hash": password_hash,
+            "is_admin": False,
+            "is_blocked": False,
+            "created_at": now - timedelta(days=days),
+        }
+        for index in range(users)
+    ]
+    item_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "code": f"I{index:06d}",
+            "name": f"Item {index}",
+            "created_at": now - timedelta(days=rnd.uniform(0, days)),
+        }
+        for index in range(items)
+    ]
+
+    with engine.begin() as conn:
+        if user_rows:
+            conn.execute(models.User.__table__.insert(), user_rows)
+        if item_rows:
+            conn.execute(models.Item.__table__.insert(), item_rows)
+        # Con COMPACT_KEYS la clave interna la asigna la base de datos.
+        user_keys = dict(conn.execute(select(models.User.id, models.User.pk)).all())
+        item_keys = dict(conn.execute(select(models.Item.id, models.Item.pk)).all())
+
+    user_ids = bootstrap_keys + [user_keys[row["id"]] for row in user_rows]
+    item_ids = [item_keys[row["id"]] for row in item_rows]
+    if not item_ids or not user_ids or ratings <= 0:
+        return {"users": len(user_rows), "items": len(item_rows), "ratings": 0}
+
+    # Popularidad tipo Zipf: unos pocos items y usuarios concentran la mayoria de votos.
+    item_weights = _zipf_weights(len(item_ids), 0.9)
+    user_weights = _zipf_weights(len(user_ids), 0.6)
+    item_bias = [rnd.gauss(6.0, 1.5) for _ in item_ids]
+    item_index = list(range(len(item_ids)))
+    user_index = list(range(len(user_ids)))
+    # Edad media de un cuarto de la ventana: la actividad reciente pesa mas.
+    mean_age = max(days / 4.0, 1.0)
+
+    inserted = 0
+    table = models.Rating.__table__
+    while inserted < ratings:
+        count = min(batch_size, ratings - inserted)
+        picked_items = rnd.choices(item_index, weights=item_weights, k=count)
+        picked_users = rnd.choices(user_index, weights=user_weights, k=count)
+        hours = _pick_hours(rnd, count)
+        rows = []
+        for offset in range(count):
+            seq = inserted + offset
+            item_pos = picked_items[offset]
+            age_days = min(rnd.expovariate(1.0 / mean_age), float(days))
+            day = (now - timedelta(days=age_days)).replace(hour=hours[offset])
+            # El microsegundo deriva del contador para respetar uq_rating_item_user_time.
+            created_at = day.replace(minute=rnd.randrange(60), second=rnd.randrange(60), microsecond=seq % 1_000_000)
+            if created_at > now:
+                created_at -= timedelta(days=1)
+            bias = item_bias[item_pos]
+            rows.append(
+                {
+                    "item_id": item_ids[item_pos],
+                    "user_id": user_ids[picked_users[offset]],
+                    "a": _clamp(rnd.gauss(bias, 2.0), 0, 10),
+                    "b": _clamp(rnd.gauss(bias, 2.0), 0, 10),
+                    "c": _clamp(rnd.gauss(bias, 2.0), 0, 10),
+                    "d": _clamp(rnd.gauss(bias, 2.0), 0, 10),
+                    "n": rnd.choices((0, 1, 2), weights=(6, 3, 1))[0],
+                    "created_at": created_at,
+                }
+            )
+        with engine.begin() as conn:
+            conn.execute(table.insert(), rows)
+        inserted += count
+
+    return {"users": len(user_rows), "items": len(item_rows), "ratings": inserted}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera usuarios, items y ratings sinteticos.")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./bench.db"))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--ratings", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=365, help="ventana temporal de los ratings")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--reset", action="store_true", help="borra y recrea el esquema antes de generar")
+    args = parser.parse_args(argv)
+
+    engine = make_engine(args.database_url)
+    if args.reset:
+        reset_schema(engine)
+    started = time.perf_counter()
+    counts = seed(
+        engine,
+        users=args.users,
+        items=args.items,
+        ratings=args.ratings,
+        days=args.days,
+        seed_value=args.seed,
+        batch_size=args.batch_size,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"SEED: {counts['users']} users, {counts['items']} items, {counts['ratings']} ratings en {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
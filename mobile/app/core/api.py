@@ -1,55 +1,210 @@
 ﻿from __future__ import annotations
 
 import os
+import random
+import threading
+import time
 import requests
-from typing import Any, Dict, Optional
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.telemetry import Telemetry
 
 DEFAULT_API_URL = os.getenv("API_URL", "https://apweb-zhfm.onrender.com")
 
+# Conectar falla rapido; leer deja margen al arranque en frio del backend en Render.
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+# Conexiones keep-alive abiertas contra el backend (una por hilo de fondo a la vez).
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "4"))
+# Solo GET/HEAD (y peticiones con Idempotency-Key) se reintentan: un POST repetido podria
+# duplicar un rating.
+GET_RETRIES = int(os.getenv("API_GET_RETRIES", "2"))
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+RETRY_STATUSES = {502, 503, 504}
+BACKOFF_BASE = 0.3
+BACKOFF_MAX = 4.0
+UNREACHABLE = "No se puede conectar al servidor"
+INVALID_RESPONSE = "Invalid response"
+
+
+class ApiError(RuntimeError):
+    # Error devuelto por el backend; el mensaje es el detail y status_code el HTTP de la respuesta.
+    def __init__(self, detail: str, status_code: int):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    # Exponencial con jitter completo: los reintentos de varios clientes no llegan a la vez.
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def make_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    session = requests.Session()
+    # max_retries=0: los reintentos los decide _request segun el metodo.
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def rows_from_columnar(data: Any) -> Any:
+    # format=columnar de /items/summary: {"items": {"id": [...], ...}, "columns": {...}} -> lista de filas.
+    if not isinstance(data, dict) or "columns" not in data:
+        return data
+    arrays = {**data.get("items", {}), **data["columns"]}
+    count = len(arrays.get("id", []))
+    return [{key: values[i] for key, values in arrays.items()} for i in range(count)]
+
+
+def rankings_from_columnar(data: Any) -> Any:
+    # format=columnar de /rankings: cada metrica guarda posiciones en "items".
+    if not isinstance(data, dict) or "columns" not in data:
+        return data
+    item_ids = data["items"]["item_id"]
+    codes = data["items"]["code"]
+    return {
+        metric: [
+            {"item_id": item_ids[i], "code": codes[i], "value": value}
+            for i, value in zip(column["item"], column["value"])
+        ]
+        for metric, column in data["columns"].items()
+    }
+
+
+def _list_params(params: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    params = {**params, "format": "columnar"}
+    if fields:
+        params["fields"] = ",".join(fields)
+    return params
+
 
 class ApiClient:
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        retries: int = GET_RETRIES,
+        telemetry: Optional[Telemetry] = None,
+    ):
         self.base_url = (base_url or DEFAULT_API_URL).rstrip("/")
         self.token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        # Se llama (refresh usado, access nuevo, refresh nuevo) tras renovar los tokens en un 401.
+        self.on_tokens_refreshed: Optional[Callable[[str, str, Optional[str]], None]] = None
+        self._refresh_lock = threading.Lock()
+        self.session = session or make_session()
+        self.retries = retries
+        self.telemetry = telemetry
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    def close(self) -> None:
+        self.session.close()
 
-    def set_token(self, token: Optional[str]) -> None:
+    def set_token(self, token: Optional[str], refresh_token: Optional[str] = None) -> None:
         self.token = token
+        self.refresh_token = refresh_token
 
-    def _headers(self) -> Dict[str, str]:
+    def _headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
         headers = {"Content-Type": "application/json"}
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
+        if extra:
+            headers.update(extra)
         return headers
 
-    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
-        try:
-            return requests.request(
-                method,
-                f"{self.base_url}{path}",
-                headers=self._headers(),
-                timeout=10,
-                **kwargs,
-            )
-        except requests.Timeout as exc:
-            raise RuntimeError("No se puede conectar al servidor") from exc
-        except requests.RequestException as exc:
-            raise RuntimeError("No se puede conectar al servidor") from exc
+    def _request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        sent_token = self.token
+        resp = self._send(method, path, headers, **kwargs)
+        # Access token caducado: se renueva una vez con el refresh token y se repite la peticion.
+        if resp.status_code == 401 and not path.startswith("/auth/") and self._refresh_after_401(sent_token):
+            resp.close()
+            resp = self._send(method, path, headers, **kwargs)
+        return resp
+
+    def _refresh_after_401(self, sent_token: Optional[str]) -> bool:
+        with self._refresh_lock:
+            if self.token != sent_token:
+                # Otro hilo ya lo renovo (o cambio el perfil) mientras esta peticion volvia.
+                return bool(self.token)
+            old_refresh = self.refresh_token
+            if not old_refresh:
+                return False
+            try:
+                token, refresh_token = self.refresh(old_refresh)
+            except RuntimeError as exc:
+                if str(exc) == UNREACHABLE:
+                    raise
+                return False
+            self.token = token
+            self.refresh_token = refresh_token or old_refresh
+        if self.on_tokens_refreshed:
+            self.on_tokens_refreshed(old_refresh, token, refresh_token)
+        return True
+
+    def _send(self, method: str, path: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS or bool(headers and "Idempotency-Key" in headers)
+        retries = self.retries if idempotent else 0
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                resp = self.session.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    headers=self._headers(headers),
+                    timeout=self.timeout,
+                    **kwargs,
+                )
+            except requests.RequestException as exc:
+                if attempt >= retries:
+                    self._record(method, path, started, None, attempt, type(exc).__name__)
+                    raise RuntimeError(UNREACHABLE) from exc
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                    self._record(method, path, started, resp, attempt)
+                    return resp
+                resp.close()
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _record(
+        self,
+        method: str,
+        path: str,
+        started: float,
+        resp: Optional[requests.Response],
+        retries: int,
+        error: Optional[str] = None,
+    ) -> None:
+        # Tiempo total de la llamada, reintentos y esperas de backoff incluidos.
+        if self.telemetry is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        status = resp.status_code if resp is not None else 0
+        size = len(resp.content) if resp is not None else 0
+        self.telemetry.record_request(method, path, status, elapsed_ms, size, retries, error)
 
     def _handle(self, resp: requests.Response) -> Dict[str, Any]:
         try:
             data = resp.json()
         except Exception:
-            data = {"detail": "Invalid response"}
+            data = {"detail": INVALID_RESPONSE}
         if resp.status_code >= 400:
             if resp.status_code == 401:
-                raise RuntimeError("SESSION_EXPIRED")
+                raise ApiError("SESSION_EXPIRED", resp.status_code)
             if resp.status_code == 403:
-                raise RuntimeError("ACCOUNT_BLOCKED")
+                raise ApiError("ACCOUNT_BLOCKED", resp.status_code)
             detail = data.get("detail") if isinstance(data, dict) else "Error"
-            raise RuntimeError(str(detail))
+            raise ApiError(str(detail), resp.status_code)
         return data
 
     def login(self, username: str, password: str) -> str:
+        return self.login_tokens(username, password)[0]
+
+    def login_tokens(self, username: str, password: str) -> Tuple[str, Optional[str]]:
         resp = self._request(
             "POST",
             "/auth/login",
@@ -78,7 +233,16 @@ class ApiClient:
             token = data.get("access_token") or data.get("token")
         if not token:
             raise RuntimeError("Respuesta inválida del backend (token faltante)")
-        return token
+        return token, data.get("refresh_token")
+
+    def refresh(self, refresh_token: str) -> Tuple[str, Optional[str]]:
+        # POST /auth/refresh no verifica la contraseña (sin pbkdf2 en el servidor).
+        resp = self._send("POST", "/auth/refresh", json={"refresh_token": refresh_token})
+        data = self._handle(resp)
+        token = data.get("access_token") if isinstance(data, dict) else None
+        if not token:
+            raise RuntimeError("SESSION_EXPIRED")
+        return token, data.get("refresh_token")
 
     def register(self, invite_code: str, username: str, password: str) -> Dict[str, Any]:
         resp = self._request(
@@ -97,12 +261,25 @@ class ApiClient:
         resp = self._request("POST", "/items", json=payload)
         return self._handle(resp)
 
-    def create_rating(self, item_id: str, a: int, b: int, c: int, d: int, n: int) -> Dict[str, Any]:
+    def create_rating(
+        self,
+        item_id: str,
+        a: int,
+        b: int,
+        c: int,
+        d: int,
+        n: int,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # Con idempotency_key el backend guarda la respuesta: reenviar nunca duplica el rating.
         resp = self._request(
             "POST",
             f"/items/{item_id}/ratings",
+            headers={"Idempotency-Key": idempotency_key} if idempotency_key else None,
             json={"a": a, "b": b, "c": c, "d": d, "n": n},
         )
+        if idempotency_key and resp.status_code in RETRY_STATUSES:
+            raise RuntimeError(UNREACHABLE)
         return self._handle(resp)
 
     def get_ranking(self, range_key: str = "all") -> Dict[str, Any]:
@@ -113,9 +290,9 @@ class ApiClient:
         resp = self._request("GET", f"/items/{item_id}/stats", params={"range": range_key})
         return self._handle(resp)
 
-    def get_items_summary(self, range_key: str = "all") -> Dict[str, Any]:
-        resp = self._request("GET", "/items/summary", params={"range": range_key})
-        return self._handle(resp)
+    def get_items_summary(self, range_key: str = "all", fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        resp = self._request("GET", "/items/summary", params=_list_params({"range": range_key}, fields))
+        return rows_from_columnar(self._handle(resp))
 
     def delete_item(self, item_id: str) -> Dict[str, Any]:
         resp = self._request("DELETE", f"/items/{item_id}")
@@ -135,9 +312,9 @@ class ApiClient:
         resp = self._request("GET", f"/items/{item_id}/detail")
         return self._handle(resp)
 
-    def get_rankings(self, mode: str = "global") -> Dict[str, Any]:
+    def get_rankings(self, mode: str = "global", fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
         try:
-            resp = self._request("GET", "/rankings", params={"mode": mode})
+            resp = self._request("GET", "/rankings", params=_list_params({"mode": mode}, fields))
         except RuntimeError as exc:
             raise
 
@@ -152,7 +329,7 @@ class ApiClient:
                 data = {}
             detail = data.get("detail", "Forbidden")
             raise RuntimeError(f"FORBIDDEN:{detail}")
-        return self._handle(resp)
+        return rankings_from_columnar(self._handle(resp))
 
     def list_items(self) -> Dict[str, Any]:
         return self.get_items()
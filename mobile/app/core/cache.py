@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+# Segundos durante los que una respuesta guardada se da por buena sin volver a pedirla.
+# Pasado ese tiempo se sigue pintando al instante, pero se revalida en segundo plano.
+CACHE_TTLS = {
+    "items": int(os.getenv("CACHE_TTL_ITEMS", "300")),
+    "items_summary": int(os.getenv("CACHE_TTL_SUMMARY", "60")),
+    "rankings": int(os.getenv("CACHE_TTL_RANKINGS", "60")),
+    "item_detail": int(os.getenv("CACHE_TTL_ITEM_DETAIL", "30")),
+    "item_others": int(os.getenv("CACHE_TTL_ITEM_OTHERS", "30")),
+}
+# Las entradas mas viejas que esto se borran al abrir la cache.
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+class LocalCache:
+    def __init__(self, base_dir: str, filename: str = "api_cache.sqlite3"):
+        self.path = os.path.join(base_dir, filename)
+        self._lock = threading.Lock()
+        # Se lee desde el hilo de la UI y se escribe desde los hilos de fondo.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " scope TEXT NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " invalidated INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (scope, endpoint, params))"
+        )
+        self.prune(CACHE_MAX_AGE)
+
+    @staticmethod
+    def _params(params: Iterable[Any]) -> str:
+        return json.dumps(list(params), separators=(",", ":"))
+
+    def get(self, scope: str, endpoint: str, params: Iterable[Any] = ()) -> Optional[Tuple[Any, bool]]:
+        # Devuelve (datos, frescos) o None si nunca se ha guardado esa respuesta.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, fetched_at, invalidated FROM responses WHERE scope = ? AND endpoint = ? AND params = ?",
+                (scope, endpoint, self._params(params)),
+            ).fetchone()
+        if row is None:
+            return None
+        data, fetched_at, invalidated = row
+        fresh = not invalidated and time.time() - fetched_at < CACHE_TTLS.get(endpoint, 0)
+        return json.loads(data), fresh
+
+    def put(self, scope: str, endpoint: str, params: Iterable[Any], data: Any) -> None:
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (scope, endpoint, params, data, fetched_at, invalidated)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (scope, endpoint, self._params(params), payload, time.time()),
+            )
+
+    def invalidate(self, *endpoints: str) -> None:
+        # Tras una escritura: se conservan los datos para pintar, pero dejan de contar como frescos.
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE responses SET invalidated = 1 WHERE endpoint = ?",
+                [(endpoint,) for endpoint in endpoints],
+            )
+
+    def prune(self, max_age: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.api import INVALID_RESPONSE, ApiError
+
+# Segundos entre intentos de vaciar la cola mientras quedan ratings pendientes.
+OUTBOX_RETRY_SECONDS = int(os.getenv("OUTBOX_RETRY_SECONDS", "30"))
+# Rechazos definitivos del backend (item borrado, Idempotency-Key reutilizada o datos invalidos,
+# cooldown): reenviar el mismo rating no cambiaria la respuesta. Con cualquier otro error (sin red,
+# 5xx del arranque en frio, sesion caducada...) el rating sigue en cola para la siguiente pasada.
+DROP_STATUSES = {404, 422}
+DROP_ERRORS = {"COOLDOWN_RATING_5MIN"}
+FIELDS = ("a", "b", "c", "d", "n")
+
+
+class RatingOutbox:
+    # Ratings que no se pudieron enviar por falta de red. Cada uno lleva su Idempotency-Key, asi
+    # que reenviarlo aunque el primer intento si llegara al backend no crea un duplicado.
+    def __init__(self, base_dir: str, filename: str = "outbox.sqlite3"):
+        self.path = os.path.join(base_dir, filename)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Un rating aceptado por la app no se puede perder aunque se cierre a continuacion.
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_ratings ("
+            " profile INTEGER NOT NULL,"
+            " item_id TEXT NOT NULL,"
+            " idempotency_key TEXT NOT NULL,"
+            " a INTEGER NOT NULL, b INTEGER NOT NULL, c INTEGER NOT NULL, d INTEGER NOT NULL, n INTEGER NOT NULL,"
+            " queued_at REAL NOT NULL,"
+            " PRIMARY KEY (profile, item_id))"
+        )
+
+    def add(self, profile: int, item_id: str, idempotency_key: str, values: Dict[str, int]) -> None:
+        # Uno por item y perfil: el backend rechaza un segundo rating del mismo item en 5 minutos,
+        # asi que solo se guarda el ultimo y la cola se vacia con una peticion por item.
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pending_ratings"
+                " (profile, item_id, idempotency_key, a, b, c, d, n, queued_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (profile, item_id, idempotency_key, *(int(values[f]) for f in FIELDS), time.time()),
+            )
+
+    def pending(self, profile: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, idempotency_key, a, b, c, d, n FROM pending_ratings"
+                " WHERE profile = ? ORDER BY queued_at",
+                (profile,),
+            ).fetchall()
+        return [dict(zip(("item_id", "idempotency_key", *FIELDS), row)) for row in rows]
+
+    def count(self, profile: Optional[int] = None) -> int:
+        with self._lock:
+            if profile is None:
+                return self._conn.execute("SELECT COUNT(*) FROM pending_ratings").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM pending_ratings WHERE profile = ?", (profile,)).fetchone()[0]
+
+    def remove(self, profile: int, item_id: str, idempotency_key: str) -> None:
+        # Solo si sigue siendo el mismo envio: un rating nuevo del item puede haberlo sustituido.
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM pending_ratings WHERE profile = ? AND item_id = ? AND idempotency_key = ?",
+                (profile, item_id, idempotency_key),
+            )
+
+    def flush(self, api, profile: int) -> Dict[str, int]:
+        # Se ejecuta en un hilo de fondo con el token del perfil activo.
+        result = {"sent": 0, "dropped": 0}
+        for entry in self.pending(profile):
+            try:
+                api.create_rating(
+                    entry["item_id"],
+                    *(entry[f] for f in FIELDS),
+                    idempotency_key=entry["idempotency_key"],
+                )
+            except ApiError as exc:
+                if not _rejected(exc):
+                    break
+                result["dropped"] += 1
+            except RuntimeError:
+                # Sin red o 502-504 tras los reintentos.
+                break
+            else:
+                result["sent"] += 1
+            self.remove(profile, entry["item_id"], entry["idempotency_key"])
+        result["pending"] = self.count(profile)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _rejected(exc: ApiError) -> bool:
+    # Un cuerpo que no es JSON (p. ej. la pagina de error de un proxy) no es una respuesta del backend.
+    if str(exc) == INVALID_RESPONSE:
+        return False
+    return exc.status_code in DROP_STATUSES or str(exc) in DROP_ERRORS
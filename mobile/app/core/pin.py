@@ -2,9 +2,15 @@
 
 import json
 import os
+import threading
 import time
 from typing import Optional
 
+# Duracion del bloqueo tras ver un nombre.
+NAME_VIEW_COOLDOWN = 300
+# Segundos entre un cambio y su escritura a disco: varias marcas seguidas se guardan juntas.
+PIN_FLUSH_DELAY = float(os.getenv("PIN_FLUSH_DELAY", "1.0"))
+
 
 class PinStore:
     _PINS = {
@@ -14,9 +20,18 @@ class PinStore:
         4: "3859",
     }
 
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, flush_delay: float = PIN_FLUSH_DELAY):
         self.base_dir = base_dir
         self._cooldown_path = os.path.join(base_dir, "name_view_cooldowns.json")
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        # Los cooldowns viven en memoria (render_items los consulta por item y cada segundo);
+        # el fichero solo se lee al arrancar.
+        self._cooldowns = self._load_cooldowns()
+        self._dirty = self._expire(time.time())
 
     def verify_pin(self, profile_num: int, pin: str) -> bool:
         return str(pin).strip() == self._PINS.get(profile_num)
@@ -26,29 +41,66 @@ class PinStore:
             return {}
         with open(self._cooldown_path, "r", encoding="utf-8") as f:
             try:
-                return json.load(f)
+                data = json.load(f)
             except Exception:
                 return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            str(profile): {item_id: float(until) for item_id, until in items.items()}
+            for profile, items in data.items()
+            if isinstance(items, dict)
+        }
 
-    def _save_cooldowns(self, data: dict) -> None:
-        with open(self._cooldown_path, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+    def _expire(self, now: float) -> bool:
+        changed = False
+        for key in list(self._cooldowns):
+            profile_data = self._cooldowns[key]
+            for item_id in [i for i, until in profile_data.items() if until <= now]:
+                del profile_data[item_id]
+                changed = True
+            if not profile_data:
+                del self._cooldowns[key]
+                changed = True
+        return changed
 
     def can_view_name(self, profile_num: int, item_id: str) -> tuple[bool, int]:
-        data = self._load_cooldowns()
-        profile_data = data.get(str(profile_num), {})
-        until = float(profile_data.get(item_id, 0))
-        now = time.time()
-        remaining = max(0, int(until - now))
+        until = self._cooldowns.get(str(profile_num), {}).get(item_id, 0)
+        remaining = max(0, int(until - time.time()))
         return remaining == 0, remaining
 
     def mark_viewed_name(self, profile_num: int, item_id: str) -> None:
-        data = self._load_cooldowns()
-        key = str(profile_num)
-        profile_data = data.get(key, {})
-        profile_data[item_id] = time.time() + 300
-        data[key] = profile_data
-        self._save_cooldowns(data)
+        with self._lock:
+            self._cooldowns.setdefault(str(profile_num), {})[item_id] = time.time() + NAME_VIEW_COOLDOWN
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> None:
+        # Escritura diferida fuera del hilo de la UI; tmp + os.replace para no dejar nunca un
+        # fichero a medias si la app muere mientras escribe.
+        with self._write_lock:
+            with self._lock:
+                self._flush_timer = None
+                self._dirty = self._expire(time.time()) or self._dirty
+                if not self._dirty:
+                    return
+                data = json.dumps(self._cooldowns)
+                self._dirty = False
+            tmp_path = f"{self._cooldown_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._cooldown_path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+        self.flush()
 
     @staticmethod
     def format_mmss(seconds: int) -> str:
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.tasks import TaskQueueFull
+
+# Descargas especulativas a la vez; por debajo de BG_WORKERS para dejar hilos a lo que pide el usuario.
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# KB de respuestas prefetch por minuto; agotados, se espera a la siguiente ventana.
+PREFETCH_BUDGET_KB = int(os.getenv("PREFETCH_BUDGET_KB", "256"))
+PREFETCH_WINDOW = 60
+# Pendientes como maximo; al llegar mas se descartan los mas antiguos.
+PREFETCH_QUEUE = 32
+
+_FETCHERS = {
+    "item_detail": lambda api, item_id: api.get_item_detail(item_id),
+    "item_others": lambda api, item_id: api.get_others(item_id),
+}
+
+Entry = Tuple[str, str, str]
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        api,
+        cache,
+        tasks,
+        concurrency: int = PREFETCH_CONCURRENCY,
+        budget_kb: int = PREFETCH_BUDGET_KB,
+    ):
+        self.api = api
+        self.cache = cache
+        self.tasks = tasks
+        self.concurrency = concurrency
+        self.budget_bytes = budget_kb * 1024
+        self._lock = threading.Lock()
+        # (scope, endpoint, item_id) -> token con el que se pidio; el primero es el siguiente.
+        self._pending: "OrderedDict[Entry, Optional[str]]" = OrderedDict()
+        self._inflight = 0
+        # Sube con cada invalidate(): lo descargado antes ya no se guarda como fresco.
+        self._generation = 0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        # Reintento al abrirse la siguiente ventana si el presupuesto se agoto con cola pendiente.
+        self._retry: Optional[threading.Timer] = None
+        self._counters = {"fetched": 0, "fresh": 0, "discarded": 0, "failed": 0, "over_budget": 0}
+
+    def prefetch(self, scope: Optional[str], endpoint: str, item_ids: Iterable[str], urgent: bool = False) -> None:
+        # urgent (item recien tocado) pasa delante de lo visible.
+        if scope is None or not self.api.token:
+            return
+        with self._lock:
+            for item_id in item_ids:
+                if item_id:
+                    self._enqueue((scope, endpoint, item_id), urgent)
+        self._pump()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": len(self._pending), "inflight": self._inflight, **self._counters}
+
+    def _enqueue(self, entry: Entry, urgent: bool) -> None:
+        # Llamar con _lock tomado.
+        self._pending[entry] = self.api.token
+        self._pending.move_to_end(entry, last=not urgent)
+        while len(self._pending) > PREFETCH_QUEUE:
+            self._pending.popitem(last=True)
+
+    def _over_budget(self) -> bool:
+        # Llamar con _lock tomado.
+        now = time.monotonic()
+        if now - self._window_start >= PREFETCH_WINDOW:
+            self._window_start = now
+            self._window_bytes = 0
+        return self._window_bytes >= self.budget_bytes
+
+    def _schedule_retry(self) -> None:
+        # Llamar con _lock tomado.
+        if self._retry is not None:
+            return
+        delay = max(0.0, PREFETCH_WINDOW - (time.monotonic() - self._window_start))
+        self._retry = threading.Timer(delay, self._retry_pump)
+        self._retry.daemon = True
+        self._retry.start()
+
+    def _retry_pump(self) -> None:
+        with self._lock:
+            self._retry = None
+        self._pump()
+
+    def _pump(self) -> None:
+        while True:
+            with self._lock:
+                if self._inflight >= self.concurrency or not self._pending:
+                    return
+                if self._over_budget():
+                    self._counters["over_budget"] += 1
+                    self._schedule_retry()
+                    return
+                entry, token = self._pending.popitem(last=False)
+                generation = self._generation
+                if token != self.api.token:
+                    # Pedido con otro perfil o sesion: ya no vale.
+                    continue
+                self._inflight += 1
+            scope, endpoint, item_id = entry
+            cached = self.cache.get(scope, endpoint, (item_id,))
+            if cached is not None and cached[1]:
+                with self._lock:
+                    self._inflight -= 1
+                    self._counters["fresh"] += 1
+                continue
+            try:
+                # Misma clave que run_bg/fetch_cached: si el usuario abre el item mientras tanto,
+                # comparte esta descarga en vez de lanzar otra.
+                future = self.tasks.submit(
+                    lambda e=entry, g=generation: self._fetch(e, g), key=((endpoint, item_id), token)
+                )
+            except TaskQueueFull:
+                with self._lock:
+                    self._inflight -= 1
+                    self._enqueue(entry, urgent=True)
+                return
+            future.add_done_callback(self._done)
+
+    def _fetch(self, entry: Entry, generation: int):
+        scope, endpoint, item_id = entry
+        data = _FETCHERS[endpoint](self.api, item_id)
+        size = len(json.dumps(data, separators=(",", ":")))
+        with self._lock:
+            self._window_bytes += size
+            current = generation == self._generation
+            self._counters["fetched" if current else "discarded"] += 1
+        if not current:
+            return data
+        # Fuera de _lock: la escritura en SQLite no debe frenar a prefetch() desde el hilo de UI.
+        self.cache.put(scope, endpoint, (item_id,), data)
+        # /others solo responde a quien ya ha puntuado el item.
+        wants_others = endpoint == "item_detail" and isinstance(data, dict) and data.get("can_view_others")
+        with self._lock:
+            stale = generation != self._generation
+            if wants_others and not stale:
+                self._enqueue((scope, "item_others", item_id), urgent=False)
+        if stale:
+            # invalidate() llego durante el put: lo guardado ya no vale.
+            self.cache.invalidate(endpoint)
+        return data
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if not future.cancelled() and future.exception() is not None:
+                self._counters["failed"] += 1
+        self._pump()
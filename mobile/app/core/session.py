@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
 from typing import Optional
 
 
@@ -7,6 +10,46 @@ class SessionStore:
     _token: Optional[str] = None
     _profile: Optional[int] = None
     _tokens_by_profile: dict[int, Optional[str]] = {}
+    _refresh_by_profile: dict[int, Optional[str]] = {}
+    # Con load() los tokens de cada perfil se guardan en session_tokens.json y sobreviven a
+    # reiniciar la app: volver a entrar no repite /auth/login.
+    _path: Optional[str] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls, base_dir: str) -> None:
+        cls._path = os.path.join(base_dir, "session_tokens.json")
+        try:
+            with open(cls._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        with cls._lock:
+            for key, tokens in data.items() if isinstance(data, dict) else ():
+                if not isinstance(tokens, dict) or not tokens.get("access_token"):
+                    continue
+                cls._tokens_by_profile[int(key)] = tokens["access_token"]
+                cls._refresh_by_profile[int(key)] = tokens.get("refresh_token")
+
+    @classmethod
+    def _save(cls) -> None:
+        # Llamar con _lock tomado. Escritura atomica, como en PinStore.
+        if cls._path is None:
+            return
+        data = {
+            str(profile): {"access_token": token, "refresh_token": cls._refresh_by_profile.get(profile)}
+            for profile, token in cls._tokens_by_profile.items()
+            if token
+        }
+        tmp_path = f"{cls._path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, cls._path)
+        except OSError:
+            pass
 
     @classmethod
     def set_profile(cls, profile_num: int) -> None:
@@ -18,20 +61,44 @@ class SessionStore:
         return cls._profile
 
     @classmethod
-    def set_token(cls, profile_num: int, token: Optional[str]) -> None:
-        cls._tokens_by_profile[profile_num] = token
-        if cls._profile == profile_num:
-            cls._token = token
+    def set_token(cls, profile_num: int, token: Optional[str], refresh_token: Optional[str] = None) -> None:
+        with cls._lock:
+            cls._tokens_by_profile[profile_num] = token
+            cls._refresh_by_profile[profile_num] = refresh_token
+            if cls._profile == profile_num:
+                cls._token = token
+            cls._save()
 
     @classmethod
     def get_token(cls, profile_num: int) -> Optional[str]:
         return cls._tokens_by_profile.get(profile_num)
 
+    @classmethod
+    def get_refresh_token(cls, profile_num: int) -> Optional[str]:
+        return cls._refresh_by_profile.get(profile_num)
+
+    @classmethod
+    def replace_refreshed(cls, old_refresh_token: str, token: str, refresh_token: Optional[str]) -> None:
+        # ApiClient renovo los tokens desde un hilo de fondo: se guardan en el perfil que tenia
+        # el refresh token usado (el perfil activo puede haber cambiado entretanto).
+        with cls._lock:
+            for profile, current in cls._refresh_by_profile.items():
+                if current == old_refresh_token:
+                    cls._tokens_by_profile[profile] = token
+                    cls._refresh_by_profile[profile] = refresh_token or old_refresh_token
+                    if cls._profile == profile:
+                        cls._token = token
+                    cls._save()
+                    return
+
     @classmethod
     def clear_token(cls, profile_num: int) -> None:
-        cls._tokens_by_profile.pop(profile_num, None)
-        if cls._profile == profile_num:
-            cls._token = None
+        with cls._lock:
+            cls._tokens_by_profile.pop(profile_num, None)
+            cls._refresh_by_profile.pop(profile_num, None)
+            if cls._profile == profile_num:
+                cls._token = None
+            cls._save()
 
     @classmethod
     def set_current_token(cls, token: Optional[str]) -> None:
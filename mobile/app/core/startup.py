@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class StartupTimer:
+    # Marcas de tiempo del arranque en ms desde t0 (main.py lo crea antes de importar Kivy).
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._marks: List[Tuple[str, float]] = []
+        self._screens: Dict[str, float] = {}
+
+    def mark(self, label: str) -> None:
+        self._marks.append((label, (time.perf_counter() - self.t0) * 1000.0))
+
+    def record_screen(self, name: str, elapsed_ms: float) -> None:
+        self._screens[name] = elapsed_ms
+
+    def stats(self) -> dict:
+        return {
+            "marks": {label: round(ms, 1) for label, ms in self._marks},
+            "screens": {name: round(ms, 1) for name, ms in self._screens.items()},
+        }
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Hilos de fondo compartidos por todas las pantallas (igual que API_POOL_SIZE: uno por conexion).
+BG_WORKERS = int(os.getenv("BG_WORKERS", "4"))
+# Tareas esperando hilo libre; por encima se rechazan en vez de acumular llamadas a la API.
+BG_MAX_QUEUE = int(os.getenv("BG_MAX_QUEUE", "16"))
+
+
+class TaskQueueFull(RuntimeError):
+    pass
+
+
+class TaskRunner:
+    def __init__(self, max_workers: int = BG_WORKERS, max_queue: int = BG_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bg")
+        self._lock = threading.Lock()
+        # Single-flight: una sola ejecucion en curso por clave; los demas interesados la comparten.
+        self._inflight: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Future, int] = {}
+        self._counters = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "dropped": 0,
+            "completed": 0,
+        }
+        self._active = 0
+        self._queued = 0
+        self._max_queued = 0
+
+    def submit(self, fn: Callable[[], Any], key: Optional[Hashable] = None) -> Future:
+        with self._lock:
+            if key is not None and key in self._inflight:
+                future = self._inflight[key]
+                self._waiters[future] += 1
+                self._counters["deduplicated"] += 1
+                return future
+            if self._queued >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise TaskQueueFull("Demasiadas peticiones en curso")
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+            self._counters["submitted"] += 1
+            future = self._executor.submit(self._run, fn)
+            self._waiters[future] = 1
+            if key is not None:
+                self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finish(f, key))
+        return future
+
+    def _run(self, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._counters["completed"] += 1
+
+    def _finish(self, future: Future, key: Optional[Hashable]) -> None:
+        with self._lock:
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+            self._waiters.pop(future, None)
+            if future.cancelled():
+                self._queued -= 1
+                self._counters["cancelled"] += 1
+
+    def release(self, future: Future) -> None:
+        # El interesado ya no quiere el resultado: si nadie mas espera y no ha empezado, se cancela.
+        with self._lock:
+            waiters = self._waiters.get(future)
+            if waiters is None:
+                return
+            self._waiters[future] = waiters - 1
+            if waiters > 1:
+                return
+        future.cancel()
+
+    def note_dropped(self) -> None:
+        with self._lock:
+            self._counters["dropped"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "threads": len(self._executor._threads),
+                "active": self._active,
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+                "inflight_keys": len(self._inflight),
+                **self._counters,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
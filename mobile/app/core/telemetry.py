@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Ultimas peticiones y renders guardados; los antiguos se descartan (buffer circular).
+TELEMETRY_SIZE = int(os.getenv("TELEMETRY_SIZE", "500"))
+# Fichero en user_data_dir con el export (al pausar/cerrar la app o desde el dialogo de rendimiento).
+TELEMETRY_FILE = "telemetry.json"
+
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F-]{8,}(?=/|$)")
+
+
+def endpoint_of(path: str) -> str:
+    # /items/<uuid>/detail -> /items/{id}/detail: las metricas se agrupan por ruta, no por item.
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(_percentile(ordered, 0.5), 1),
+        "p95_ms": round(_percentile(ordered, 0.95), 1),
+        "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+    }
+
+
+class Telemetry:
+    def __init__(self, size: int = TELEMETRY_SIZE):
+        self._lock = threading.Lock()
+        self._requests: deque = deque(maxlen=size)
+        self._renders: deque = deque(maxlen=size)
+
+    def record_request(
+        self,
+        method: str,
+        path: str,
+        status: int,
+        elapsed_ms: float,
+        size: int,
+        retries: int,
+        error: Optional[str] = None,
+    ) -> None:
+        # status 0: no hubo respuesta (error de red tras agotar los reintentos).
+        entry = {
+            "at": time.time(),
+            "method": method,
+            "endpoint": endpoint_of(path),
+            "status": status,
+            "ms": round(elapsed_ms, 1),
+            "bytes": size,
+            "retries": retries,
+        }
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._requests.append(entry)
+
+    def record_render(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._renders.append({"at": time.time(), "name": name, "ms": round(elapsed_ms, 1)})
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = list(self._requests)
+            renders = list(self._renders)
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in requests:
+            by_endpoint.setdefault(f"{entry['method']} {entry['endpoint']}", []).append(entry)
+        endpoints = {}
+        for key, entries in by_endpoint.items():
+            stats = _summarize([e["ms"] for e in entries])
+            stats["bytes"] = sum(e["bytes"] for e in entries)
+            stats["retries"] = sum(e["retries"] for e in entries)
+            stats["errors"] = sum(1 for e in entries if e["status"] == 0 or e["status"] >= 400)
+            endpoints[key] = stats
+        by_render: Dict[str, List[float]] = {}
+        for entry in renders:
+            by_render.setdefault(entry["name"], []).append(entry["ms"])
+        return {
+            "requests": endpoints,
+            "renders": {name: _summarize(samples) for name, samples in by_render.items()},
+        }
+
+    def export(self, path: str, extra: Optional[Dict[str, Any]] = None) -> str:
+        # extra: otras secciones del informe (arranque, hilos de fondo, precarga).
+        with self._lock:
+            data = {"requests": list(self._requests), "renders": list(self._renders)}
+        data["summary"] = self.summary()
+        data.update(extra or {})
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, path)
+        return path
@@ -1,23 +1,59 @@
 ﻿from __future__ import annotations
 
+import functools
+import time
+
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.snackbar import Snackbar
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 from kivy.clock import Clock
-from threading import Thread
 
 from app.core.session import SessionStore
+from app.core.tasks import TaskQueueFull
+
+
+def timed_render(fn):
+    # Anota en app.telemetry lo que tarda en Python el metodo de pintado (crear y rellenar
+    # widgets); el layout y el dibujo de Kivy ocurren despues, en el siguiente frame.
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            app = getattr(self.manager, "app", None) if self.manager else None
+            telemetry = getattr(app, "telemetry", None)
+            if telemetry is not None:
+                telemetry.record_render(f"{self.name}.{fn.__name__}", (time.perf_counter() - started) * 1000.0)
+
+    return wrapper
 
 
 class BaseScreen(MDScreen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Ultima llamada por hueco (p. ej. "refresh"): las anteriores se cancelan o se ignoran.
+        self._bg_generations = {}
+        self._bg_futures = {}
+
     def show_error(self, message: str) -> None:
         Snackbar(text=message).open()
 
     def show_info(self, message: str) -> None:
         Snackbar(text=message).open()
 
-    def run_bg(self, fn, on_success=None, on_error=None):
+    def run_bg(self, fn, on_success=None, on_error=None, key=None, slot=None):
+        # key identifica la peticion (lecturas iguales en curso se comparten entre pantallas);
+        # slot agrupa las llamadas que se sustituyen entre si. Las escrituras no llevan key.
+        app = self.manager.app
+        tasks = app.tasks
+        slot = slot or key
+        generation = None
+        if slot is not None:
+            generation = self._bg_generations.get(slot, 0) + 1
+            self._bg_generations[slot] = generation
+
         def _dispatch_success(result):
             if on_success:
                 on_success(result)
@@ -28,15 +64,62 @@ class BaseScreen(MDScreen):
             else:
                 self.show_error(message)
 
-        def _worker():
-            try:
-                result = fn()
-                Clock.schedule_once(lambda *_: _dispatch_success(result), 0)
-            except Exception as exc:
-                msg = str(exc)
-                Clock.schedule_once(lambda *_: _dispatch_error(msg), 0)
+        def _dispatch(future):
+            if future.cancelled():
+                return
+            if slot is not None and self._bg_generations.get(slot) != generation:
+                tasks.note_dropped()
+                return
+            if slot is not None and self._bg_futures.get(slot) is future:
+                del self._bg_futures[slot]
+            exc = future.exception()
+            if exc is not None:
+                _dispatch_error(str(exc))
+            else:
+                _dispatch_success(future.result())
+
+        try:
+            # El token forma parte de la clave: otro perfil nunca recibe el resultado de este.
+            future = tasks.submit(fn, key=None if key is None else (key, app.api.token))
+        except TaskQueueFull as exc:
+            _dispatch_error(str(exc))
+            return
+        if slot is not None:
+            previous = self._bg_futures.get(slot)
+            if previous is not None:
+                # Si es la misma tarea compartida, solo descuenta el interesado repetido.
+                tasks.release(previous)
+            self._bg_futures[slot] = future
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda *_: _dispatch(f), 0))
+
+    def fetch_cached(self, endpoint, params, fn, on_success, on_error=None, slot=None):
+        # Pinta al momento la ultima respuesta guardada y, si ya no es fresca (ver CACHE_TTLS),
+        # la revalida en segundo plano; on_success se llama una vez por cada version.
+        app = self.manager.app
+        profile = SessionStore.get_profile()
+        scope = None if profile is None else str(profile)
+        params = tuple(params)
+        if scope is not None:
+            cached = app.cache.get(scope, endpoint, params)
+            if cached is not None:
+                data, fresh = cached
+                on_success(data)
+                if fresh:
+                    return
+
+        def _fetch():
+            data = fn()
+            if scope is not None:
+                app.cache.put(scope, endpoint, params, data)
+            return data
+
+        self.run_bg(_fetch, on_success=on_success, on_error=on_error, key=(endpoint, *params), slot=slot)
 
-        Thread(target=_worker, daemon=True).start()
+    def prefetch(self, endpoint: str, item_ids, urgent: bool = False) -> None:
+        # Descarga especulativa a la cache local (ver app.core.prefetch); no pinta nada.
+        app = self.manager.app
+        profile = SessionStore.get_profile()
+        app.prefetcher.prefetch(None if profile is None else str(profile), endpoint, item_ids, urgent=urgent)
 
     def handle_session_error(self, message: str) -> bool:
         if message == "SESSION_EXPIRED":
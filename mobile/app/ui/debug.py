@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict
+
+from kivy.uix.scrollview import ScrollView
+from kivymd.uix.button import MDFlatButton
+from kivymd.uix.dialog import MDDialog
+from kivymd.uix.label import MDLabel
+
+from app.core.telemetry import TELEMETRY_FILE
+
+
+def _format_counters(counters: Dict[str, Any]) -> str:
+    return "  ".join(f"{key} {value}" for key, value in counters.items())
+
+
+def format_summary(summary: Dict[str, Any], extra: Dict[str, Any]) -> str:
+    lines = ["Peticiones (p50 / p95 / max ms, KB, reintentos, errores):"]
+    for endpoint, stats in sorted(summary["requests"].items()):
+        lines.append(
+            f"{endpoint}  x{stats['count']}  {stats['p50_ms']:.0f} / {stats['p95_ms']:.0f} / {stats['max_ms']:.0f}"
+            f"  {stats['bytes'] / 1024:.1f} KB  r{stats['retries']}  e{stats['errors']}"
+        )
+    lines.append("")
+    lines.append("Pintado (p50 / p95 / max ms):")
+    for name, stats in sorted(summary["renders"].items()):
+        lines.append(f"{name}  x{stats['count']}  {stats['p50_ms']:.0f} / {stats['p95_ms']:.0f} / {stats['max_ms']:.0f}")
+    startup = extra["startup"]
+    lines.append("")
+    lines.append("Arranque (ms desde el inicio):")
+    lines.append(_format_counters(startup["marks"]))
+    if startup["screens"]:
+        lines.append("Pantallas: " + _format_counters(startup["screens"]))
+    lines.append("")
+    lines.append("Hilos de fondo: " + _format_counters(extra["tasks"]))
+    lines.append("Precarga: " + _format_counters(extra["prefetch"]))
+    return "\n".join(lines)
+
+
+def open_debug_dialog(screen) -> MDDialog:
+    # Resumen de app.telemetry (y de app.debug_stats) para informes de "va lento"; Exportar deja el detalle en telemetry.json.
+    app = screen.manager.app
+    label = MDLabel(
+        text=format_summary(app.telemetry.summary(), app.debug_stats()), font_style="Caption", size_hint_y=None
+    )
+    label.bind(texture_size=lambda *_: setattr(label, "height", label.texture_size[1]))
+    scroll = ScrollView(size_hint_y=None, height=360)
+    scroll.add_widget(label)
+
+    def _export(*_):
+        try:
+            path = app.telemetry.export(os.path.join(app.user_data_dir, TELEMETRY_FILE), app.debug_stats())
+        except OSError as exc:
+            screen.show_error(f"No se pudo exportar: {exc}")
+            return
+        screen.show_info(f"Guardado en {path}")
+
+    dialog = MDDialog(
+        title="Rendimiento",
+        type="custom",
+        content_cls=scroll,
+        buttons=[
+            MDFlatButton(text="Exportar", on_release=_export),
+            MDFlatButton(text="Cerrar", on_release=lambda *_: dialog.dismiss()),
+        ],
+    )
+    dialog.open()
+    return dialog
@@ -100,9 +100,6 @@ class ItemDetailScreen(BaseScreen):
         if not self.item_id:
             return
 
-        def _do():
-            return self.manager.app.api.get_item_detail(self.item_id)
-
         def _ok(data):
             self._data = data or {}
             item = self._data.get("item") or {}
@@ -111,13 +108,23 @@ class ItemDetailScreen(BaseScreen):
                 self.topbar.title = f"{self.item_code}"
             self._render_profiles()
             self._update_action_label()
+            if self._data.get("can_view_others"):
+                self.prefetch("item_others", [self.item_id])
 
         def _err(message: str):
             if self.handle_session_error(message):
                 return
             self.show_error("Servidor no disponible" if "No se puede conectar" in message else message)
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        item_id = self.item_id
+        self.fetch_cached(
+            "item_detail",
+            (item_id,),
+            lambda: self.manager.app.api.get_item_detail(item_id),
+            _ok,
+            on_error=_err,
+            slot="refresh",
+        )
 
     def _render_profiles(self):
         if not self.list_box or not self.lock_label:
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 from typing import List, Dict, Any
 
-from kivy.uix.scrollview import ScrollView
 from kivy.clock import Clock
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.list import MDList
+from kivymd.uix.recycleview import MDRecycleView
 from kivymd.uix.button import MDRaisedButton, MDFloatingActionButton, MDIconButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
@@ -13,7 +14,7 @@ from kivymd.uix.label import MDLabel
 from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.uix.card import MDCard
 
-from .base import BaseScreen
+from .base import BaseScreen, timed_render
 from app.core.session import SessionStore
 
 
@@ -22,13 +23,18 @@ class ItemsScreen(BaseScreen):
         super().__init__(**kwargs)
         self.items_cache: List[Dict[str, Any]] = []
         self._create_dialog = None
-        self.items_list: MDList | None = None
+        self.items_list: MDRecycleView | None = None
         self.empty_label: MDLabel | None = None
         self.fab: MDFloatingActionButton | None = None
         self.summary_cache: Dict[str, Dict[str, Any]] = {}
         self.summary_range = "all"
+        self._row_index: Dict[str, int] = {}
+        # Items con cuenta atras activa: el tick de cada segundo solo recorre estos.
+        self._cooldown_items: set[str] = set()
         self._name_dialog: MDDialog | None = None
         self._cooldown_event = None
+        self._rows_layout: RecycleBoxLayout | None = None
+        self._prefetch_trigger = Clock.create_trigger(lambda *_: self._prefetch_visible(), 0.3)
         self._build_ui()
 
     def _build_ui(self):
@@ -38,15 +44,29 @@ class ItemsScreen(BaseScreen):
             title="Items",
             right_action_items=[
                 ["chart-bar", lambda x: self.open_summary()],
+                ["speedometer", lambda x: self.open_debug()],
                 ["logout", lambda x: self.logout()],
             ],
         )
         root.add_widget(topbar)
 
-        scroll = ScrollView()
-        self.items_list = MDList()
-        scroll.add_widget(self.items_list)
-        root.add_widget(scroll)
+        # Solo las filas visibles existen como widgets; la lista completa vive en items_list.data.
+        self.items_list = MDRecycleView()
+        rows_layout = RecycleBoxLayout(
+            orientation="vertical",
+            default_size=(None, 64),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=8,
+        )
+        rows_layout.bind(minimum_height=rows_layout.setter("height"))
+        self.items_list.add_widget(rows_layout)
+        self._rows_layout = rows_layout
+        # Al parar de desplazar se precargan los detalles de las filas que quedan a la vista.
+        self.items_list.bind(scroll_y=lambda *_: self._prefetch_trigger())
+        # viewclass se guarda en el layout manager: se asigna despues de anadirlo.
+        self.items_list.viewclass = ItemRow
+        root.add_widget(self.items_list)
 
         self.empty_label = MDLabel(
             text="No hay items todavia",
@@ -69,33 +89,45 @@ class ItemsScreen(BaseScreen):
         self.refresh()
 
     def refresh(self):
-        def _do():
-            items = self.manager.app.api.get_items()
-            summary = None
-            try:
-                summary = self.manager.app.api.get_items_summary(self.summary_range)
-            except RuntimeError as exc:
-                if str(exc) == "SESSION_EXPIRED":
-                    raise
-            return items, summary
-
-        def _ok(result):
-            items, summary = result
+        # Items y resumen se piden a la vez: la lista se pinta con la primera respuesta y los
+        # totales se rellenan en las tarjetas cuando llega el resumen.
+        api = self.manager.app.api
+        summary_range = self.summary_range
+        state = {"items_ok": False}
+
+        def _items_ok(items):
             items = items or []
             for item in items:
                 if "name" not in item or item.get("name") is None:
                     item["name"] = ""
+            state["items_ok"] = True
             self.items_cache = items
-            self._set_summary(summary or [])
             self.render_items(self.items_cache)
 
-        def _err(message: str):
+        def _items_err(message: str):
             if self.handle_session_error(message):
                 return
             self.show_error("Servidor no disponible")
             self.render_items(self.items_cache)
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        def _summary_ok(summary):
+            self._set_summary(summary or [])
+            self._apply_summary()
+
+        def _summary_err(message: str):
+            # Sin resumen la lista sigue siendo util; la sesion caducada ya la avisa la peticion de items.
+            if message == "SESSION_EXPIRED" and state["items_ok"]:
+                self.handle_session_error(message)
+
+        self.fetch_cached("items", (), api.get_items, _items_ok, on_error=_items_err, slot="items")
+        self.fetch_cached(
+            "items_summary",
+            (summary_range,),
+            lambda: api.get_items_summary(summary_range, fields=["my_best_total"]),
+            _summary_ok,
+            on_error=_summary_err,
+            slot="summary",
+        )
 
     def _set_summary(self, summary_items: List[Dict[str, Any]]):
         self.summary_cache = {}
@@ -104,48 +136,90 @@ class ItemsScreen(BaseScreen):
             if item_id:
                 self.summary_cache[item_id] = row
 
+    def _total_text(self, item_id: str) -> str:
+        total_value = self.summary_cache.get(item_id, {}).get("my_best_total")
+        return "—" if total_value is None else f"{total_value:.2f}"
+
+    def _apply_summary(self):
+        # Solo cambia el texto de los totales; las filas visibles se actualizan en el sitio.
+        self._update_rows(
+            {index: {"total_text": self._total_text(item_id)} for item_id, index in self._row_index.items()}
+        )
+
+    def _update_rows(self, changes: Dict[int, Dict[str, Any]]):
+        if not self.items_list:
+            return
+        data = self.items_list.data
+        for index, fields in changes.items():
+            row = data[index]
+            if all(row.get(key) == value for key, value in fields.items()):
+                continue
+            row.update(fields)
+            view = self.items_list.view_adapter.get_visible_view(index)
+            if view is not None:
+                view.refresh_view_attrs(self.items_list, index, row)
+
+    def _remaining_cooldown(self, profile, item_id: str) -> int:
+        if profile is None:
+            return 0
+        _, remaining = self.manager.app.pin_store.can_view_name(profile, item_id)
+        return remaining
+
+    @timed_render
     def render_items(self, items: List[Dict[str, Any]]):
         if not self.items_list or not self.empty_label:
             self.show_error("UI incompleta: lista no disponible")
             return
-        self.items_list.clear_widgets()
         is_empty = not items
         self.empty_label.opacity = 1 if is_empty else 0
         self.empty_label.height = self.empty_label.texture_size[1] if is_empty else 0
         profile = SessionStore.get_profile()
-        any_cooldown = False
+        show_delete = self._is_admin_profile()
+        rows = []
+        self._row_index = {}
+        self._cooldown_items = set()
         for index, item in enumerate(items):
-            code = item.get("code")
             item_id = item.get("id")
             name = item.get("name")
             if name is None or name == "":
                 name = "(sin nombre)"
-            summary = self.summary_cache.get(item_id, {})
-            total_value = summary.get("my_best_total")
-            total_text = "—" if total_value is None else f"{total_value:.2f}"
-
-            remaining = 0
-            if profile is not None:
-                _, remaining = self.manager.app.pin_store.can_view_name(profile, item_id)
+            remaining = self._remaining_cooldown(profile, item_id)
             if remaining > 0:
-                any_cooldown = True
-
-            row = ItemCard(
-                code=str(code),
-                total_text=total_text,
-                cooldown_text=self._format_cooldown(remaining),
-                on_long_press=lambda _row, iid=item_id, iname=name: self.on_item_long_press(iid, iname),
-                on_long_release=lambda _row, iid=item_id: self.on_item_long_release(iid),
-                on_tap=lambda _row, iid=item_id, icode=code: self.open_score(iid, icode),
-                on_delete=lambda _row, iid=item_id, icode=code: self.on_delete_item(iid, icode),
-                show_delete=self._is_admin_profile(),
+                self._cooldown_items.add(item_id)
+            rows.append(
+                {
+                    "screen": self,
+                    "item_id": item_id,
+                    "code": str(item.get("code")),
+                    "name": name,
+                    "total_text": self._total_text(item_id),
+                    "cooldown_text": self._format_cooldown(remaining),
+                    "show_delete": show_delete,
+                }
             )
-            self.items_list.add_widget(row)
-            if index < len(items) - 1:
-                spacer = MDBoxLayout(size_hint_y=None, height=8)
-                self.items_list.add_widget(spacer)
+            self._row_index[item_id] = index
+        self.items_list.data = rows
+        self._set_cooldown_tick(bool(self._cooldown_items))
+        self._prefetch_trigger()
+
+    def _prefetch_visible(self):
+        if not self._rows_layout or not self.manager:
+            return
+        self.prefetch("item_detail", [row.item_id for row in reversed(self._rows_layout.children)])
 
-        self._set_cooldown_tick(any_cooldown)
+    def _tick_cooldowns(self):
+        # Cada segundo solo se reescriben las etiquetas de cuenta atras que cambian.
+        profile = SessionStore.get_profile()
+        changes = {}
+        for item_id in list(self._cooldown_items):
+            remaining = self._remaining_cooldown(profile, item_id)
+            if remaining <= 0:
+                self._cooldown_items.discard(item_id)
+            index = self._row_index.get(item_id)
+            if index is not None:
+                changes[index] = {"cooldown_text": self._format_cooldown(remaining)}
+        self._update_rows(changes)
+        self._set_cooldown_tick(bool(self._cooldown_items))
 
     def on_fab(self):
         self.open_create_dialog()
@@ -194,6 +268,7 @@ class ItemsScreen(BaseScreen):
             return self.manager.app.api.create_item(code, name)
 
         def _ok(_data):
+            self.manager.app.cache.invalidate("items", "items_summary")
             self.show_info("Item creado")
             try:
                 item_id = _data.get("id")
@@ -236,6 +311,11 @@ class ItemsScreen(BaseScreen):
     def open_summary(self):
         self.manager.current = "summary"
 
+    def open_debug(self):
+        from .debug import open_debug_dialog
+
+        open_debug_dialog(self)
+
     def on_item_long_press(self, item_id: str, item_name: str) -> bool:
         app = self.manager.app if self.manager else None
         profile = SessionStore.get_profile()
@@ -254,7 +334,8 @@ class ItemsScreen(BaseScreen):
         self._dismiss_name_dialog()
         if app and profile is not None:
             app.pin_store.mark_viewed_name(profile, item_id)
-            self.render_items(self.items_cache)
+            self._cooldown_items.add(item_id)
+            self._tick_cooldowns()
 
     def _show_name_dialog(self, name: str) -> None:
         self._dismiss_name_dialog()
@@ -291,6 +372,8 @@ class ItemsScreen(BaseScreen):
         def _do():
             return self.manager.app.api.delete_item(item_id)
         def _ok(_data):
+            self.manager.app.cache.invalidate("items", "items_summary", "rankings", "item_detail", "item_others")
+            self.manager.app.prefetcher.invalidate()
             self.show_info("Item borrado")
             self.refresh()
         def _err(message: str):
@@ -308,7 +391,7 @@ class ItemsScreen(BaseScreen):
 
     def _set_cooldown_tick(self, enabled: bool) -> None:
         if enabled and not self._cooldown_event:
-            self._cooldown_event = Clock.schedule_interval(lambda *_: self.render_items(self.items_cache), 1)
+            self._cooldown_event = Clock.schedule_interval(lambda *_: self._tick_cooldowns(), 1)
         if not enabled and self._cooldown_event:
             self._cooldown_event.cancel()
             self._cooldown_event = None
@@ -319,57 +402,78 @@ class ItemsScreen(BaseScreen):
         return f"Espera {self.manager.app.pin_store.format_mmss(remaining)}"
 
 
-class ItemCard(MDCard):
-    def __init__(
-        self,
-        code: str,
-        total_text: str,
-        cooldown_text: str,
-        on_long_press,
-        on_long_release,
-        on_tap,
-        on_delete,
-        show_delete: bool,
-        **kwargs,
-    ):
+class ItemRow(RecycleDataViewBehavior, MDCard):
+    # Fila reutilizable de items_list: refresh_view_attrs la rellena con un dict de data.
+    screen = None
+    item_id = None
+    code = ""
+    name = ""
+    total_text = ""
+    cooldown_text = ""
+    show_delete = False
+
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.orientation = "horizontal"
         self.padding = ("12dp", "10dp")
         self.spacing = "8dp"
-        self.size_hint_y = None
-        self.height = 64
         self.radius = [12, 12, 12, 12]
         self.line_width = 1
         self.line_color = (0.6, 0.6, 0.6, 1)
         self.md_bg_color = (1, 1, 1, 1)
 
-        self._on_long_press = on_long_press
-        self._on_long_release = on_long_release
-        self._on_tap = on_tap
-        self._on_delete = on_delete
         self._long_press_event = None
         self._long_press_fired = False
-        self.delete_btn = None
 
         left_box = MDBoxLayout(orientation="vertical", spacing="4dp")
-        self.code_label = MDLabel(text=code, halign="left")
-        self.cooldown_label = MDLabel(text=cooldown_text, halign="left", size_hint_y=None)
-        self.cooldown_label.bind(texture_size=lambda *_: setattr(self.cooldown_label, "height", self.cooldown_label.texture_size[1]))
+        self.code_label = MDLabel(text="", halign="left")
+        self.cooldown_label = MDLabel(text="", halign="left", size_hint_y=None, height=0, opacity=0)
+        self.cooldown_label.bind(texture_size=lambda *_: self._fit_cooldown_label())
         left_box.add_widget(self.code_label)
-        if cooldown_text:
-            left_box.add_widget(self.cooldown_label)
+        left_box.add_widget(self.cooldown_label)
         self.add_widget(left_box)
 
-        self.total_label = MDLabel(text=total_text, halign="right", size_hint_x=0.3)
+        self.total_label = MDLabel(text="", halign="right", size_hint_x=0.3)
         self.add_widget(self.total_label)
 
-        if show_delete:
-            self.delete_btn = MDIconButton(icon="trash-can")
-            self.delete_btn.bind(on_release=lambda *_: self._on_delete(self))
+        self.delete_btn = MDIconButton(icon="trash-can")
+        self.delete_btn.bind(on_release=lambda *_: self.screen.on_delete_item(self.item_id, self.code))
+
+    def refresh_view_attrs(self, rv, index, data):
+        if data.get("item_id") != self.item_id:
+            # La fila pasa a mostrar otro item: una pulsacion larga en curso ya no le corresponde.
+            self._cancel_long_press()
+        super().refresh_view_attrs(rv, index, data)
+        self.code_label.text = self.code
+        self.total_label.text = self.total_text
+        self.cooldown_label.text = self.cooldown_text
+        self._fit_cooldown_label()
+        if self.show_delete and self.delete_btn.parent is None:
             self.add_widget(self.delete_btn)
+        elif not self.show_delete and self.delete_btn.parent is not None:
+            self.remove_widget(self.delete_btn)
+
+    def _fit_cooldown_label(self):
+        self.cooldown_label.opacity = 1 if self.cooldown_text else 0
+        self.cooldown_label.height = self.cooldown_label.texture_size[1] if self.cooldown_text else 0
+
+    def _cancel_long_press(self):
+        if self._long_press_event:
+            self._long_press_event.cancel()
+            self._long_press_event = None
+        self._long_press_fired = False
+
+    def _on_long_press(self, _row) -> bool:
+        return self.screen.on_item_long_press(self.item_id, self.name)
+
+    def _on_long_release(self, _row) -> None:
+        self.screen.on_item_long_release(self.item_id)
+
+    def _on_tap(self, _row) -> None:
+        self.screen.open_score(self.item_id, self.code)
 
     def on_touch_down(self, touch):
-        if self.delete_btn and self.delete_btn.collide_point(*touch.pos):
+        if self.delete_btn.parent is not None and self.delete_btn.collide_point(*touch.pos):
             return super().on_touch_down(touch)
         if not self.collide_point(*touch.pos):
             return super().on_touch_down(touch)
@@ -377,6 +481,8 @@ class ItemCard(MDCard):
             self._long_press_event.cancel()
         self._long_press_fired = False
         self._long_press_event = Clock.schedule_once(self._fire_long_press, 6)
+        # Lo mas probable tras tocar una fila es abrirla: su detalle pasa el primero en la cola.
+        self.screen.prefetch("item_detail", [self.item_id], urgent=True)
         return True
 
     def on_touch_move(self, touch):
@@ -391,7 +497,7 @@ class ItemCard(MDCard):
         return super().on_touch_move(touch)
 
     def on_touch_up(self, touch):
-        if self.delete_btn and self.delete_btn.collide_point(*touch.pos):
+        if self.delete_btn.parent is not None and self.delete_btn.collide_point(*touch.pos):
             return super().on_touch_up(touch)
         if not self.collide_point(*touch.pos):
             return super().on_touch_up(touch)
@@ -83,16 +83,18 @@ class ProfileSelectScreen(BaseScreen):
         username, password = PROFILE_CREDENTIALS[profile_num]
         existing = SessionStore.get_token(profile_num)
         if existing:
-            app.api.set_token(existing)
+            # Guardado de una sesion anterior; si caducó, ApiClient lo renueva con el refresh token.
+            app.api.set_token(existing, SessionStore.get_refresh_token(profile_num))
             self.manager.current = "items"
             return
 
         def _do():
-            return app.api.login(username, password)
+            return app.api.login_tokens(username, password)
 
-        def _ok(token: str):
-            SessionStore.set_token(profile_num, token)
-            app.api.set_token(token)
+        def _ok(tokens):
+            token, refresh_token = tokens
+            SessionStore.set_token(profile_num, token, refresh_token)
+            app.api.set_token(token, refresh_token)
             self.show_info("Acceso OK")
             self.manager.current = "items"
 
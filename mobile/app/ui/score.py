@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import uuid
+
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.app import MDApp
 from kivymd.uix.button import MDRaisedButton, MDIconButton
@@ -10,6 +12,8 @@ from kivymd.uix.dialog import MDDialog
 from kivymd.uix.boxlayout import MDBoxLayout
 
 from .base import BaseScreen
+from app.core.api import UNREACHABLE
+from app.core.session import SessionStore
 
 
 class ScoreScreen(BaseScreen):
@@ -191,11 +195,16 @@ class ScoreScreen(BaseScreen):
             return
 
         self._set_loading(True)
+        item_id = self.item_id
+        # La misma clave acompana al rating si acaba en la cola offline y se reenvia.
+        idempotency_key = str(uuid.uuid4())
 
         def _do():
-            return self.manager.app.api.create_rating(self.item_id, a, b, c, d, n)
+            return self.manager.app.api.create_rating(item_id, a, b, c, d, n, idempotency_key=idempotency_key)
 
         def _ok(_data):
+            self.manager.app.cache.invalidate("items_summary", "rankings", "item_detail", "item_others")
+            self.manager.app.prefetcher.invalidate()
             self.show_info("Guardado")
             self._set_loading(False)
             detail = self.manager.get_screen("item_detail")
@@ -210,6 +219,14 @@ class ScoreScreen(BaseScreen):
                 self.show_error("Espera 5 minutos para volver a puntuar este item")
                 self._set_loading(False)
                 return
+            profile = SessionStore.get_profile()
+            if message == UNREACHABLE and profile is not None:
+                values = {"a": a, "b": b, "c": c, "d": d, "n": n}
+                self.manager.app.outbox.add(profile, item_id, idempotency_key, values)
+                self.show_info("Sin conexión: se enviará al volver la red")
+                self._set_loading(False)
+                self.manager.current = "item_detail"
+                return
             if "No se puede conectar" in message:
                 self.show_error("Servidor no disponible")
             else:
@@ -223,8 +240,21 @@ class ScoreScreen(BaseScreen):
             self.show_error("Item inválido")
             return
 
+        app = self.manager.app
+        item_id = self.item_id
+        profile = SessionStore.get_profile()
+        scope = None if profile is None else str(profile)
+        # Normalmente ya lo ha precargado el detalle; solo se pide si no hay copia fresca.
+        cached = app.cache.get(scope, "item_others", (item_id,)) if scope is not None else None
+        if cached is not None and cached[1]:
+            self._show_others_dialog(cached[0] or {})
+            return
+
         def _do():
-            return self.manager.app.api.get_others(self.item_id)
+            data = app.api.get_others(item_id)
+            if scope is not None:
+                app.cache.put(scope, "item_others", (item_id,), data)
+            return data
 
         def _ok(data):
             self._show_others_dialog(data or {})
@@ -240,7 +270,7 @@ class ScoreScreen(BaseScreen):
                 return
             self.show_error(message)
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        self.run_bg(_do, on_success=_ok, on_error=_err, key=("item_others", item_id), slot="others")
 
     def _show_others_dialog(self, data: dict):
         if self._others_dialog:
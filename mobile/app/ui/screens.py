@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import importlib
+import time
+from typing import Dict, Optional
+
+from kivy.uix.screenmanager import ScreenManager, ScreenManagerException
+
+# Pantallas de la app: nombre -> "modulo:Clase". El modulo (y sus widgets KivyMD) no se
+# importa hasta la primera vez que se navega a la pantalla o se pide con get_screen.
+SCREENS = {
+    "profile_select": "app.ui.profile:ProfileSelectScreen",
+    "login": "app.ui.auth:LoginScreen",
+    "items": "app.ui.items:ItemsScreen",
+    "score": "app.ui.score:ScoreScreen",
+    "item_detail": "app.ui.item_detail:ItemDetailScreen",
+    "summary": "app.ui.summary:SummaryScreen",
+}
+
+
+class LazyScreenManager(ScreenManager):
+    def __init__(self, registry: Dict[str, str] = SCREENS, startup=None, **kwargs):
+        self._registry = dict(registry)
+        self._startup = startup
+        super().__init__(**kwargs)
+
+    def get_screen(self, name):
+        # on_current tambien pasa por aqui, asi que "manager.current = nombre" construye la pantalla.
+        screen = self.loaded_screen(name)
+        if screen is not None:
+            return screen
+        if name not in self._registry:
+            raise ScreenManagerException('No Screen with name "%s".' % name)
+        return self._build_screen(name)
+
+    def has_screen(self, name):
+        return name in self._registry or super().has_screen(name)
+
+    def loaded_screen(self, name) -> Optional[object]:
+        # Pantalla ya construida o None; no construye nada (p. ej. para ocultar nombres al pausar).
+        for screen in self.screens:
+            if screen.name == name:
+                return screen
+        return None
+
+    def _build_screen(self, name):
+        started = time.perf_counter()
+        module_name, class_name = self._registry[name].split(":")
+        screen_cls = getattr(importlib.import_module(module_name), class_name)
+        screen = screen_cls(name=name)
+        self.add_widget(screen)
+        if self._startup is not None:
+            self._startup.record_screen(name, (time.perf_counter() - started) * 1000.0)
+        return screen
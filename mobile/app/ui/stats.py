@@ -10,7 +10,7 @@ from kivymd.uix.label import MDLabel
 from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.app import MDApp
 
-from .base import BaseScreen
+from .base import BaseScreen, timed_render
 
 
 class StatsScreen(BaseScreen):
@@ -109,7 +109,7 @@ class StatsScreen(BaseScreen):
                 self.loading_label.opacity = 0
                 self.loading_label.height = 0
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        self.run_bg(_do, on_success=_ok, on_error=_err, key=("ranking", self.range_key), slot="refresh")
 
     def _render_list(self, items: List[Dict[str, Any]]):
         if not self.items_list:
@@ -225,8 +225,11 @@ class ItemStatsScreen(BaseScreen):
                 self.loading_label.opacity = 0
                 self.loading_label.height = 0
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        self.run_bg(
+            _do, on_success=_ok, on_error=_err, key=("item_stats", self.item_id, self.range_key), slot="refresh"
+        )
 
+    @timed_render
     def _render_stats(self, data: Dict[str, Any]):
         if not self.stats_box or not self.ratings_list:
             self.show_error("UI incompleta: stats no disponibles")
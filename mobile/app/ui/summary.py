@@ -10,7 +10,7 @@ from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.card import MDCard
 
-from .base import BaseScreen
+from .base import BaseScreen, timed_render
 
 
 class SummaryScreen(BaseScreen):
@@ -103,7 +103,7 @@ class SummaryScreen(BaseScreen):
     def set_mode(self, mode: str):
         self.mode = mode
         if not self.data_cache.get(mode):
-            self.refresh()
+            self.refresh(prefetch=False)
         else:
             self.render()
 
@@ -111,17 +111,15 @@ class SummaryScreen(BaseScreen):
         self.metric = key
         self.render()
 
-    def refresh(self):
+    def refresh(self, prefetch: bool = True):
+        mode = self.mode
         if self.loading_label:
             self.loading_label.opacity = 1
             self.loading_label.height = self.loading_label.texture_size[1]
 
-        def _do():
-            return self.manager.app.api.get_rankings(self.mode)
-
         def _ok(data):
-            self.data_cache[self.mode] = data or {}
-            print("[Summary] rankings:", self.data_cache[self.mode])
+            self.data_cache[mode] = data or {}
+            print("[Summary] rankings:", self.data_cache[mode])
             if self.loading_label:
                 self.loading_label.opacity = 0
                 self.loading_label.height = 0
@@ -140,8 +138,37 @@ class SummaryScreen(BaseScreen):
                 self.loading_label.opacity = 0
                 self.loading_label.height = 0
 
-        self.run_bg(_do, on_success=_ok, on_error=_err)
+        self.fetch_cached(
+            "rankings",
+            (mode,),
+            lambda: self.manager.app.api.get_rankings(mode),
+            _ok,
+            on_error=_err,
+            slot=("refresh", mode),
+        )
+        if prefetch:
+            self._prefetch_other_mode(mode)
+
+    def _prefetch_other_mode(self, mode: str):
+        # El otro modo se pide en paralelo para que cambiar de pestaña pinte sin esperar. Si se
+        # cambia antes de que llegue, refresh comparte esta misma peticion (misma key).
+        other = "mine" if mode == "global" else "global"
+
+        def _ok(data):
+            self.data_cache[other] = data or {}
+            if self.mode == other:
+                self.render()
+
+        self.fetch_cached(
+            "rankings",
+            (other,),
+            lambda: self.manager.app.api.get_rankings(other),
+            _ok,
+            on_error=lambda _message: None,
+            slot="prefetch",
+        )
 
+    @timed_render
     def render(self):
         data = self.data_cache.get(self.mode) or {}
         if self.top_total_box and self.top_grid and self.top_bottom_box:
@@ -1,52 +1,134 @@
 ﻿from __future__ import annotations
 
+import os
+import time
+
+_T0 = time.perf_counter()
+
+from kivy.clock import Clock
 from kivy.core.window import Window
 from kivymd.app import MDApp
-from kivy.uix.screenmanager import ScreenManager
 
 from app.core.api import ApiClient
+from app.core.cache import LocalCache
+from app.core.outbox import OUTBOX_RETRY_SECONDS, RatingOutbox
 from app.core.pin import PinStore
-from app.ui.auth import LoginScreen
-from app.ui.items import ItemsScreen
-from app.ui.score import ScoreScreen
-from app.ui.summary import SummaryScreen
-from app.ui.profile import ProfileSelectScreen
-from app.ui.item_detail import ItemDetailScreen
+from app.core.prefetch import Prefetcher
+from app.core.session import SessionStore
+from app.core.startup import StartupTimer
+from app.core.tasks import TaskQueueFull, TaskRunner
+from app.core.telemetry import TELEMETRY_FILE, Telemetry
+from app.ui.screens import LazyScreenManager
+
+# Las pantallas se importan y construyen al navegar a ellas (ver app.ui.screens.SCREENS).
+STARTUP = StartupTimer(_T0)
+STARTUP.mark("imports")
 
 Window.size = (420, 800)
 
 
 class RatingApp(MDApp):
     def build(self):
+        self.startup = STARTUP
         self.title = "Rating App"
         self.theme_cls.primary_palette = "Blue"
-        self.api = ApiClient()
+        SessionStore.load(self.user_data_dir)
+        self.telemetry = Telemetry()
+        self.api = ApiClient(telemetry=self.telemetry)
+        self.api.on_tokens_refreshed = SessionStore.replace_refreshed
+        self.tasks = TaskRunner()
+        self.cache = LocalCache(self.user_data_dir)
+        self.outbox = RatingOutbox(self.user_data_dir)
+        self.prefetcher = Prefetcher(self.api, self.cache, self.tasks)
         self.pin_store = PinStore(self.user_data_dir)
         self._pin_dialog = None
         Window.bind(on_focus=self._on_focus_change)
 
-        sm = ScreenManager()
+        self.startup.mark("services")
+
+        sm = LazyScreenManager(startup=self.startup)
         sm.app = self
-        sm.add_widget(LoginScreen(name="login"))
-        sm.add_widget(ItemsScreen(name="items"))
-        sm.add_widget(ScoreScreen(name="score"))
-        sm.add_widget(ItemDetailScreen(name="item_detail"))
-        sm.add_widget(SummaryScreen(name="summary"))
-        sm.add_widget(ProfileSelectScreen(name="profile_select"))
         sm.current = "profile_select"
+        self.startup.mark("build")
+        Clock.schedule_interval(lambda *_: self.flush_outbox(), OUTBOX_RETRY_SECONDS)
         return sm
 
+    def on_start(self):
+        # El primer frame se pinta tras on_start; se anota en el siguiente tick del reloj.
+        Clock.schedule_once(lambda *_: self._on_first_frame(), 0)
+
+    def _on_first_frame(self):
+        self.startup.mark("first_frame")
+
+    def flush_outbox(self):
+        # Reenvia en segundo plano los ratings guardados sin red (solo los del perfil activo).
+        profile = SessionStore.get_profile()
+        if profile is None or not self.api.token or not self.outbox.count(profile):
+            return
+        try:
+            future = self.tasks.submit(lambda: self.outbox.flush(self.api, profile), key=("outbox", profile))
+        except TaskQueueFull:
+            return
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda *_: self._on_outbox_flushed(f), 0))
+
+    def _on_outbox_flushed(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if not result["sent"] and not result["dropped"]:
+            return
+        self.cache.invalidate("items_summary", "rankings", "item_detail", "item_others")
+        self.prefetcher.invalidate()
+        screen = self.root.current_screen
+        if result["sent"]:
+            screen.show_info(f"Puntuaciones pendientes enviadas: {result['sent']}")
+        if result["dropped"]:
+            screen.show_error(f"Puntuaciones pendientes rechazadas: {result['dropped']}")
+        if hasattr(screen, "refresh"):
+            screen.refresh()
+
+    def on_stop(self):
+        self._export_telemetry()
+        self.tasks.shutdown()
+        self.api.close()
+        self.cache.close()
+        self.outbox.close()
+        self.pin_store.close()
+
     def on_pause(self):
         self.lock_names()
+        # Android puede matar la app en pausa sin llamar a on_stop.
+        self.pin_store.flush()
+        self._export_telemetry()
         return True
 
+    def debug_stats(self):
+        # Contadores que acompanan a la telemetria en telemetry.json y en el dialogo de rendimiento.
+        return {
+            "startup": self.startup.stats(),
+            "tasks": self.tasks.stats(),
+            "prefetch": self.prefetcher.stats(),
+        }
+
+    def _export_telemetry(self):
+        # Deja telemetry.json en user_data_dir para adjuntarlo a un informe de lentitud.
+        try:
+            self.telemetry.export(os.path.join(self.user_data_dir, TELEMETRY_FILE), self.debug_stats())
+        except OSError:
+            pass
+
+    def on_resume(self):
+        self.flush_outbox()
+
     def _on_focus_change(self, _window, focused: bool):
         if not focused:
             self.lock_names()
 
     def lock_names(self):
-        screen = self.root.get_screen("items")
-        screen.hide_names()
+        # Si la pantalla de items aun no se ha abierto no hay nombres que ocultar.
+        screen = self.root.loaded_screen("items")
+        if screen is not None:
+            screen.hide_names()
 
     def _dismiss_pin_dialog(self):
         if self._pin_dialog:
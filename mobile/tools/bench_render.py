@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import argparse
+import builtins
+import json
+import os
+import tempfile
+import time
+
+from app.core.pin import NAME_VIEW_COOLDOWN, PinStore
+
+# Kivy interpreta sys.argv al importarse; los argumentos son de esta herramienta.
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+
+class OpenCounter:
+    def __init__(self):
+        self.count = 0
+        self._open = builtins.open
+
+    def __enter__(self):
+        def counting_open(*args, **kwargs):
+            self.count += 1
+            return self._open(*args, **kwargs)
+
+        builtins.open = counting_open
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open = self._open
+
+
+def legacy_can_view_name(path: str, profile_num: int, item_id: str) -> tuple[bool, int]:
+    # Comportamiento anterior de PinStore: abrir y parsear el JSON en cada consulta.
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    until = float(data.get(str(profile_num), {}).get(item_id, 0))
+    remaining = max(0, int(until - time.time()))
+    return remaining == 0, remaining
+
+
+def time_passes(fn, passes: int) -> float:
+    started = time.perf_counter()
+    for _ in range(passes):
+        fn()
+    return (time.perf_counter() - started) * 1000.0 / passes
+
+
+def bench_pin_store(base_dir: str, item_ids: list[str], cooldowns: int, passes: int) -> None:
+    store = PinStore(base_dir, flush_delay=0)
+    for item_id in item_ids[:cooldowns]:
+        store.mark_viewed_name(1, item_id)
+    store.close()
+    path = os.path.join(base_dir, "name_view_cooldowns.json")
+
+    with OpenCounter() as opened:
+        legacy_ms = time_passes(lambda: [legacy_can_view_name(path, 1, i) for i in item_ids], passes)
+    legacy_reads = opened.count // passes
+
+    store = PinStore(base_dir)
+    with OpenCounter() as opened:
+        memory_ms = time_passes(lambda: [store.can_view_name(1, i) for i in item_ids], passes)
+    print(f"  can_view_name x{len(item_ids)} (JSON por consulta)  {legacy_ms:8.2f} ms/pasada  {legacy_reads} lecturas")
+    print(f"  can_view_name x{len(item_ids)} (en memoria)         {memory_ms:8.2f} ms/pasada  {opened.count // passes} lecturas")
+
+    started = time.perf_counter()
+    for item_id in item_ids[:cooldowns]:
+        store.mark_viewed_name(2, item_id)
+    mark_ms = (time.perf_counter() - started) * 1000.0
+    store.close()
+    with open(path, "r", encoding="utf-8") as f:
+        saved = len(json.load(f).get("2", {}))
+    print(f"  mark_viewed_name x{cooldowns}                  {mark_ms:8.2f} ms (UI)     {saved} guardados al cerrar")
+
+
+def bench_render_items(base_dir: str, item_ids: list[str], cooldowns: int, passes: int) -> None:
+    try:
+        from kivy.config import Config
+
+        # Sin limite de fps: Clock.tick procesa el frame sin dormir hasta el siguiente.
+        Config.set("graphics", "maxfps", "0")
+        from kivy.clock import Clock
+        from kivymd.app import MDApp
+
+        from app.core.session import SessionStore
+        from app.ui.items import ItemsScreen
+    except Exception as exc:  # sin ventana/kivymd no se puede construir la pantalla
+        print(f"  [SKIP] render_items: kivymd no disponible ({exc.__class__.__name__}: {exc})")
+        return
+
+    app = MDApp()
+    app.pin_store = PinStore(base_dir)
+    for item_id in item_ids[:cooldowns]:
+        app.pin_store.mark_viewed_name(1, item_id)
+    SessionStore.set_profile(1)
+
+    class Manager:
+        pass
+
+    screen = ItemsScreen(name="items", size=(420, 800))
+    screen.manager = Manager()
+    screen.manager.app = app
+    items = [{"id": item_id, "code": f"C{i:04d}", "name": f"Item {i}"} for i, item_id in enumerate(item_ids)]
+    screen.items_cache = items
+
+    def render():
+        # Incluye el frame siguiente: ahi se crean y colocan los widgets de las filas.
+        screen.render_items(items)
+        Clock.tick()
+
+    def tick():
+        screen._tick_cooldowns()
+        Clock.tick()
+
+    render()
+    with OpenCounter() as opened:
+        render_ms = time_passes(render, passes)
+    tick_ms = time_passes(tick, passes)
+    screen._set_cooldown_tick(False)
+    app.pin_store.close()
+    rows = len(screen.items_list.view_adapter.views) if hasattr(screen.items_list, "view_adapter") else len(items)
+    print(f"  render_items x{len(items)}                       {render_ms:8.2f} ms/render  {opened.count // passes} lecturas  {rows} filas con widget")
+    print(f"  tick de cooldowns                        {tick_ms:8.2f} ms/tick")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide render_items y las consultas de cooldown de PinStore.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--cooldowns", type=int, default=100, help="items con cooldown activo")
+    parser.add_argument("--passes", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    item_ids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(args.items)]
+    with tempfile.TemporaryDirectory() as base_dir:
+        print(f"PinStore ({args.cooldowns} cooldowns de {NAME_VIEW_COOLDOWN}s)")
+        bench_pin_store(base_dir, item_ids, args.cooldowns, args.passes)
+        print("ItemsScreen")
+        bench_render_items(base_dir, item_ids, args.cooldowns, args.passes)
+
+
+if __name__ == "__main__":
+    main()
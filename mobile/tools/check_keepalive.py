@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.core.api import POOL_SIZE, ApiClient
+
+
+# Servidor local que imita al backend y cuenta conexiones TCP y peticiones.
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests: dict[str, int] = {}
+        self.fail_next = 0
+
+    def reset(self, fail_next: int = 0) -> None:
+        with self.lock:
+            self.connections = 0
+            self.requests = {}
+            self.fail_next = fail_next
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo salen en dos escrituras: sin esto, Nagle + ACK retardado suman 40 ms.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self) -> bool:
+        # Devuelve True si esta peticion debe fallar con 503 (simula un backend arrancando).
+        with self.server.lock:
+            key = f"{self.command} {self.path}"
+            self.server.requests[key] = self.server.requests.get(key, 0) + 1
+            if self.server.fail_next > 0:
+                self.server.fail_next -= 1
+                return True
+        return False
+
+    def do_GET(self):
+        if self._count():
+            self._reply(503, {"detail": "starting"})
+            return
+        self._reply(200, [{"id": str(i), "code": f"I{i:03d}", "name": ""} for i in range(20)])
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self._count():
+            self._reply(503, {"detail": "starting"})
+            return
+        self._reply(200, {"id": "r1"})
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Comprueba que ApiClient reutiliza conexiones y solo reintenta GET.")
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    server = StandInServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = []
+
+    def check(name: str, ok: bool, detail: str) -> None:
+        print(f"[{'OK  ' if ok else 'FAIL'}] {name:<34} {detail}")
+        if not ok:
+            failures.append(name)
+
+    server.reset()
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        requests.get(f"{base_url}/items", timeout=10).json()
+    baseline_ms = (time.perf_counter() - started) * 1000.0
+    check("requests.get sin sesion", server.connections == args.calls,
+          f"{server.connections} conexiones / {args.calls} peticiones  {baseline_ms:.0f} ms")
+
+    client = ApiClient(base_url)
+    server.reset()
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        client.get_items()
+    pooled_ms = (time.perf_counter() - started) * 1000.0
+    check("ApiClient secuencial", server.connections == 1,
+          f"{server.connections} conexiones / {args.calls} peticiones  {pooled_ms:.0f} ms")
+
+    server.reset()
+    with ThreadPoolExecutor(max_workers=POOL_SIZE) as pool:
+        list(pool.map(lambda _: client.get_items(), range(args.calls)))
+    check(f"ApiClient con {POOL_SIZE} hilos", server.connections <= POOL_SIZE,
+          f"{server.connections} conexiones (pool de {POOL_SIZE})")
+
+    server.reset(fail_next=2)
+    items = client.get_items()
+    check("GET reintenta tras 503", len(items) == 20 and server.requests.get("GET /items") == 3,
+          f"{server.requests.get('GET /items')} intentos, {server.connections} conexiones")
+
+    server.reset(fail_next=1)
+    try:
+        client.create_rating("x", 1, 1, 1, 1, 1)
+        posted = "sin error"
+    except RuntimeError as exc:
+        posted = str(exc)
+    check("POST no se reintenta", server.requests.get("POST /items/x/ratings") == 1,
+          f"{server.requests.get('POST /items/x/ratings')} intento ({posted})")
+
+    client.close()
+    server.shutdown()
+    if failures:
+        sys.exit(1)
+    print("Todo OK")
+
+
+if __name__ == "__main__":
+    main()
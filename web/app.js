@@ -17,8 +17,18 @@ const state = {
   detail: null,
   rankingsMode: "mine",
   rankings: null,
+  // Cuándo se pidió cada lista: al volver a una vista reciente no se vuelve a pedir.
+  itemsLoadedAt: 0,
+  itemsList: null,
+  rankingsByMode: {},
 };
 
+// Al volver a Items o cambiar de pestaña en Resumen se reutilizan los datos si son más recientes que esto.
+const VIEW_MAX_AGE_MS = 30000;
+// A partir de estas filas solo se crean nodos para las visibles (más OVERSCAN por arriba y por abajo).
+const VIRTUAL_MIN_ROWS = 100;
+const OVERSCAN = 8;
+
 const app = document.getElementById("app");
 
 function saveToken(profile, token) {
@@ -72,9 +82,161 @@ async function api(path, opts = {}) {
   }
 }
 
+// format=columnar: arrays por campo; se reconstruyen las filas que usa el resto de la app.
+function rowsFromColumnar(data) {
+  if (!data || !data.columns) return data;
+  const arrays = { ...(data.items || {}), ...data.columns };
+  const count = (arrays.id || []).length;
+  const keys = Object.keys(arrays);
+  const rows = [];
+  for (let i = 0; i < count; i++) {
+    const row = {};
+    keys.forEach(k => (row[k] = arrays[k][i]));
+    rows.push(row);
+  }
+  return rows;
+}
+
+function rankingsFromColumnar(data) {
+  if (!data || !data.columns) return data;
+  const { item_id: ids, code: codes } = data.items;
+  const out = {};
+  Object.entries(data.columns).forEach(([metric, col]) => {
+    out[metric] = col.item.map((i, pos) => ({ item_id: ids[i], code: codes[i], value: col.value[pos] }));
+  });
+  return out;
+}
+
+// Cada vista vive en su propia <section> dentro de #app: se construye una vez por sesión y al
+// navegar solo se muestra u oculta, sin volver a crear su DOM.
+const views = {};
+
+function showView(name, build) {
+  state.view = name;
+  if (!views[name]) {
+    const section = document.createElement("section");
+    section.dataset.view = name;
+    app.appendChild(section);
+    views[name] = section;
+    build(section);
+  }
+  Object.entries(views).forEach(([key, section]) => section.classList.toggle("hidden", key !== name));
+  return views[name];
+}
+
+function resetViews() {
+  // Otro perfil: nada de lo pintado ni de lo pedido con el anterior vale.
+  if (state.itemsList) state.itemsList.destroy();
+  state.itemsList = null;
+  Object.keys(views).forEach(key => {
+    views[key].remove();
+    delete views[key];
+  });
+  state.items = [];
+  state.summary = {};
+  state.itemsLoadedAt = 0;
+  state.rankingsByMode = {};
+  state.rankings = null;
+  state.detail = null;
+}
+
+function setText(el, text) {
+  if (el.textContent !== text) el.textContent = text;
+}
+
+// Lista con clave: cada fila conserva su nodo (data-key) entre pintados; solo se crean las nuevas,
+// se actualiza el texto que cambia, se mueven las que cambian de posición y se quitan las que sobran.
+function patchKeyed(container, rows, keyOf, create, update) {
+  const existing = new Map();
+  for (const el of container.children) {
+    if (el.dataset.key !== undefined) existing.set(el.dataset.key, el);
+  }
+  rows.forEach((row, i) => {
+    const key = String(keyOf(row));
+    let el = existing.get(key);
+    if (el) {
+      existing.delete(key);
+    } else {
+      el = create(row);
+      el.dataset.key = key;
+    }
+    update(el, row, i);
+    const at = container.children[i];
+    if (at !== el) container.insertBefore(el, at || null);
+  });
+  while (container.children.length > rows.length) container.lastElementChild.remove();
+}
+
+// Lista virtualizada sobre el scroll de la página: con muchas filas solo existen los nodos de las
+// visibles y el resto se sustituye por padding arriba y abajo (todas las filas miden lo mismo).
+function virtualList(container, keyOf, create, update) {
+  const list = { rows: [], step: 0, first: -1, last: -1 };
+  let frame = 0;
+
+  function measure() {
+    const sample = container.querySelector("[data-key]");
+    const height = sample ? sample.getBoundingClientRect().height : 0;
+    if (!height) return;
+    const gap = parseFloat(getComputedStyle(container).rowGap) || 0;
+    list.step = height + gap;
+  }
+
+  function render(force) {
+    const rows = list.rows;
+    if (rows.length < VIRTUAL_MIN_ROWS) {
+      if (!force) return;
+      container.style.paddingTop = container.style.paddingBottom = "";
+      patchKeyed(container, rows, keyOf, create, update);
+      return;
+    }
+    if (!list.step) {
+      // Aún sin altura de fila: se pinta un tramo corto y se mide. Con la vista oculta no se
+      // puede medir; se reintenta al mostrarla (refresh) o al desplazar.
+      patchKeyed(container, rows.slice(0, OVERSCAN), keyOf, create, update);
+      measure();
+      if (!list.step) return;
+      force = true;
+    }
+    const top = Math.max(0, -container.getBoundingClientRect().top);
+    const first = Math.max(0, Math.floor(top / list.step) - OVERSCAN);
+    const last = Math.min(rows.length, Math.ceil((top + window.innerHeight) / list.step) + OVERSCAN);
+    if (!force && first === list.first && last === list.last) return;
+    list.first = first;
+    list.last = last;
+    container.style.paddingTop = `${first * list.step}px`;
+    container.style.paddingBottom = `${(rows.length - last) * list.step}px`;
+    patchKeyed(container, rows.slice(first, last), keyOf, create, (el, row, i) => update(el, row, first + i));
+  }
+
+  function onScroll() {
+    if (frame || container.offsetParent === null) return;
+    frame = requestAnimationFrame(() => {
+      frame = 0;
+      render(false);
+    });
+  }
+
+  window.addEventListener("scroll", onScroll, { passive: true });
+  window.addEventListener("resize", onScroll);
+
+  list.setRows = rows => {
+    list.rows = rows;
+    render(true);
+  };
+  list.refresh = () => render(false);
+  list.destroy = () => {
+    window.removeEventListener("scroll", onScroll);
+    window.removeEventListener("resize", onScroll);
+  };
+  return list;
+}
+
 function renderLogin() {
+  resetViews();
   state.view = "login";
-  app.innerHTML = `
+  const section = document.createElement("section");
+  section.dataset.view = "login";
+  section.innerHTML = `
     <div class="header"><h1>Perfil</h1></div>
     <div class="card">
       <div class="grid">
@@ -93,11 +255,13 @@ function renderLogin() {
       </div>
     </div>
   `;
+  app.appendChild(section);
+  views.login = section;
 
   const pinBox = document.getElementById("pinBox");
   let selectedProfile = null;
 
-  app.querySelectorAll("[data-profile]").forEach(btn => {
+  section.querySelectorAll("[data-profile]").forEach(btn => {
     btn.addEventListener("click", () => {
       selectedProfile = parseInt(btn.dataset.profile, 10);
       pinBox.classList.remove("hidden");
@@ -120,7 +284,7 @@ function renderLogin() {
     const existing = loadToken(selectedProfile);
     if (existing) {
       setAuth(selectedProfile, existing);
-      await renderItems();
+      await enterItems();
       return;
     }
     try {
@@ -129,7 +293,7 @@ function renderLogin() {
         body: JSON.stringify({ profile: String(selectedProfile), pin }),
       });
       setAuth(selectedProfile, res.access_token);
-      await renderItems();
+      await enterItems();
     } catch (e) {
       if (e.status === 0) toast("Servidor no disponible");
       else toast(e.detail || "Error de login");
@@ -137,9 +301,17 @@ function renderLogin() {
   };
 }
 
-async function renderItems() {
-  state.view = "items";
-  app.innerHTML = `
+async function enterItems() {
+  // La vista de login no se reutiliza: se quita al entrar.
+  if (views.login) {
+    views.login.remove();
+    delete views.login;
+  }
+  await renderItems();
+}
+
+function buildItemsView(section) {
+  section.innerHTML = `
     <div class="header">
       <h1>Items</h1>
       <div class="footer-actions">
@@ -154,6 +326,7 @@ async function renderItems() {
       </div>
       <button id="createItem" class="btn">Crear item</button>
     </div>
+    <div id="itemsEmpty" class="notice hidden">No hay items</div>
     <div id="itemsList" class="list"></div>
   `;
 
@@ -171,6 +344,9 @@ async function renderItems() {
     if (!code) return toast("Código requerido");
     try {
       const res = await api("/items", { method: "POST", body: JSON.stringify({ code, name }) });
+      state.itemsLoadedAt = 0;
+      document.getElementById("newCode").value = "";
+      document.getElementById("newName").value = "";
       await renderDetail(res.id);
     } catch (e) {
       if (e.status === 401) return handle401();
@@ -179,15 +355,47 @@ async function renderItems() {
     }
   };
 
+  const list = document.getElementById("itemsList");
+  // Un solo listener para todas las filas, presentes y futuras.
+  list.addEventListener("click", e => {
+    const row = e.target.closest("[data-key]");
+    if (row) renderDetail(row.dataset.key);
+  });
+  state.itemsList = virtualList(list, it => it.id, createItemRow, updateItemRow);
+}
+
+function createItemRow() {
+  const row = document.createElement("div");
+  row.className = "list-item";
+  row.innerHTML = `<div class="code"></div><div class="value"></div>`;
+  return row;
+}
+
+function updateItemRow(row, it) {
+  const val = (state.summary[it.id] || {}).my_best_total;
+  setText(row.firstElementChild, String(it.code));
+  setText(row.lastElementChild, typeof val === "number" ? val.toFixed(1) : "—");
+}
+
+async function renderItems() {
+  showView("items", buildItemsView);
+  // De vuelta a la vista: el scroll de la página ha cambiado, se recalcula el tramo visible.
+  state.itemsList.refresh();
+  if (Date.now() - state.itemsLoadedAt < VIEW_MAX_AGE_MS) return;
+  await loadItems();
+}
+
+async function loadItems() {
   try {
     const [items, summary] = await Promise.all([
       api("/items"),
-      api("/items/summary?range=all").catch(() => []),
+      api("/items/summary?range=all&format=columnar&fields=my_best_total").then(rowsFromColumnar).catch(() => []),
     ]);
     state.items = items || [];
     state.summary = {};
     (summary || []).forEach(r => (state.summary[r.id] = r));
-    renderItemsList();
+    state.itemsLoadedAt = Date.now();
+    if (views.items) renderItemsList();
   } catch (e) {
     if (e.status === 401) return handle401();
     toast("Servidor no disponible");
@@ -195,39 +403,28 @@ async function renderItems() {
 }
 
 function renderItemsList() {
-  const list = document.getElementById("itemsList");
-  list.innerHTML = "";
-  if (!state.items.length) {
-    list.innerHTML = `<div class="notice">No hay items</div>`;
-    return;
-  }
-  state.items.forEach(it => {
-    const sum = state.summary[it.id] || {};
-    const val = sum.my_best_total;
-    const total = typeof val === "number" ? val.toFixed(1) : "—";
-    const row = document.createElement("div");
-    row.className = "list-item";
-    row.innerHTML = `
-      <div class="code">${it.code}</div>
-      <div class="value">${total}</div>
-    `;
-    row.onclick = () => renderDetail(it.id);
-    list.appendChild(row);
-  });
+  document.getElementById("itemsEmpty").classList.toggle("hidden", state.items.length > 0);
+  state.itemsList.setRows(state.items);
 }
 
-async function renderDetail(itemId) {
-  state.view = "detail";
-  app.innerHTML = `
+function buildDetailView(section) {
+  section.innerHTML = `
     <div class="header">
       <h1>Detalle</h1>
       <div class="footer-actions">
-        <button id="backItems" class="btn secondary">Volver</button>
+        <button id="detailBack" class="btn secondary">Volver</button>
       </div>
     </div>
     <div id="detailBox" class="card"></div>
   `;
-  document.getElementById("backItems").onclick = () => renderItems();
+  document.getElementById("detailBack").onclick = () => renderItems();
+}
+
+async function renderDetail(itemId) {
+  showView("detail", buildDetailView);
+  if (!state.detail || (state.detail.item || {}).id !== itemId) {
+    document.getElementById("detailBox").innerHTML = "";
+  }
 
   try {
     const data = await api(`/items/${itemId}/detail`);
@@ -318,6 +515,9 @@ async function saveRating(itemId) {
       method: "POST",
       body: JSON.stringify({ a, b, c, d, n }),
     });
+    // Cambian mi mejor total y los rankings: se piden de nuevo al volver a esas vistas.
+    state.itemsLoadedAt = 0;
+    state.rankingsByMode = {};
     toast("Guardado");
     await renderDetail(itemId);
   } catch (e) {
@@ -327,35 +527,67 @@ async function saveRating(itemId) {
   }
 }
 
-async function renderRankings() {
-  state.view = "rankings";
-  app.innerHTML = `
+const RANKING_METRICS = ["total", "a", "b", "c", "d", "n"];
+
+function buildRankingsView(section) {
+  section.innerHTML = `
     <div class="header">
       <h1>Resumen</h1>
       <div class="footer-actions">
-        <button id="backItems" class="btn secondary">Volver</button>
+        <button id="rankingsBack" class="btn secondary">Volver</button>
       </div>
     </div>
-    <div class="tabs">
+    <div id="rankingTabs" class="tabs">
       <div class="tab" data-mode="mine">Míos</div>
       <div class="tab" data-mode="global">Global</div>
     </div>
-    <div id="rankingsBody"></div>
+    <div id="rankingsBody">
+      ${RANKING_METRICS.map(m => `
+        <div class="card">
+          <div class="small">Top ${m.toUpperCase()}</div>
+          <div class="notice hidden" data-empty="${m}">Sin datos</div>
+          <div class="list" data-metric="${m}"></div>
+        </div>
+      `).join("")}
+    </div>
   `;
-  document.getElementById("backItems").onclick = () => renderItems();
-
-  app.querySelectorAll(".tab").forEach(tab => {
-    tab.onclick = () => {
-      state.rankingsMode = tab.dataset.mode;
-      renderRankings();
-    };
-    if (tab.dataset.mode === state.rankingsMode) tab.classList.add("active");
+  document.getElementById("rankingsBack").onclick = () => renderItems();
+
+  document.getElementById("rankingTabs").addEventListener("click", e => {
+    const tab = e.target.closest("[data-mode]");
+    if (!tab || tab.dataset.mode === state.rankingsMode) return;
+    state.rankingsMode = tab.dataset.mode;
+    renderRankings();
   });
 
+  document.getElementById("rankingsBody").addEventListener("click", e => {
+    const row = e.target.closest("[data-item]");
+    if (row) renderDetail(row.dataset.item);
+  });
+}
+
+async function renderRankings() {
+  const section = showView("rankings", buildRankingsView);
+  section.querySelectorAll(".tab").forEach(tab => tab.classList.toggle("active", tab.dataset.mode === state.rankingsMode));
+
+  const cached = state.rankingsByMode[state.rankingsMode];
+  if (cached) {
+    state.rankings = cached.data;
+    renderRankingsBody();
+    if (Date.now() - cached.at < VIEW_MAX_AGE_MS) return;
+  }
+  await loadRankings();
+}
+
+async function loadRankings() {
+  const mode = state.rankingsMode;
   try {
-    const data = await api(`/rankings?mode=${state.rankingsMode}`);
+    const data = rankingsFromColumnar(await api(`/rankings?mode=${mode}&format=columnar`));
+    state.rankingsByMode[mode] = { data, at: Date.now() };
+    // Si entretanto se cambió de pestaña, esta respuesta queda guardada pero no se pinta.
+    if (mode !== state.rankingsMode) return;
     state.rankings = data;
-    renderRankingsBody();
+    if (views.rankings) renderRankingsBody();
   } catch (e) {
     if (e.status === 401) return handle401();
     toast(e.status === 0 ? "Servidor no disponible" : (e.detail || "Error"));
@@ -365,33 +597,24 @@ async function renderRankings() {
 function renderRankingsBody() {
   const body = document.getElementById("rankingsBody");
   const data = state.rankings || {};
-  const metrics = ["total", "a", "b", "c", "d", "n"];
-  body.innerHTML = metrics
-    .map(m => renderRankingSection(m, data[m] || []))
-    .join("");
-
-  body.querySelectorAll("[data-item]").forEach(el => {
-    el.onclick = () => renderDetail(el.dataset.item);
+  RANKING_METRICS.forEach(m => {
+    const list = data[m] || [];
+    body.querySelector(`[data-empty="${m}"]`).classList.toggle("hidden", list.length > 0);
+    patchKeyed(body.querySelector(`[data-metric="${m}"]`), list, r => r.item_id, createRankingRow, updateRankingRow);
   });
 }
 
-function renderRankingSection(metric, list) {
-  const title = metric.toUpperCase();
-  const rows = list.length
-    ? list.map((r, i) => `
-        <div class="list-item" data-item="${r.item_id}">
-          <div class="code">#${i + 1} ${r.code}</div>
-          <div class="value">${r.value.toFixed(1)}</div>
-        </div>
-      `).join("")
-    : `<div class="notice">Sin datos</div>`;
+function createRankingRow(r) {
+  const row = document.createElement("div");
+  row.className = "list-item";
+  row.dataset.item = r.item_id;
+  row.innerHTML = `<div class="code"></div><div class="value"></div>`;
+  return row;
+}
 
-  return `
-    <div class="card">
-      <div class="small">Top ${title}</div>
-      <div class="list">${rows}</div>
-    </div>
-  `;
+function updateRankingRow(row, r, i) {
+  setText(row.firstElementChild, `#${i + 1} ${r.code}`);
+  setText(row.lastElementChild, r.value.toFixed(1));
 }
 
 function handle401() {
@@ -399,4 +622,15 @@ function handle401() {
   renderLogin();
 }
 
+// El service worker sirve /items, /items/summary y /rankings desde su copia y avisa si al
+// revalidar han cambiado: se vuelve a pedir la vista abierta (ya llega la copia nueva).
+if ("serviceWorker" in navigator) {
+  navigator.serviceWorker.addEventListener("message", (event) => {
+    const msg = event.data || {};
+    if (msg.type !== "api-updated" || !state.token) return;
+    if (state.view === "items" && msg.path.startsWith("/items")) loadItems();
+    else if (state.view === "rankings" && msg.path === "/rankings") loadRankings();
+  });
+}
+
 renderLogin();
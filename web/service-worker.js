@@ -1,23 +1,104 @@
-﻿const CACHE_NAME = "rating-pwa-v1";
-const ASSETS = ["./", "./index.html", "./styles.css", "./app.js", "./manifest.json"]; 
+﻿// ASSETS_VERSION lo reescribe `python -m tools.build_web` (en backend/) con un hash del contenido de
+// ASSETS: cambiar cualquiera cambia este fichero, el navegador instala el worker nuevo y se borra la cache anterior.
+const ASSETS_VERSION = "7d01a3e582";
+const STATIC_CACHE = `rating-static-${ASSETS_VERSION}`;
+const API_CACHE = "rating-api-v1";
+const ASSETS = ["./", "./index.html", "./styles.css", "./app.js", "./manifest.json"];
+
+// GETs de la API que se sirven al instante desde la copia guardada y se revalidan en segundo plano.
+const API_PATHS = ["/items", "/items/summary", "/rankings"];
 
 self.addEventListener("install", (event) => {
-  event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.addAll(ASSETS)));
+  event.waitUntil(
+    caches.open(STATIC_CACHE)
+      // cache: "reload" evita que la cache HTTP devuelva la version anterior de los ficheros.
+      .then((cache) => cache.addAll(ASSETS.map((url) => new Request(url, { cache: "reload" }))))
+      .then(() => self.skipWaiting())
+  );
 });
 
 self.addEventListener("activate", (event) => {
   event.waitUntil(
-    caches.keys().then((keys) =>
-      Promise.all(keys.filter((k) => k !== CACHE_NAME).map((k) => caches.delete(k)))
-    )
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((k) => k !== STATIC_CACHE && k !== API_CACHE).map((k) => caches.delete(k))))
+      .then(() => self.clients.claim())
   );
 });
 
-self.addEventListener("fetch", (event) => {
-  event.respondWith(
-    caches.match(event.request).then((cached) => {
-      if (cached) return cached;
-      return fetch(event.request);
-    })
+// Perfil del token (claim "sub" del JWT): las copias de un perfil nunca se sirven a otro.
+function tokenScope(request) {
+  const auth = request.headers.get("Authorization") || "";
+  if (!auth.startsWith("Bearer ")) return null;
+  try {
+    const part = auth.slice(7).split(".")[1].replace(/-/g, "+").replace(/_/g, "/");
+    const payload = JSON.parse(atob(part + "=".repeat((4 - (part.length % 4)) % 4)));
+    return payload.sub ? String(payload.sub) : null;
+  } catch (e) {
+    return null;
+  }
+}
+
+function apiCacheKey(url, scope) {
+  const keyUrl = new URL(url);
+  keyUrl.searchParams.set("__scope", scope);
+  return keyUrl.toString();
+}
+
+async function notifyClients(message) {
+  const clients = await self.clients.matchAll({ type: "window" });
+  clients.forEach((client) => client.postMessage(message));
+}
+
+async function revalidate(request, key, cachedText) {
+  const response = await fetch(request);
+  if (!response.ok) return response;
+  const text = await response.clone().text();
+  const cache = await caches.open(API_CACHE);
+  await cache.put(key, response.clone());
+  // Solo se avisa si cambio: la pagina vuelve a pedir la vista y esa peticion ya no difiere.
+  if (cachedText !== null && text !== cachedText) {
+    await notifyClients({ type: "api-updated", path: new URL(request.url).pathname });
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, scope) {
+  const key = apiCacheKey(event.request.url, scope);
+  const cache = await caches.open(API_CACHE);
+  const cached = await cache.match(key);
+  if (!cached) return revalidate(event.request, key, null);
+  const cachedText = await cached.clone().text();
+  event.waitUntil(revalidate(event.request, key, cachedText).catch(() => undefined));
+  return cached;
+}
+
+async function forgetScope(scope) {
+  const cache = await caches.open(API_CACHE);
+  const keys = await cache.keys();
+  await Promise.all(
+    keys.filter((req) => new URL(req.url).searchParams.get("__scope") === scope).map((req) => cache.delete(req))
   );
+}
+
+async function writeThrough(request, scope) {
+  // Tras crear, borrar o puntuar, las copias de ese perfil ya no valen.
+  const response = await fetch(request);
+  if (response.ok) await forgetScope(scope);
+  return response;
+}
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  const scope = tokenScope(request);
+  if (scope && (url.pathname.startsWith("/items") || url.pathname === "/rankings")) {
+    if (request.method === "GET" && API_PATHS.includes(url.pathname)) {
+      event.respondWith(staleWhileRevalidate(event, scope));
+    } else if (request.method !== "GET") {
+      event.respondWith(writeThrough(request, scope));
+    }
+    return;
+  }
+  if (request.method !== "GET" || url.origin !== self.location.origin) return;
+  event.respondWith(caches.match(request).then((cached) => cached || fetch(request)));
 });